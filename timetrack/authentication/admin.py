@@ -1,3 +1,15 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import User
+
+
+@admin.register(User)
+class UserAdmin(admin.ModelAdmin):
+    list_display = ('email', 'username', 'is_staff', 'is_active', 'date_joined')
+    list_filter = ('is_staff', 'is_active')
+    # Prefix matches only, served by the user_*_prefix_idx indexes; also
+    # backs the user autocomplete of the time log admin
+    search_fields = ('^email', '^username')
+    readonly_fields = ('id', 'password', 'last_login', 'date_joined')
+    filter_horizontal = ('groups', 'user_permissions')
+    ordering = ('email',)
@@ -0,0 +1,40 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Users cached for authentication are keyed by a per-user version that
+# changes to is_active, is_staff, is_superuser or the password bump once they
+# commit. A request that raced such a change can only store its stale copy
+# under the old version, which nobody reads any more.
+
+
+def get_cached_user(user_id):
+    """The user cached for authentication, or None."""
+    return cache.get(_get_user_key(user_id))
+
+
+def set_cached_user(user) -> None:
+    cache.set(_get_user_key(user.pk), user, settings.AUTH_USER_CACHE_TTL)
+
+
+def invalidate_cached_user(user_id) -> None:
+    """Drop the user's cached copy once the current transaction commits."""
+    def bump_version():
+        try:
+            cache.incr(f'auth:user:{user_id}:version')
+        except ValueError:
+            # No version yet (or evicted): the next read starts a fresh one
+            pass
+
+    transaction.on_commit(bump_version)
+
+
+def _get_user_key(user_id) -> str:
+    key = f'auth:user:{user_id}:version'
+    version = cache.get(key)
+    if version is None:
+        # Start from a value no earlier version of this key can have reached
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return f'auth:user:{user_id}:{version}'
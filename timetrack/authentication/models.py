@@ -1,7 +1,12 @@
 from django.db import models
 import uuid
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
+from django.contrib.postgres.indexes import OpClass
+from django.db.models.functions import Upper
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
+from .cache import invalidate_cached_user
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, username, password=None, **extra_fields):
@@ -38,9 +43,40 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
+    # Changes to these drop the copy cached for authentication
+    AUTH_CACHE_FIELDS = ('password', 'is_active', 'is_staff', 'is_superuser')
+
     class Meta:
         verbose_name = _('user')
         verbose_name_plural = _('users')
+        indexes = [
+            # Case-insensitive prefix search (`istartswith`, `^` in admin
+            # search_fields) compares UPPER(column) with LIKE 'PREFIX%'
+            models.Index(OpClass(Upper('email'), name='text_pattern_ops'), name='user_email_prefix_idx'),
+            models.Index(OpClass(Upper('username'), name='text_pattern_ops'), name='user_username_prefix_idx'),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._auth_state = self._get_auth_state()
 
     def __str__(self):
         return self.email
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        state = self._get_auth_state()
+        if not adding and state != self._auth_state:
+            invalidate_cached_user(self.pk)
+        self._auth_state = state
+
+    def _get_auth_state(self):
+        # Deferred fields are left out rather than fetched: getattr would
+        # load each one with a query of its own. One that is set or loaded
+        # later shows up as changed.
+        return {field: self.__dict__[field] for field in self.AUTH_CACHE_FIELDS if field in self.__dict__}
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
@@ -0,0 +1,101 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+User = get_user_model()
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(email='test@example.com', username='testuser', password='testpass123')
+
+
+@pytest.fixture
+def api(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+def test_user_lookup_is_cached(api, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        assert api.get('/api/auth/me/').json()['email'] == 'test@example.com'
+    with django_assert_num_queries(0):
+        assert api.get('/api/auth/me/').json()['email'] == 'test@example.com'
+
+
+@pytest.mark.parametrize('change', [
+    lambda user: setattr(user, 'is_active', False),
+    lambda user: setattr(user, 'is_staff', True),
+    lambda user: setattr(user, 'is_superuser', True),
+    lambda user: user.set_password('newpass456'),
+])
+def test_security_changes_drop_cached_user(api, user, change, django_capture_on_commit_callbacks,
+                                           django_assert_num_queries):
+    api.get('/api/auth/me/')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        change(user)
+        user.save()
+
+    response = api.get('/api/auth/me/')
+    assert response.status_code == (401 if not user.is_active else 200)
+    if user.is_active:
+        assert response.wsgi_request.user.is_staff == user.is_staff
+        assert response.wsgi_request.user.password == user.password
+        with django_assert_num_queries(0):
+            api.get('/api/auth/me/')
+
+
+def test_other_changes_keep_cached_user(api, user, django_capture_on_commit_callbacks, django_assert_num_queries):
+    api.get('/api/auth/me/')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.username = 'renamed'
+        user.save()
+
+    with django_assert_num_queries(0):
+        api.get('/api/auth/me/')
+
+
+def test_deleted_user_is_rejected(api, user, django_capture_on_commit_callbacks):
+    api.get('/api/auth/me/')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.delete()
+
+    response = api.get('/api/auth/me/')
+    assert response.status_code == 401
+    assert response.json()['code'] == 'user_not_found'
+
+
+
+@pytest.mark.parametrize('queryset', [
+    lambda: User.objects.only('id', 'email'),
+    lambda: User.objects.defer('password', 'is_superuser'),
+])
+def test_deferred_fields_are_not_loaded(user, queryset, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        assert list(queryset()) == [user]
+
+
+def test_deferred_security_change_drops_cached_user(api, user, django_capture_on_commit_callbacks):
+    api.get('/api/auth/me/')
+
+    deferred = User.objects.only('id').get(pk=user.pk)
+    with django_capture_on_commit_callbacks(execute=True):
+        deferred.is_active = False
+        deferred.save()
+
+    assert api.get('/api/auth/me/').status_code == 401
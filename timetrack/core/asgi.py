@@ -9,8 +9,31 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Serve static files in development, as runserver does
+http_application = ASGIStaticFilesHandler(django_application) if settings.DEBUG else django_application
+
+# Long-lived event streams. Django gives every request a thread of its own
+# for sync code (signal receivers, sync middleware) that lives as long as the
+# response, so these skip that context and share the process-wide thread.
+# The trade-off: that one thread runs the sync middleware and signal receivers
+# of every stream, and any other thread sensitive call made outside a request,
+# so while one of them is slow (a database call at request start, say) no
+# other stream can open. Streams already open are unaffected: their own
+# database work goes to the worker pool (streams.run_in_worker) and their
+# events never touch the shared thread. Keep sync work at stream start cheap.
+STREAM_PATHS = {'/api/timelogs/stream/'}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] in STREAM_PATHS:
+        await django_application.handle(scope, receive, send)
+    else:
+        await http_application(scope, receive, send)
@@ -0,0 +1,52 @@
+"""
+Primary/replica database routing.
+
+Every write, and by default every read, goes to the primary ('default').
+Views opt read-only querysets into a replica with get_read_database(), which
+keeps a user on the primary for DATABASE_REPLICA_STICKY_SECONDS after they
+wrote, so they read their own writes despite replica lag.
+"""
+import random
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+
+def _get_pin_key(user_id) -> str:
+    return f'db:primary:{user_id}'
+
+
+def pin_to_primary(user_id) -> None:
+    """Send the user's reads to the primary for the sticky window."""
+    if settings.DATABASE_REPLICAS and settings.DATABASE_REPLICA_STICKY_SECONDS:
+        cache.set(_get_pin_key(user_id), True, settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+
+def get_read_database(user_id) -> str:
+    """
+    Alias of the database to read the user's data from: a random replica,
+    or the primary if there are none or the user wrote recently.
+    """
+    if not settings.DATABASE_REPLICAS or cache.get(_get_pin_key(user_id)):
+        return DEFAULT_DB_ALIAS
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class PrimaryReplicaRouter:
+    """Writes and migrations only ever touch the primary."""
+
+    def db_for_read(self, model, **hints):
+        # Unrouted reads use the primary, or the database of a hinted instance
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Even for instances read from a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,219 @@
+"""
+Per-request performance instrumentation.
+
+InstrumentationMiddleware collects, for every request, the SQL query count
+and time and the time spent in the parts of the code marked with
+@instrumented (service, repository, serialization). It sends them as a
+Server-Timing header when SERVER_TIMING_ENABLED, and records per-view
+histograms for the Prometheus /metrics endpoint when METRICS_ENABLED.
+With both off, the middleware removes itself and the hooks only cost a
+context variable lookup per call.
+"""
+import os
+import time
+import tracemalloc
+from contextvars import ContextVar
+from functools import wraps
+from inspect import isfunction
+from typing import Dict, Iterable, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+
+REQUEST_DURATION = Histogram(
+    'timetrack_request_duration_seconds', 'Time to produce a response, by view', ['view', 'method']
+)
+REQUEST_DB_DURATION = Histogram(
+    'timetrack_request_db_duration_seconds', 'Time spent in SQL queries per request, by view', ['view', 'method']
+)
+REQUEST_DB_QUERIES = Histogram(
+    'timetrack_request_db_queries', 'SQL queries per request, by view', ['view', 'method'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+)
+TIMER_TRANSITIONS = Counter(
+    'timetrack_timer_transitions_total', 'Committed timer transitions, by action', ['action']
+)
+
+# Server-Timing entries in the order they are listed
+TIMED_CATEGORIES = ['service', 'repository', 'serialize']
+
+
+class RequestMetrics:
+    """What one request spent its time on."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.seconds: Dict[str, float] = {}
+        # Categories being timed, so nested calls are not counted twice
+        self.active = set()
+        self.peak_allocated: Optional[int] = None
+
+    def add(self, category: str, seconds: float) -> None:
+        self.seconds[category] = self.seconds.get(category, 0.0) + seconds
+
+    def server_timing(self, total_seconds: float) -> str:
+        entries = [f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries"']
+        entries += [
+            f'{category};dur={self.seconds[category] * 1000:.2f}'
+            for category in TIMED_CATEGORIES if category in self.seconds
+        ]
+        if self.peak_allocated is not None:
+            entries.append(f'alloc;desc="{self.peak_allocated / 1024:.0f} KiB peak"')
+        entries.append(f'total;dur={total_seconds * 1000:.2f}')
+        return ', '.join(entries)
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar('request_metrics', default=None)
+
+
+def timed(category: str):
+    """Add the decorated function's run time to the request's `category`."""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            metrics = _current.get()
+            if metrics is None or category in metrics.active:
+                return function(*args, **kwargs)
+            metrics.active.add(category)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                metrics.add(category, time.perf_counter() - started)
+                metrics.active.discard(category)
+        return wrapper
+    return decorator
+
+
+def instrumented(category: str, names: Optional[Iterable[str]] = None):
+    """
+    Class decorator timing the public methods the class defines (or the
+    methods and properties in `names`, inherited or not) under `category`.
+    """
+    def decorator(cls):
+        if names is None:
+            members = {name: attribute for name, attribute in vars(cls).items() if not name.startswith('_')}
+        else:
+            # Inherited ones too
+            members = {name: getattr(cls, name) for name in names}
+        for name, attribute in members.items():
+            if isinstance(attribute, property):
+                setattr(cls, name, attribute.getter(timed(category)(attribute.fget)))
+            elif isfunction(attribute):
+                setattr(cls, name, timed(category)(attribute))
+        return cls
+    return decorator
+
+
+def count_transition(action: str, count: int = 1) -> None:
+    """Count timer transitions once the surrounding transaction commits."""
+    transaction.on_commit(lambda: TIMER_TRANSITIONS.labels(action).inc(count))
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_seconds += time.perf_counter() - started
+        metrics.queries += 1
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs) -> None:
+    """Time the queries of `connection`, or of this thread's open connections."""
+    for candidate in [connection] if connection is not None else connections.all(initialized_only=True):
+        if record_query not in candidate.execute_wrappers:
+            candidate.execute_wrappers.append(record_query)
+
+
+class InstrumentationMiddleware:
+    """
+    Measures each request. Goes first in MIDDLEWARE, so it sees the
+    whole request, and handles sync and async requests alike.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not (settings.SERVER_TIMING_ENABLED or settings.METRICS_ENABLED):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Connections opened from now on, and the ones already open
+        connection_created.connect(install_query_recorder)
+        install_query_recorder()
+        if settings.SERVER_TIMING_ALLOCATIONS and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    def start(self):
+        metrics = RequestMetrics()
+        if settings.SERVER_TIMING_ALLOCATIONS:
+            # Process-wide: concurrent requests count towards each other's peak
+            tracemalloc.reset_peak()
+            metrics.peak_allocated = -tracemalloc.get_traced_memory()[0]
+        return metrics, _current.set(metrics), time.perf_counter()
+
+    def finish(self, request, response, metrics, started):
+        total = time.perf_counter() - started
+        if metrics.peak_allocated is not None:
+            metrics.peak_allocated += tracemalloc.get_traced_memory()[1]
+
+        if settings.METRICS_ENABLED:
+            match = request.resolver_match
+            labels = (match.view_name if match else 'unmatched', request.method)
+            REQUEST_DURATION.labels(*labels).observe(total)
+            REQUEST_DB_DURATION.labels(*labels).observe(metrics.db_seconds)
+            REQUEST_DB_QUERIES.labels(*labels).observe(metrics.queries)
+        if settings.SERVER_TIMING_ENABLED:
+            response['Server-Timing'] = metrics.server_timing(total)
+        return response
+
+    def process_template_response(self, request, response):
+        """Count rendering (e.g. JSON encoding) as serialization."""
+        metrics = _current.get()
+        if metrics is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(lambda _: metrics.add('serialize', time.perf_counter() - started))
+        return response
+
+
+def metrics_view(request):
+    """The Prometheus metrics, in its text exposition format."""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    registry = REGISTRY
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        # Several worker processes: add up the metrics they wrote
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -26,6 +26,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # Third party apps
     'rest_framework',
     'rest_framework_simplejwt',
@@ -38,6 +39,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.InstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -77,6 +79,38 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'password'),
         'HOST': os.getenv('POSTGRES_HOST', 'db'),
         'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        # Seconds to keep connections open between requests (0 closes them)
+        'CONN_MAX_AGE': int(os.getenv('POSTGRES_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Read replicas of the primary, as comma-separated host[:port][/name], e.g.
+# POSTGRES_REPLICAS=replica-1,replica-2:5433. They become replica_1, replica_2, ...
+for index, replica in enumerate(filter(None, os.getenv('POSTGRES_REPLICAS', '').split(',')), 1):
+    address, _, name = replica.strip().partition('/')
+    host, _, port = address.partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'NAME': name or DATABASES['default']['NAME'],
+        # Tests read replicas through the primary's connection
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.db_routers.PrimaryReplicaRouter']
+
+# Seconds a user's reads stay on the primary after they write, so they see
+# their own writes while the replicas catch up
+DATABASE_REPLICA_STICKY_SECONDS = int(os.getenv('DATABASE_REPLICA_STICKY_SECONDS', 5))
+
+# Cache: per-process memory by default. Point CACHE_BACKEND/CACHE_LOCATION at a
+# shared backend (Redis, Memcached) when running several processes.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
@@ -102,7 +136,7 @@ AUTH_USER_MODEL = 'authentication.User'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -117,6 +151,56 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10
 }
 
+# Upper bound for the client supplied `page_size` on time log listings
+TIMELOGS_MAX_PAGE_SIZE = int(os.getenv('TIMELOGS_MAX_PAGE_SIZE', 100))
+
+# Maximum number of entries accepted by one bulk time log import
+TIMELOGS_BULK_MAX_ENTRIES = int(os.getenv('TIMELOGS_BULK_MAX_ENTRIES', 10000))
+
+# What manual and bulk entries that overlap the user's recorded time do by
+# default: 'allow' them, 'warn' in the response, or 'reject' them with a 400.
+# Requests can choose with `overlap`.
+TIMELOGS_OVERLAP_POLICY = os.getenv('TIMELOGS_OVERLAP_POLICY', 'allow')
+
+# Most changes returned by one delta sync request
+TIMELOGS_SYNC_BATCH_SIZE = int(os.getenv('TIMELOGS_SYNC_BATCH_SIZE', 500))
+
+# Days delta sync cursors stay valid. Tombstones of deleted logs are kept a
+# day longer, then removed by compact_timelog_tombstones.
+TIMELOGS_TOMBSTONE_RETENTION_DAYS = int(os.getenv('TIMELOGS_TOMBSTONE_RETENTION_DAYS', 30))
+
+# Rows fetched per server-side cursor round trip when streaming exports
+TIMELOGS_EXPORT_CHUNK_SIZE = int(os.getenv('TIMELOGS_EXPORT_CHUNK_SIZE', 2000))
+
+# Seconds a user's active timer stays cached; writes invalidate it sooner
+TIMELOGS_ACTIVE_TIMER_CACHE_TTL = int(os.getenv('TIMELOGS_ACTIVE_TIMER_CACHE_TTL', 300))
+
+# Broker carrying timer events to the live stream. The default only reaches
+# streams served by the same process.
+TIMELOGS_EVENT_BROKER = os.getenv(
+    'TIMELOGS_EVENT_BROKER', 'timelogs.infrastructure.events.InProcessTimerEventBroker'
+)
+
+# Seconds between keepalive comments on an idle live stream
+TIMELOGS_STREAM_KEEPALIVE = int(os.getenv('TIMELOGS_STREAM_KEEPALIVE', 15))
+
+# Undelivered events buffered per stream before the oldest are dropped
+TIMELOGS_STREAM_QUEUE_SIZE = int(os.getenv('TIMELOGS_STREAM_QUEUE_SIZE', 100))
+
+# Monthly time log partitions kept ready ahead of the current month, and
+# months of partitions kept before partition_timelogs detaches them (0 keeps
+# every partition). Only used once the table is partitioned.
+TIMELOGS_PARTITION_MONTHS_AHEAD = int(os.getenv('TIMELOGS_PARTITION_MONTHS_AHEAD', 3))
+TIMELOGS_PARTITION_RETENTION_MONTHS = int(os.getenv('TIMELOGS_PARTITION_RETENTION_MONTHS', 0))
+
+# Completed time logs created this many months before the current month are
+# moved to the compressed archive by archive_timelogs
+TIMELOGS_ARCHIVE_AFTER_MONTHS = int(os.getenv('TIMELOGS_ARCHIVE_AFTER_MONTHS', 12))
+
+# Admin changelists the planner expects to hold more rows than this show its
+# estimate instead of an exact COUNT(*)
+TIMELOGS_ADMIN_EXACT_COUNT_LIMIT = int(os.getenv('TIMELOGS_ADMIN_EXACT_COUNT_LIMIT', 10000))
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'TimeTrack API',
     'DESCRIPTION': 'API for tracking time spent on tasks with authentication',
@@ -137,6 +221,20 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# Seconds a user looked up for JWT authentication stays cached; changes to
+# is_active, is_staff or the password drop it sooner
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 60))
+
+# Request instrumentation (see core/instrumentation.py). Server-Timing headers
+# with query count and time, service, repository and serialization time
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'False') == 'True'
+
+# Add peak Python allocations to Server-Timing, using tracemalloc (slow)
+SERVER_TIMING_ALLOCATIONS = os.getenv('SERVER_TIMING_ALLOCATIONS', 'False') == 'True'
+
+# Per-view Prometheus histograms served on /metrics; keep that path internal
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False') == 'True'
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # Next.js default dev server
@@ -18,4 +18,5 @@ python create_test_data.py
 
 # Start server
 echo "Starting server..."
-python manage.py runserver 0.0.0.0:8000
+# ASGI, so the live timer stream holds no thread per connection
+uvicorn core.asgi:application --host 0.0.0.0 --port 8000 --reload
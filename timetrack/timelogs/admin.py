@@ -1,16 +1,96 @@
+import json
+
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
 from .domain.models import TimeLog
 
-# Register your models here.
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that takes the planner's row estimate as the count of large
+    result sets, instead of an exact COUNT(*) that reads every matching row.
+
+    Result sets estimated below TIMELOGS_ADMIN_EXACT_COUNT_LIMIT rows are
+    still counted exactly, so filtered listings show true counts. Past the
+    limit the count, and with it the number of pages, is approximate.
+    """
+
+    @cached_property
+    def count(self):
+        plan = json.loads(self.object_list.explain(format='json'))
+        estimate = int(plan[0]['Plan']['Plan Rows'])
+        if estimate < settings.TIMELOGS_ADMIN_EXACT_COUNT_LIMIT:
+            return super().count
+        return estimate
+
+
+class UserAutocompleteFilter(admin.FieldListFilter):
+    """
+    Filter by user through an autocomplete box, which looks users up as the
+    admin types, instead of listing every user in the sidebar.
+    """
+    template = 'admin/timelogs/user_autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        super().__init__(field, request, params, model, model_admin, field_path)
+        # Rendered through a form field, which gives the widget its choices
+        self.form_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+            required=False,
+        )
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_kwarg not in self.used_parameters,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'display': _('All'),
+        }
+
+    def render_widget(self):
+        value = self.used_parameters.get(self.lookup_kwarg, [None])[-1]
+        return self.form_field.widget.render(self.lookup_kwarg, value)
+
 
 @admin.register(TimeLog)
 class TimeLogAdmin(admin.ModelAdmin):
     list_display = ('user', 'description', 'duration', 'status', 'created_at')
-    list_filter = ('status', 'created_at', 'user')
-    search_fields = ('description', 'user__email', 'user__username')
+    list_filter = ('status', 'created_at')
+    list_select_related = ('user',)
+    # Users match by email or username prefix only, which their indexes serve
+    search_fields = ('description', '^user__email', '^user__username')
     readonly_fields = ('id', 'created_at', 'updated_at')
+    autocomplete_fields = ('user',)
     ordering = ('-created_at',)
-    
+    # Exact counts and facet counts read every matching row
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    @property
+    def media(self):
+        # For the user filter, on the changelist
+        widget = AutocompleteSelect(TimeLog._meta.get_field('user'), self.admin_site)
+        return super().media + widget.media + forms.Media(
+            js=['admin/js/jquery.init.js', 'timelogs/admin/user_autocomplete_filter.js']
+        )
+
+    def get_list_filter(self, request):
+        # Other staff only see their own logs
+        if request.user.is_superuser:
+            return (*self.list_filter, ('user', UserAutocompleteFilter))
+        return self.list_filter
+
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         if request.user.is_superuser:
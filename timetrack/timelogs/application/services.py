@@ -1,15 +1,55 @@
-from datetime import datetime, timedelta
-from typing import List, Optional
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.utils import timezone  # Import Django's timezone utilities
+from core.instrumentation import count_transition, instrumented
 
-from ..domain.interfaces import TimeLogRepositoryInterface, TimeTrackingServiceInterface
+from ..domain.interfaces import (
+    TimeLogRepositoryInterface,
+    TimerEventBrokerInterface,
+    TimeTrackingServiceInterface,
+)
 from ..domain.models import TimeLog
 
+class TimeLogOverlapError(ValueError):
+    """Manual entries overlap recorded time, under the reject policy."""
+
+    def __init__(self, overlaps: Dict[int, List[Dict]]):
+        super().__init__("Time log entries overlap existing time")
+        # What each conflicting entry overlaps, by the entry's index
+        self.overlaps = overlaps
+
+class TimerConflictError(ValueError):
+    """The user already has a running timer."""
+
+
+@instrumented('service')
 class TimeTrackingService(TimeTrackingServiceInterface):
     """Implementation of the time tracking service."""
 
-    def __init__(self, repository: TimeLogRepositoryInterface):
+    # What to do with manual entries that overlap the user's recorded time
+    OVERLAP_ALLOW = 'allow'
+    OVERLAP_WARN = 'warn'
+    OVERLAP_REJECT = 'reject'
+    OVERLAP_POLICIES = (OVERLAP_ALLOW, OVERLAP_WARN, OVERLAP_REJECT)
+
+    # Transitions that can be applied to many logs at once. Starting or
+    # resuming several would break the one running timer per user.
+    BATCH_ACTIONS = ('pause', 'stop')
+
+    # Per-log outcomes of a batch transition
+    OUTCOME_APPLIED = 'applied'
+    OUTCOME_NOT_ALLOWED = 'not_allowed'
+    OUTCOME_NOT_FOUND = 'not_found'
+
+    def __init__(self,
+                 repository: TimeLogRepositoryInterface,
+                 events: Optional[TimerEventBrokerInterface] = None):
         self.repository = repository
+        # Timer changes are published here when given
+        self.events = events
 
     def start_timer(self, time_log_id: str) -> TimeLog:
         """
@@ -24,16 +64,7 @@ class TimeTrackingService(TimeTrackingServiceInterface):
         Raises:
             ValueError: If time log cannot be started
         """
-        time_log = self.repository.get_by_id(time_log_id)
-        
-        # Only allow starting CREATED or PAUSED time logs
-        if time_log.status not in [TimeLog.Status.CREATED, TimeLog.Status.PAUSED]:
-            raise ValueError(f"Cannot start timer with status {time_log.status}")
-        
-        # Use timezone-aware current time
-        time_log.start_time = timezone.now()
-        time_log.status = TimeLog.Status.RUNNING
-        return self.repository.update(time_log)
+        return self._transition(time_log_id, 'start')
 
     def pause_timer(self, time_log_id: str) -> TimeLog:
         """
@@ -48,28 +79,7 @@ class TimeTrackingService(TimeTrackingServiceInterface):
         Raises:
             ValueError: If time log cannot be paused
         """
-        time_log = self.repository.get_by_id(time_log_id)
-        
-        # Only allow pausing RUNNING time logs
-        if time_log.status != TimeLog.Status.RUNNING:
-            raise ValueError(f"Cannot pause timer with status {time_log.status}")
-        
-        # Use timezone-aware current time
-        current_time = timezone.now()
-        
-        # Ensure start_time is timezone-aware
-        if time_log.start_time and not timezone.is_aware(time_log.start_time):
-            time_log.start_time = timezone.make_aware(time_log.start_time)
-        
-        # Calculate and add elapsed running time
-        elapsed_time = current_time - time_log.start_time
-        time_log.duration += elapsed_time
-        
-        # Set pause start time for tracking paused duration
-        time_log.pause_start_time = current_time
-        time_log.status = TimeLog.Status.PAUSED
-        
-        return self.repository.update(time_log)
+        return self._transition(time_log_id, 'pause')
 
     def resume_timer(self, time_log_id: str) -> TimeLog:
         """
@@ -84,30 +94,7 @@ class TimeTrackingService(TimeTrackingServiceInterface):
         Raises:
             ValueError: If time log cannot be resumed
         """
-        time_log = self.repository.get_by_id(time_log_id)
-        
-        # Only allow resuming PAUSED time logs
-        if time_log.status != TimeLog.Status.PAUSED:
-            raise ValueError(f"Cannot resume timer with status {time_log.status}")
-        
-        # Use timezone-aware current time
-        current_time = timezone.now()
-        
-        # Calculate paused duration
-        if time_log.pause_start_time:
-            # Ensure pause_start_time is timezone-aware
-            if not timezone.is_aware(time_log.pause_start_time):
-                time_log.pause_start_time = timezone.make_aware(time_log.pause_start_time)
-            
-            paused_duration = current_time - time_log.pause_start_time
-            time_log.paused_duration += paused_duration
-        
-        # Reset start time and clear pause start time
-        time_log.start_time = current_time
-        time_log.pause_start_time = None
-        time_log.status = TimeLog.Status.RUNNING
-        
-        return self.repository.update(time_log)
+        return self._transition(time_log_id, 'resume')
 
     def stop_timer(self, time_log_id: str) -> TimeLog:
         """
@@ -122,45 +109,135 @@ class TimeTrackingService(TimeTrackingServiceInterface):
         Raises:
             ValueError: If time log cannot be stopped
         """
-        time_log = self.repository.get_by_id(time_log_id)
+        with transaction.atomic():
+            time_log = self._transition(time_log_id, 'stop')
+            # Keep the daily rollup in step with the completed log
+            self.repository.add_to_daily_totals(time_log)
+        return time_log
+
+    def transition_many(self,
+                        action: str,
+                        time_log_ids: Optional[List[str]] = None,
+                        user_ids: Optional[List[str]] = None,
+                        statuses: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Pause or stop many timers in one transaction, with the same rules
+        as pause_timer and stop_timer.
         
-        # Only allow stopping RUNNING or PAUSED time logs
-        if time_log.status not in [TimeLog.Status.RUNNING, TimeLog.Status.PAUSED]:
-            raise ValueError(f"Cannot stop timer with status {time_log.status}")
+        Args:
+            action (str): One of BATCH_ACTIONS
+            time_log_ids (list, optional): IDs of the time logs
+            user_ids (list, optional): Only time logs of these users
+            statuses (list, optional): Only time logs in these statuses
         
-        # Use timezone-aware current time
-        current_time = timezone.now()
+        Returns:
+            list: Dicts with the id, outcome (OUTCOME_*) and the resulting
+                  time_log, or else the log's current status. The requested
+                  IDs in order when given, otherwise the changed logs
         
-        # Ensure start_time is timezone-aware
-        if time_log.start_time and not timezone.is_aware(time_log.start_time):
-            time_log.start_time = timezone.make_aware(time_log.start_time)
+        Raises:
+            ValueError: If the action cannot be batched, or neither IDs nor
+                        users are given
+        """
+        if action not in self.BATCH_ACTIONS:
+            raise ValueError(f"Cannot {action} timers in a batch")
+        if time_log_ids is None and user_ids is None:
+            raise ValueError("Select the time logs by ID or by user")
+
+        with transaction.atomic():
+            time_logs = self.repository.transition_many(action, timezone.now(), time_log_ids, user_ids, statuses)
+            if action == 'stop':
+                self.repository.add_all_to_daily_totals(time_logs)
+            count_transition(action, len(time_logs))
+            for time_log in time_logs:
+                self._publish(action, time_log)
+
+        applied = {time_log.id: time_log for time_log in time_logs}
+        if time_log_ids is None:
+            return [
+                {'id': time_log.id, 'outcome': self.OUTCOME_APPLIED, 'status': time_log.status, 'time_log': time_log}
+                for time_log in time_logs
+            ]
+
+        missing = [time_log_id for time_log_id in time_log_ids if time_log_id not in applied]
+        statuses = self.repository.get_statuses(missing, user_ids) if missing else {}
+        outcomes = []
+        for time_log_id in time_log_ids:
+            if time_log_id in applied:
+                time_log = applied[time_log_id]
+                outcomes.append({'id': time_log_id, 'outcome': self.OUTCOME_APPLIED,
+                                 'status': time_log.status, 'time_log': time_log})
+            elif time_log_id in statuses:
+                outcomes.append({'id': time_log_id, 'outcome': self.OUTCOME_NOT_ALLOWED,
+                                 'status': statuses[time_log_id], 'time_log': None})
+            else:
+                outcomes.append({'id': time_log_id, 'outcome': self.OUTCOME_NOT_FOUND,
+                                 'status': None, 'time_log': None})
+        return outcomes
+
+    def _transition(self, time_log_id: str, action: str) -> TimeLog:
+        """
+        Apply a timer transition as a single conditional update.
         
-        # Calculate final duration if timer was running
-        if time_log.status == TimeLog.Status.RUNNING:
-            elapsed_time = current_time - time_log.start_time
-            time_log.duration += elapsed_time
+        Args:
+            time_log_id (str): ID of the time log
+            action (str): One of the actions in TimeLog.TRANSITIONS
         
-        # Handle paused state if stopped from pause
-        if time_log.pause_start_time:
-            # Ensure pause_start_time is timezone-aware
-            if not timezone.is_aware(time_log.pause_start_time):
-                time_log.pause_start_time = timezone.make_aware(time_log.pause_start_time)
-            
-            paused_duration = current_time - time_log.pause_start_time
-            time_log.paused_duration += paused_duration
-            time_log.pause_start_time = None
+        Returns:
+            TimeLog: Updated time log
         
-        time_log.end_time = current_time
-        time_log.status = TimeLog.Status.COMPLETED
+        Raises:
+            ValueError: If the time log does not exist, is not in a status
+                        the action is allowed from, or would become a second
+                        running timer of its user
+        """
+        at = timezone.now()
+        if TimeLog.TRANSITIONS[action][1] != TimeLog.Status.RUNNING:
+            time_log = self.repository.transition(time_log_id, action, at)
+        else:
+            try:
+                # Savepoint, so a violation leaves an outer transaction usable
+                with transaction.atomic():
+                    time_log = self.repository.transition(time_log_id, action, at)
+            except IntegrityError:
+                # Only one timer per user may be running
+                raise TimerConflictError(f"Cannot {action} timer while another timer is running")
+        if time_log is None:
+            current = self.repository.get_by_id(time_log_id)
+            if current is None:
+                raise ValueError(f"Time log {time_log_id} does not exist")
+            raise ValueError(f"Cannot {action} timer with status {current.status}")
+        count_transition(action)
+        self._publish(action, time_log)
+        return time_log
+
+    def _publish(self, action: str, time_log: TimeLog) -> None:
+        """
+        Publish a timer change to the user's live streams once the
+        surrounding transaction commits.
         
-        return self.repository.update(time_log)
+        Args:
+            action (str): What happened: a transition, or 'delete'
+            time_log (TimeLog): Time log in its new state
+        """
+        if self.events is None:
+            return
+        event = {
+            'action': action,
+            'time_log': {
+                field.attname: getattr(time_log, field.attname)
+                for field in TimeLog._meta.concrete_fields
+            },
+        }
+        transaction.on_commit(lambda: self.events.publish(time_log.user_id, event))
 
     def add_manual_time(self, 
                       user_id: str, 
                       description: str, 
                       start_time: datetime, 
                       duration: timedelta,
-                      end_time: Optional[datetime] = None) -> TimeLog:
+                      end_time: Optional[datetime] = None,
+                      overlap: Optional[str] = None) -> TimeLog:
         """
         Add a manually logged time entry.
         
@@ -171,33 +248,121 @@ class TimeTrackingService(TimeTrackingServiceInterface):
             duration (timedelta): Total duration of work
             end_time (datetime, optional): When the work ended. 
                                            Defaults to start_time + duration if not provided
+            overlap (str, optional): Overlap policy, one of OVERLAP_POLICIES.
+                                     Defaults to TIMELOGS_OVERLAP_POLICY
         
         Returns:
-            TimeLog: Created and completed time log
+            TimeLog: Created and completed time log. Under the warn policy
+                     its `overlaps` lists what it overlaps
+        
+        Raises:
+            TimeLogOverlapError: If the entry overlaps recorded time under
+                                 the reject policy
         """
-        # Ensure start_time is timezone-aware
-        if not timezone.is_aware(start_time):
-            start_time = timezone.make_aware(start_time)
+        time_log = self._build_manual_log(user_id, description, start_time, duration, end_time)
+        with transaction.atomic():
+            overlaps = self._check_overlaps(user_id, [time_log], overlap)
+            time_log = self.repository.create_many([time_log])[0]
+            self.repository.add_to_daily_totals(time_log)
+        if overlaps is not None:
+            time_log.overlaps = overlaps.get(0, [])
+        return time_log
+
+    def add_manual_time_entries(self,
+                                user_id: str,
+                                entries: List[Dict],
+                                overlap: Optional[str] = None) -> List[TimeLog]:
+        """
+        Add many manually logged time entries in one transaction.
         
-        # Create the time log
-        time_log = self.repository.create(user_id, description)
+        Args:
+            user_id (str): ID of the user logging the time
+            entries (list): Dicts with description, start_time, duration
+                            and optionally end_time, as for add_manual_time
+            overlap (str, optional): Overlap policy, as for add_manual_time
         
-        # Set start time
-        time_log.start_time = start_time
+        Returns:
+            list: Created and completed time logs, in the order of entries.
+                  Under the warn policy each has its `overlaps`
         
-        # Set duration
-        time_log.duration = duration
+        Raises:
+            TimeLogOverlapError: If any entry overlaps recorded time or
+                                 another entry under the reject policy
+        """
+        time_logs = [
+            self._build_manual_log(
+                user_id,
+                entry['description'],
+                entry['start_time'],
+                entry['duration'],
+                entry.get('end_time')
+            )
+            for entry in entries
+        ]
+        with transaction.atomic():
+            overlaps = self._check_overlaps(user_id, time_logs, overlap)
+            time_logs = self.repository.create_many(time_logs)
+            self.repository.add_all_to_daily_totals(time_logs)
+        if overlaps is not None:
+            for index, time_log in enumerate(time_logs):
+                time_log.overlaps = overlaps.get(index, [])
+        return time_logs
+
+    def _check_overlaps(self,
+                        user_id: str,
+                        time_logs: List[TimeLog],
+                        overlap: Optional[str]) -> Optional[Dict[int, List[Dict]]]:
+        """
+        Apply the overlap policy to unsaved manual entries, inside the
+        transaction that inserts them.
+        
+        Returns:
+            dict: What each entry overlaps, by index, under the warn
+                  policy; None under the allow policy
+        
+        Raises:
+            TimeLogOverlapError: If anything overlaps under the reject policy
+        """
+        policy = overlap or settings.TIMELOGS_OVERLAP_POLICY
+        if policy not in self.OVERLAP_POLICIES:
+            raise ValueError(f"Unknown overlap policy {policy}")
+        if policy == self.OVERLAP_ALLOW:
+            return None
+
+        # Manual entries take up [start_time, start_time + duration), like
+        # their recorded interval
+        overlaps = self.repository.find_overlaps(
+            user_id,
+            [(time_log.start_time, time_log.start_time + time_log.duration) for time_log in time_logs]
+        )
+        if overlaps and policy == self.OVERLAP_REJECT:
+            raise TimeLogOverlapError(overlaps)
+        return overlaps
+
+    def _build_manual_log(self,
+                          user_id: str,
+                          description: str,
+                          start_time: datetime,
+                          duration: timedelta,
+                          end_time: Optional[datetime] = None) -> TimeLog:
+        """Build an unsaved, completed time log for a manual entry."""
+        # Ensure start_time is timezone-aware
+        if not timezone.is_aware(start_time):
+            start_time = timezone.make_aware(start_time)
         
         # Set end time (calculate if not provided)
         end_time = end_time or (start_time + duration)
         if not timezone.is_aware(end_time):
             end_time = timezone.make_aware(end_time)
-        time_log.end_time = end_time
-        
-        # Mark as completed
-        time_log.status = TimeLog.Status.COMPLETED
         
-        return self.repository.update(time_log)
+        return TimeLog(
+            user_id=user_id,
+            description=description,
+            start_time=start_time,
+            duration=duration,
+            end_time=end_time,
+            status=TimeLog.Status.COMPLETED
+        )
 
     def create_and_start_timer(self, user_id: str, description: str) -> TimeLog:
         """
@@ -209,11 +374,134 @@ class TimeTrackingService(TimeTrackingServiceInterface):
         
         Returns:
             TimeLog: Started time log
+        
+        Raises:
+            ValueError: If the user already has a running timer
+        """
+        # Insert the time log already running, with timezone-aware time
+        time_log = TimeLog(
+            user_id=user_id,
+            description=description,
+            start_time=timezone.now(),
+            status=TimeLog.Status.RUNNING
+        )
+        try:
+            with transaction.atomic():
+                time_log = self.repository.create_many([time_log])[0]
+        except IntegrityError:
+            raise TimerConflictError("Cannot start a new timer while another timer is running")
+        count_transition('start')
+        self._publish('start', time_log)
+        return time_log
+
+    def get_active_timer(self, user_id: str) -> Optional[TimeLog]:
+        """
+        Get the user's current timer: the running one, or else the most
+        recently paused one. Served from the cache when possible.
+        
+        Args:
+            user_id (str): ID of the user
+        
+        Returns:
+            TimeLog: Active time log, or None if the user has none
+        """
+        return self.repository.get_active_timer(user_id)
+
+    def delete_time_log(self, time_log_id: str) -> bool:
+        """
+        Delete a time log and take it out of the daily rollup.
+        
+        Args:
+            time_log_id (str): ID of the time log to delete
+        
+        Returns:
+            bool: True if the time log existed and was deleted
         """
-        # Create a new time log
-        time_log = self.repository.create(user_id, description)
+        with transaction.atomic():
+            time_log = self.repository.get_by_id(time_log_id)
+            if time_log is None:
+                return False
+            if time_log.status == TimeLog.Status.COMPLETED:
+                self.repository.remove_from_daily_totals(time_log)
+            deleted = self.repository.delete(time_log_id)
+            if deleted:
+                self._publish('delete', time_log)
+        return deleted
+
+    def get_time_totals(self,
+                        user_id: str,
+                        period: str = 'day',
+                        start_date: Optional[date] = None,
+                        end_date: Optional[date] = None) -> List[Dict]:
+        """
+        Get a user's time totals from the daily rollup.
+        
+        Args:
+            user_id (str): ID of the user
+            period (str): Grouping, one of 'day', 'week' or 'month'
+            start_date (date, optional): First day to include
+            end_date (date, optional): Last day to include
+        
+        Returns:
+            list: Dicts with period_start, active_duration, paused_duration
+                  and entry_count, ordered by period_start
+        """
+        return self.repository.get_time_totals(user_id, period, start_date, end_date)
+
+    def get_changes(self, user_id: str, after: Optional[Tuple[int, UUID]], limit: int) -> Dict:
+        """
+        Get a batch of a user's time log changes for delta sync.
+        
+        Args:
+            user_id (str): ID of the user
+            after (tuple, optional): Position returned by the previous
+                                     batch, None to start from scratch
+            limit (int): Maximum number of changes in the batch
         
-        # Immediately start the timer with timezone-aware time
-        time_log.start_time = timezone.now()
-        time_log.status = TimeLog.Status.RUNNING
-        return self.repository.update(time_log)
+        Returns:
+            dict: time_logs written and IDs of logs deleted since `after`,
+                  the position to continue from and has_more
+        """
+        return self.repository.get_changes(user_id, after, limit)
+
+    def get_worked_time(self, user_id: str, start: datetime, end: datetime) -> Dict:
+        """
+        Get a user's exact active time within [start, end), from the
+        timer intervals. Intervals are clipped at the window edges, and
+        running timers count up to now.
+        
+        Args:
+            user_id (str): ID of the user
+            start (datetime): Start of the window
+            end (datetime): End of the window (exclusive)
+        
+        Returns:
+            dict: start, end, the total duration and time_logs, a list of
+                  dicts with time_log_id and duration, longest first
+        """
+        # Nothing has been worked after now yet
+        until = min(end, timezone.now())
+        by_time_log = self.repository.get_worked_time(user_id, start, until) if start < until else {}
+        return {
+            'start': start,
+            'end': end,
+            'duration': sum(by_time_log.values(), timedelta()),
+            'time_logs': [
+                {'time_log_id': time_log_id, 'duration': duration}
+                for time_log_id, duration in sorted(by_time_log.items(), key=lambda item: item[1], reverse=True)
+            ],
+        }
+
+    def get_running_at(self, user_id: str, at: datetime) -> List[TimeLog]:
+        """
+        Get a user's time logs that were running at a given moment.
+        
+        Args:
+            user_id (str): ID of the user
+            at (datetime): The moment
+        
+        Returns:
+            list: Time logs with a timer interval (or manual entry)
+                  covering `at`, archived ones left out
+        """
+        return self.repository.get_running_at(user_id, at)
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from datetime import timedelta
-from typing import List, Optional
+from datetime import date, datetime, timedelta
+from typing import AsyncContextManager, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
 from .models import TimeLog
 
 class TimeLogRepositoryInterface(ABC):
@@ -11,6 +12,11 @@ class TimeLogRepositoryInterface(ABC):
         """Create a new time log entry."""
         pass
 
+    @abstractmethod
+    def create_many(self, time_logs: List[TimeLog]) -> List[TimeLog]:
+        """Insert several new time log entries at once."""
+        pass
+
     @abstractmethod
     def get_by_id(self, time_log_id: str) -> Optional[TimeLog]:
         """Get a time log by its ID."""
@@ -18,7 +24,12 @@ class TimeLogRepositoryInterface(ABC):
 
     @abstractmethod
     def get_user_logs(self, user_id: str, **filters) -> List[TimeLog]:
-        """Get all time logs for a user with optional filters."""
+        """Get all time logs for a user with optional filters, archived ones included."""
+        pass
+
+    @abstractmethod
+    def get_archived_logs(self, user_id: Optional[str], filters: Dict, search: str = '') -> Iterator[TimeLog]:
+        """Iterate over the archived time logs matching the list filters, of one user or of everyone."""
         pass
 
     @abstractmethod
@@ -26,11 +37,142 @@ class TimeLogRepositoryInterface(ABC):
         """Update a time log entry."""
         pass
 
+    @abstractmethod
+    def transition(self, time_log_id: str, action: str, at: datetime) -> Optional[TimeLog]:
+        """
+        Atomically apply a timer transition (see TimeLog.TRANSITIONS).
+        Returns None when the time log is missing or not in an allowed status.
+        """
+        pass
+
+    @abstractmethod
+    def transition_many(self,
+                        action: str,
+                        at: datetime,
+                        time_log_ids: Optional[List[str]] = None,
+                        user_ids: Optional[List[str]] = None,
+                        statuses: Optional[List[str]] = None) -> List[TimeLog]:
+        """Atomically apply a timer transition to every matching log that allows it."""
+        pass
+
+    @abstractmethod
+    def get_statuses(self, time_log_ids: List[str], user_ids: Optional[List[str]] = None) -> Dict:
+        """Get the status of each existing time log, by ID, optionally of some users only."""
+        pass
+
     @abstractmethod
     def delete(self, time_log_id: str) -> bool:
         """Delete a time log entry."""
         pass
 
+    @abstractmethod
+    def get_active_timer(self, user_id: str) -> Optional[TimeLog]:
+        """Get the user's running (or else latest paused) time log, if any."""
+        pass
+
+    @abstractmethod
+    def invalidate_active_timer(self, user_id: str) -> None:
+        """Drop the user's cached active timer once the transaction commits."""
+        pass
+
+    @abstractmethod
+    def get_user_logs_version(self, user_id: str) -> int:
+        """Get a version of the user's time logs that every write changes."""
+        pass
+
+    @abstractmethod
+    def invalidate_user_logs(self, user_id: str) -> None:
+        """Change the version of the user's time logs once the transaction commits."""
+        pass
+
+    @abstractmethod
+    def add_to_daily_totals(self, time_log: TimeLog) -> None:
+        """Add a completed time log to the per-day rollup."""
+        pass
+
+    @abstractmethod
+    def add_all_to_daily_totals(self, time_logs: List[TimeLog]) -> None:
+        """Add several completed time logs to the per-day rollup."""
+        pass
+
+    @abstractmethod
+    def remove_from_daily_totals(self, time_log: TimeLog) -> None:
+        """Remove a completed time log from the per-day rollup."""
+        pass
+
+    @abstractmethod
+    def get_time_totals(self,
+                        user_id: str,
+                        period: str,
+                        start_date: Optional[date] = None,
+                        end_date: Optional[date] = None) -> List[Dict]:
+        """Get a user's totals grouped by day, week or month."""
+        pass
+
+    @abstractmethod
+    def get_worked_time(self, user_id: str, start: datetime, end: datetime) -> Dict:
+        """Get the user's active time within [start, end), by time log ID."""
+        pass
+
+    @abstractmethod
+    def get_running_at(self, user_id: str, at: datetime) -> List[TimeLog]:
+        """Get the user's time logs that were running at `at`."""
+        pass
+
+    @abstractmethod
+    def get_changes(self, user_id: str, after: Optional[Tuple[int, UUID]], limit: int) -> Dict:
+        """Get the user's time log writes and deletes after a sync position."""
+        pass
+
+    @abstractmethod
+    def compact_tombstones(self, before: datetime) -> int:
+        """Delete the tombstones of logs deleted before `before`."""
+        pass
+
+    @abstractmethod
+    def find_overlaps(self, user_id: str, periods: List[Tuple[datetime, datetime]]) -> Dict[int, List[Dict]]:
+        """Get what overlaps each of the periods, by the period's index."""
+        pass
+
+class TimeLogArchiveInterface(ABC):
+    """Cold storage for old completed time logs, grouped by user and month."""
+
+    @abstractmethod
+    def archive_user_logs(self, user_id: str, before: datetime) -> int:
+        """Move the user's completed logs created before `before` into the archive."""
+        pass
+
+    @abstractmethod
+    def get_logs(self,
+                 user_id: Optional[str] = None,
+                 status: Optional[str] = None,
+                 ranges: Optional[Dict[str, Tuple[Optional[datetime], Optional[datetime]]]] = None,
+                 search: str = '') -> Iterator[TimeLog]:
+        """
+        Iterate over archived logs, newest first, of one user (or everyone) matching
+        the status, the [lower, upper) timestamp ranges by field and the
+        search words.
+        """
+        pass
+
+class TimerEventBrokerInterface(ABC):
+    """
+    Publish/subscribe channel for timer state changes, one topic per user.
+
+    Events are dicts of plain values (strings, datetimes, timedeltas, UUIDs);
+    a broker shared between processes must be able to pickle them.
+    """
+
+    @abstractmethod
+    def publish(self, user_id: str, event: Dict) -> None:
+        """Deliver an event to the user's subscribers. Safe to call from any thread."""
+        pass
+
+    @abstractmethod
+    def subscribe(self, user_id: str) -> AsyncContextManager[AsyncIterator[Dict]]:
+        """Async context manager yielding the user's events as they are published."""
+        pass
+
 class TimeTrackingServiceInterface(ABC):
     """Service interface for time tracking operations."""
     
@@ -54,7 +196,55 @@ class TimeTrackingServiceInterface(ABC):
         """Stop an active timer."""
         pass
 
+    @abstractmethod
+    def transition_many(self,
+                        action: str,
+                        time_log_ids: Optional[List[str]] = None,
+                        user_ids: Optional[List[str]] = None,
+                        statuses: Optional[List[str]] = None) -> List[Dict]:
+        """Pause or stop many timers at once, with per-log outcomes."""
+        pass
+
+    @abstractmethod
+    def get_changes(self, user_id: str, after: Optional[Tuple[int, UUID]], limit: int) -> Dict:
+        """Get a batch of a user's time log changes for delta sync."""
+        pass
+
     @abstractmethod
     def add_manual_time(self, user_id: str, description: str, duration: timedelta) -> TimeLog:
         """Add a manual time entry."""
         pass
+
+    @abstractmethod
+    def add_manual_time_entries(self, user_id: str, entries: List[Dict], overlap: Optional[str] = None) -> List[TimeLog]:
+        """Add many manual time entries at once."""
+        pass
+
+    @abstractmethod
+    def delete_time_log(self, time_log_id: str) -> bool:
+        """Delete a time log entry."""
+        pass
+
+    @abstractmethod
+    def get_active_timer(self, user_id: str) -> Optional[TimeLog]:
+        """Get the user's current running or paused timer."""
+        pass
+
+    @abstractmethod
+    def get_time_totals(self,
+                        user_id: str,
+                        period: str = 'day',
+                        start_date: Optional[date] = None,
+                        end_date: Optional[date] = None) -> List[Dict]:
+        """Get a user's daily, weekly or monthly totals, optionally between two days."""
+        pass
+
+    @abstractmethod
+    def get_worked_time(self, user_id: str, start: datetime, end: datetime) -> Dict:
+        """Get a user's exact active time within a time window."""
+        pass
+
+    @abstractmethod
+    def get_running_at(self, user_id: str, at: datetime) -> List[TimeLog]:
+        """Get a user's time logs that were running at a given moment."""
+        pass
@@ -1,7 +1,12 @@
 import uuid
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta, tzinfo
+from typing import List, Tuple
+from django.contrib.postgres.fields import DateTimeRangeField
+from django.contrib.postgres.indexes import GinIndex, GistIndex, OpClass
+from django.contrib.postgres.search import SearchVector
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class TimeLog(models.Model):
     """TimeLog entity representing a time tracking entry."""
@@ -12,6 +17,16 @@ class TimeLog(models.Model):
         PAUSED = 'PAUSED', 'Paused'
         COMPLETED = 'COMPLETED', 'Completed'
 
+    STATUS_LABELS = dict(Status.choices)
+
+    # Timer state machine: action -> (statuses it is allowed from, resulting status)
+    TRANSITIONS = {
+        'start': ((Status.CREATED, Status.PAUSED), Status.RUNNING),
+        'pause': ((Status.RUNNING,), Status.PAUSED),
+        'resume': ((Status.PAUSED,), Status.RUNNING),
+        'stop': ((Status.RUNNING, Status.PAUSED), Status.COMPLETED),
+    }
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     description = models.TextField()
@@ -27,9 +42,44 @@ class TimeLog(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # ID of the transaction that last wrote the row, set by a database
+    # trigger; delta sync reads changes in this order
+    change_xid = models.BigIntegerField(null=True, editable=False)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Per-user listings for each ordering the API exposes; `id` is the
+            # keyset pagination tiebreak.
+            models.Index(fields=['user', '-created_at', '-id'], name='timelog_user_created_idx'),
+            models.Index(fields=['user', 'start_time', 'id'], name='timelog_user_start_idx'),
+            models.Index(fields=['user', 'end_time', 'id'], name='timelog_user_end_idx'),
+            models.Index(fields=['user', 'duration', 'id'], name='timelog_user_duration_idx'),
+            # Listings across all users (staff, admin changelist)
+            models.Index(fields=['-created_at', '-id'], name='timelog_created_idx'),
+            # Status filter with the default ordering
+            models.Index(fields=['user', 'status', '-created_at'], name='timelog_user_status_idx'),
+            # Delta sync keyset
+            models.Index(fields=['user', 'change_xid', 'id'], name='timelog_user_change_idx'),
+            # Small index over the handful of timers that are still in progress
+            models.Index(
+                fields=['user'],
+                condition=models.Q(status__in=['RUNNING', 'PAUSED']),
+                name='timelog_user_active_idx',
+            ),
+            # Description search (see TimeLogSearchFilter): word prefixes
+            # through full-text search, misspellings through trigrams
+            GinIndex(SearchVector('description', config='simple'), name='timelog_description_fts_idx'),
+            GinIndex(OpClass('description', name='gin_trgm_ops'), name='timelog_description_trgm_idx'),
+        ]
+        constraints = [
+            # A user tracks at most one running timer at a time
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(status='RUNNING'),
+                name='timelog_one_running_per_user',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.description[:30]}"
@@ -53,4 +103,183 @@ class TimeLog(models.Model):
         Returns:
             str: Descriptive status
         """
-        return dict(self.Status.choices).get(self.status, self.status)
+        return self.STATUS_LABELS.get(self.status, self.status)
+
+    def get_daily_totals(self, tz: tzinfo) -> List[Tuple[date, timedelta, timedelta, int]]:
+        """
+        Split a finished log into per-day totals.
+
+        The wall-clock span ends at `end_time` and covers the active plus the
+        paused duration (or starts at `start_time` if that is earlier, for
+        manual entries with an explicit end). Active and paused time are
+        spread over the days of that span in proportion to the overlap, and
+        the entry is counted on the day it started.
+
+        Args:
+            tz (tzinfo): Time zone whose calendar days are used
+
+        Returns:
+            list: (day, active duration, paused duration, entry count) tuples
+        """
+        end = self.end_time or self.start_time
+        if end is None:
+            return []
+
+        start = end - (self.duration + self.paused_duration)
+        if self.start_time and self.start_time < start:
+            start = self.start_time
+        start, end = timezone.localtime(start, tz), timezone.localtime(end, tz)
+
+        span = (end - start) // timedelta(microseconds=1)
+        active = self.duration // timedelta(microseconds=1)
+        paused = self.paused_duration // timedelta(microseconds=1)
+        if span <= 0:
+            return [(start.date(), self.duration, self.paused_duration, 1)]
+
+        days = []
+        day = start.date()
+        while day <= end.date():
+            day_start = timezone.make_aware(datetime.combine(day, time.min), tz)
+            day_end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), tz)
+            overlap = (min(end, day_end) - max(start, day_start)) // timedelta(microseconds=1)
+            if overlap > 0:
+                days.append((day, overlap))
+            day += timedelta(days=1)
+
+        totals = []
+        active_left, paused_left = active, paused
+        for index, (day, overlap) in enumerate(days):
+            if index == len(days) - 1:
+                # The last day takes the remainder so the parts add up exactly
+                day_active, day_paused = active_left, paused_left
+            else:
+                day_active, day_paused = active * overlap // span, paused * overlap // span
+            active_left -= day_active
+            paused_left -= day_paused
+            totals.append((
+                day,
+                timedelta(microseconds=day_active),
+                timedelta(microseconds=day_paused),
+                1 if index == 0 else 0,
+            ))
+        return totals
+
+
+class TimeLogInterval(models.Model):
+    """
+    One run of a timer: from a start or resume to the next pause or stop.
+
+    Written by the timer transitions, so a log's intervals add up to its
+    `duration` and place every second of it in time. The interval of a
+    running timer has no upper bound. Manual entries get one interval from
+    their `start_time`.
+
+    `time_log` is not a database foreign key: a partitioned time log table
+    cannot be referenced by one, and intervals outlive archiving and
+    detached partitions. Deleting a log through the repository deletes its
+    intervals.
+    """
+    time_log = models.ForeignKey(
+        TimeLog,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='intervals',
+    )
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    period = DateTimeRangeField()
+
+    class Meta:
+        indexes = [
+            # Per-user overlap (&&) and containment (@>) queries on the
+            # periods; btree_gist indexes `user` alongside the range
+            GistIndex(fields=['user', 'period'], name='interval_user_period_idx'),
+        ]
+        constraints = [
+            # The open interval of a running timer, closed by pause and stop
+            models.UniqueConstraint(
+                fields=['time_log'],
+                condition=models.Q(period__upper_inf=True),
+                name='interval_one_open_per_log',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.time_log_id} - {self.period}"
+
+
+class TimeLogTombstone(models.Model):
+    """
+    Marks a deleted time log for delta sync, so clients can drop it.
+
+    Written by the repository when it deletes a log, and removed by the
+    compact_timelog_tombstones command once every cursor that could still
+    miss it has expired. `change_xid` is set by the same trigger as on
+    TimeLog.
+    """
+    time_log_id = models.UUIDField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    deleted_at = models.DateTimeField(default=timezone.now)
+    change_xid = models.BigIntegerField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'change_xid', 'time_log_id'], name='tombstone_user_change_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.time_log_id} - {self.deleted_at}"
+
+
+class DailyTimeTotal(models.Model):
+    """
+    Per-user, per-day rollup of completed time logs.
+
+    Kept up to date by TimeTrackingService in the same transaction as the
+    log change it reflects, and rebuilt by the rebuild_time_totals command.
+    Days are calendar days in the default time zone.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    day = models.DateField()
+    active_duration = models.DurationField(default=timedelta)
+    paused_duration = models.DurationField(default=timedelta)
+    entry_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='daily_total_user_day_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.day}"
+
+
+class TimeLogArchiveSegment(models.Model):
+    """
+    Completed time logs of one user and month, moved out of the TimeLog
+    table by the archive_timelogs command.
+
+    The logs are kept as gzip-compressed JSON lines in `data`. The other
+    columns are the segment's manifest entry: filtered reads use them to
+    open only the segments that can hold matching logs. Months are UTC
+    calendar months of `created_at`.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    month = models.DateField()
+    log_count = models.IntegerField()
+    min_start_time = models.DateTimeField(null=True)
+    max_start_time = models.DateTimeField(null=True)
+    min_end_time = models.DateTimeField(null=True)
+    max_end_time = models.DateTimeField(null=True)
+    data = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['user', 'month']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month'], name='archive_segment_user_month_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.month:%Y-%m}"
@@ -0,0 +1,193 @@
+import gzip
+import json
+import re
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.duration import duration_string
+from ..domain.interfaces import TimeLogArchiveInterface
+from ..domain.models import TimeLog, TimeLogArchiveSegment
+from .cache import invalidate_user_logs
+from .partitions import month_start
+
+FIELDS = {field.attname: field for field in TimeLog._meta.concrete_fields}
+
+
+def encode_value(value):
+    # Unlike DjangoJSONEncoder, keeps the microseconds of datetimes
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return duration_string(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f'Cannot archive {value!r}')
+
+
+def encode_rows(rows: Iterable[Dict]) -> bytes:
+    """Gzip-compressed JSON lines of time log rows (field values by attname)."""
+    lines = ''.join(json.dumps(row, default=encode_value, ensure_ascii=False) + '\n' for row in rows)
+    return gzip.compress(lines.encode())
+
+
+def decode_rows(data: bytes) -> List[Dict]:
+    return [
+        {name: FIELDS[name].to_python(value) for name, value in json.loads(line).items()}
+        for line in gzip.decompress(bytes(data)).decode().splitlines()
+    ]
+
+
+def in_range(value, lower, upper) -> bool:
+    return value is not None and (lower is None or value >= lower) and (upper is None or value < upper)
+
+
+def matches_search(description: str, words: List[str]) -> bool:
+    """Every search word is a prefix of a description word, like the full-text search."""
+    description_words = re.findall(r'\w+', description.lower())
+    return all(any(candidate.startswith(word) for candidate in description_words) for word in words)
+
+
+class DjangoTimeLogArchive(TimeLogArchiveInterface):
+    """
+    Archive of completed time logs in TimeLogArchiveSegment rows, one per
+    user and UTC month of `created_at`.
+
+    Archived logs are read-only: they are left out of the API listing and
+    of every write, and read back through get_logs() for the reads that
+    have to cover the whole history (exports, get_user_logs, rollups).
+    get_logs() is lazy, so exports stream the archive like the hot table.
+    """
+
+    def archive_user_logs(self, user_id: str, before: datetime) -> int:
+        logs = TimeLog.objects.filter(user_id=user_id, status=TimeLog.Status.COMPLETED, created_at__lt=before)
+        months = (
+            logs.annotate(month=TruncMonth('created_at', tzinfo=dt_timezone.utc))
+            .values_list('month', flat=True)
+            .order_by('month')
+            .distinct()
+        )
+
+        archived = 0
+        for month in list(months):
+            with transaction.atomic():
+                # Locked, so an edit racing the archiving cannot get lost
+                rows = list(
+                    logs.filter(created_at__gte=month, created_at__lt=month_start(month, 1))
+                    .select_for_update()
+                    .order_by('created_at')
+                    .values(*FIELDS)
+                )
+                if rows:
+                    self.add_to_segment(user_id, month, rows)
+                    TimeLog.objects.filter(id__in=[row['id'] for row in rows]).delete()
+                    # Gone from the API listing
+                    invalidate_user_logs(user_id)
+                    archived += len(rows)
+        return archived
+
+    def add_to_segment(self, user_id: str, month: datetime, rows: List[Dict]) -> TimeLogArchiveSegment:
+        """Append rows to the user's segment of `month`, creating it if needed."""
+        segment = (
+            TimeLogArchiveSegment.objects.select_for_update()
+            .filter(user_id=user_id, month=month.date())
+            .first()
+        )
+        if segment is None:
+            segment = TimeLogArchiveSegment(user_id=user_id, month=month.date())
+        else:
+            rows = decode_rows(segment.data) + rows
+
+        start_times = [row['start_time'] for row in rows if row['start_time'] is not None]
+        end_times = [row['end_time'] for row in rows if row['end_time'] is not None]
+        segment.log_count = len(rows)
+        segment.min_start_time = min(start_times, default=None)
+        segment.max_start_time = max(start_times, default=None)
+        segment.min_end_time = min(end_times, default=None)
+        segment.max_end_time = max(end_times, default=None)
+        segment.data = encode_rows(rows)
+        segment.save()
+        return segment
+
+    def get_segments(self, user_id: Optional[str], ranges: Dict):
+        """The manifest entries of the segments that can hold logs in `ranges`."""
+        segments = TimeLogArchiveSegment.objects.all()
+        if user_id is not None:
+            segments = segments.filter(user_id=user_id)
+
+        lower, upper = ranges.get('created_at', (None, None))
+        if lower is not None:
+            segments = segments.filter(month__gte=month_start(lower).date())
+        if upper is not None:
+            segments = segments.filter(month__lte=month_start(upper - timedelta(microseconds=1)).date())
+        for field in ['start_time', 'end_time']:
+            lower, upper = ranges.get(field, (None, None))
+            if lower is not None:
+                segments = segments.filter(**{f'max_{field}__gte': lower})
+            if upper is not None:
+                segments = segments.filter(**{f'min_{field}__lt': upper})
+        return segments
+
+    def get_logs(self,
+                 user_id: Optional[str] = None,
+                 status: Optional[str] = None,
+                 ranges: Optional[Dict[str, Tuple[Optional[datetime], Optional[datetime]]]] = None,
+                 search: str = '') -> Iterator[TimeLog]:
+        """
+        Yield the matching logs newest first. Segments are read one month
+        at a time, so a reader that stops early, or streams the logs out,
+        never holds more than a month of them.
+        """
+        if status and status != TimeLog.Status.COMPLETED:
+            return
+
+        ranges = ranges or {}
+        words = re.findall(r'\w+', search.lower())
+        # The manifest only: each segment's data is fetched when it is opened
+        segments = self.get_segments(user_id, ranges).select_related('user').defer('data').order_by('-month', 'user')
+        for _, month_segments in groupby(segments, key=lambda segment: segment.month):
+            time_logs = []
+            for segment in month_segments:
+                data = TimeLogArchiveSegment.objects.values_list('data', flat=True).get(pk=segment.pk)
+                for row in decode_rows(data):
+                    if not all(in_range(row[field], *bounds) for field, bounds in ranges.items()):
+                        continue
+                    if words and not matches_search(row['description'], words):
+                        continue
+                    time_log = TimeLog(**row)
+                    time_log.user = segment.user
+                    time_logs.append(time_log)
+
+            # Segments hold a UTC month of created_at, so months come out in order
+            time_logs.sort(key=lambda time_log: time_log.created_at, reverse=True)
+            yield from time_logs
+
+
+def archive_completed_logs(months: Optional[int] = None, user_ids: Optional[Iterable] = None) -> Tuple[int, int]:
+    """
+    Archive every user's completed logs created before the month that is
+    `months` (TIMELOGS_ARCHIVE_AFTER_MONTHS) months before the current one.
+    Entry point for schedulers; safe to run repeatedly.
+
+    Returns:
+        tuple: (users whose logs were archived, archived log count)
+    """
+    if months is None:
+        months = settings.TIMELOGS_ARCHIVE_AFTER_MONTHS
+    before = month_start(timezone.now(), -months)
+    if user_ids is None:
+        user_ids = get_user_model().objects.order_by('pk').values_list('pk', flat=True).iterator()
+
+    archive = DjangoTimeLogArchive()
+    user_count = log_count = 0
+    for user_id in user_ids:
+        archived = archive.archive_user_logs(user_id, before)
+        if archived:
+            user_count += 1
+            log_count += archived
+    return user_count, log_count
@@ -0,0 +1,40 @@
+import time
+from django.core.cache import cache
+from django.db import transaction
+from core.db_routers import pin_to_primary
+
+# Every write to a user's time logs bumps a per-user version once it
+# commits, so the version changes whenever any of their logs could read
+# differently. HTTP validators of the time log reads are derived from it.
+
+
+def get_user_logs_version(user_id) -> int:
+    key = _get_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from a value no earlier version of this key can have reached
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_user_logs(user_id) -> None:
+    """
+    Bump the user's time log version once the current transaction commits.
+
+    Their reads are kept on the primary first: a lagging replica would
+    otherwise pair the new version with the old rows.
+    """
+    def bump_version():
+        pin_to_primary(user_id)
+        try:
+            cache.incr(_get_version_key(user_id))
+        except ValueError:
+            # No version yet (or evicted): the next read starts a fresh one
+            pass
+
+    transaction.on_commit(bump_version)
+
+
+def _get_version_key(user_id) -> str:
+    return f'timelogs:logs:{user_id}:version'
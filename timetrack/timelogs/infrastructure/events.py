@@ -0,0 +1,90 @@
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Dict
+from django.conf import settings
+from django.utils.module_loading import import_string
+from ..domain.interfaces import TimerEventBrokerInterface
+
+
+class Subscription:
+    """
+    One subscriber's queue of events, bound to the event loop it was created on.
+
+    Events may be put from any thread. When a slow consumer lets the queue
+    fill up, the oldest event is dropped: events carry the full timer state,
+    so later ones supersede it.
+    """
+
+    def __init__(self, queue_size: int):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def put(self, event: Dict) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The subscriber's event loop is already closed
+            pass
+
+    def _put(self, event: Dict) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict:
+        return await self.queue.get()
+
+
+class InProcessTimerEventBroker(TimerEventBrokerInterface):
+    """
+    Timer event broker for a single process.
+
+    Only subscribers in the publishing process receive events, so it suits
+    one worker (or sticky routing of each user to one worker). Point
+    TIMELOGS_EVENT_BROKER at a broker backed by a shared channel, such as
+    Redis pub/sub, when running several.
+    """
+
+    def __init__(self, queue_size: int = None):
+        self.queue_size = queue_size or settings.TIMELOGS_STREAM_QUEUE_SIZE
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def publish(self, user_id: str, event: Dict) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(str(user_id), ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: str) -> AsyncIterator[Subscription]:
+        key = str(user_id)
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            self._subscriptions[key].add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                self._subscriptions[key].discard(subscription)
+                if not self._subscriptions[key]:
+                    del self._subscriptions[key]
+
+    def subscriber_count(self, user_id: str = None) -> int:
+        """Number of open subscriptions, for one user or in total."""
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscriptions.get(str(user_id), ()))
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+@lru_cache(maxsize=None)
+def get_timer_event_broker() -> TimerEventBrokerInterface:
+    """The process-wide broker configured by TIMELOGS_EVENT_BROKER."""
+    return import_string(settings.TIMELOGS_EVENT_BROKER)()
@@ -0,0 +1,149 @@
+import re
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import django_filters
+from django import forms
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework.filters import SearchFilter
+
+from ..domain.models import TimeLog
+
+
+class TimeZoneField(forms.CharField):
+    """Form field turning an IANA time zone name into a `ZoneInfo`."""
+
+    def to_python(self, value):
+        value = super().to_python(value)
+        if not value:
+            return None
+        try:
+            return ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise forms.ValidationError(_('Unknown time zone "%(value)s".'), params={'value': value})
+
+
+class TimeZoneFilter(django_filters.Filter):
+    """
+    Carries the time zone used to interpret the date filters.
+    It does not filter anything on its own.
+    """
+    field_class = TimeZoneField
+
+    def filter(self, qs, value):
+        return qs
+
+
+class TimeLogFilter(django_filters.FilterSet):
+    """
+    Filters for time log listings.
+
+    `start_date` and `end_date` are calendar days in the `tz` time zone (the
+    active Django time zone by default). They are turned into half-open
+    timestamp ranges on the raw `start_time`/`end_time` columns, so the
+    per-user indexes on those columns can serve them. `created_from` and
+    `created_to` do the same on `created_at`, the partition key once the
+    table is partitioned (see partition_timelogs), so they also limit the
+    months that are scanned.
+    """
+    status = django_filters.ChoiceFilter(choices=TimeLog.Status.choices)
+    start_date = django_filters.DateFilter(method='filter_start_date')
+    end_date = django_filters.DateFilter(method='filter_end_date')
+    created_from = django_filters.DateFilter(method='filter_created_from')
+    created_to = django_filters.DateFilter(method='filter_created_to')
+    tz = TimeZoneFilter()
+
+    class Meta:
+        model = TimeLog
+        fields = ['status', 'start_time', 'end_time', 'created_at']
+
+    def get_timezone(self):
+        return self.form.cleaned_data.get('tz') or timezone.get_current_timezone()
+
+    def start_of_day(self, day: date) -> datetime:
+        """Return the first instant of `day` in the filter time zone."""
+        return timezone.make_aware(datetime.combine(day, time.min), self.get_timezone())
+
+    def filter_start_date(self, queryset, name, value):
+        """Logs started on or after the beginning of `value`."""
+        return queryset.filter(start_time__gte=self.start_of_day(value))
+
+    def filter_end_date(self, queryset, name, value):
+        """Logs ended before the day following `value` begins."""
+        return queryset.filter(end_time__lt=self.start_of_day(value + timedelta(days=1)))
+
+    def filter_created_from(self, queryset, name, value):
+        """Logs created on or after the beginning of `value`."""
+        return queryset.filter(created_at__gte=self.start_of_day(value))
+
+    def filter_created_to(self, queryset, name, value):
+        """Logs created before the day following `value` begins."""
+        return queryset.filter(created_at__lt=self.start_of_day(value + timedelta(days=1)))
+
+    def get_ranges(self) -> Dict[str, Tuple[Optional[datetime], Optional[datetime]]]:
+        """
+        The timestamp filters as half-open [lower, upper) ranges by field,
+        for reads that do not go through the ORM (see the time log archive).
+        Call after is_valid().
+        """
+        data = self.form.cleaned_data
+        ranges = {}
+
+        def narrow(field, lower=None, upper=None):
+            current_lower, current_upper = ranges.get(field, (None, None))
+            if lower is not None and (current_lower is None or lower > current_lower):
+                current_lower = lower
+            if upper is not None and (current_upper is None or upper < current_upper):
+                current_upper = upper
+            ranges[field] = (current_lower, current_upper)
+
+        for field in ['start_time', 'end_time', 'created_at']:
+            if data.get(field):
+                narrow(field, data[field], data[field] + timedelta(microseconds=1))
+        if data.get('start_date'):
+            narrow('start_time', lower=self.start_of_day(data['start_date']))
+        if data.get('end_date'):
+            narrow('end_time', upper=self.start_of_day(data['end_date'] + timedelta(days=1)))
+        if data.get('created_from'):
+            narrow('created_at', lower=self.start_of_day(data['created_from']))
+        if data.get('created_to'):
+            narrow('created_at', upper=self.start_of_day(data['created_to'] + timedelta(days=1)))
+        return ranges
+
+
+class TimeLogSearchFilter(SearchFilter):
+    """
+    Ranked search over time log descriptions.
+
+    On PostgreSQL every search word matches as a word prefix through the
+    full-text index, and the whole search text also matches misspelt words
+    through the trigram index. Results are ordered by text rank plus
+    trigram similarity unless the request asks for an `ordering` (cursor
+    pagination always applies its own). Other databases keep DRF's
+    `icontains` search over `search_fields`.
+    """
+    config = 'simple'
+
+    def filter_queryset(self, request, queryset, view):
+        if connections[queryset.db].vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        words = [word for term in self.get_search_terms(request) for word in re.findall(r'\w+', term)]
+        if not words:
+            return queryset
+
+        text = ' '.join(words)
+        vector = SearchVector('description', config=self.config)
+        query = SearchQuery(' & '.join(f'{word}:*' for word in words), search_type='raw', config=self.config)
+        return (
+            queryset
+            .alias(search_document=vector)
+            .filter(Q(search_document=query) | Q(description__trigram_word_similar=text))
+            .alias(search_rank=SearchRank(vector, query) + TrigramWordSimilarity(text, 'description'))
+            .order_by('-search_rank', '-created_at', '-id')
+        )
@@ -0,0 +1,59 @@
+from datetime import datetime, timezone as dt_timezone
+from typing import List, NamedTuple, Optional
+from django.db import connection
+from ..domain.models import TimeLog
+
+# The time log table can be converted into a table partitioned by month on
+# `created_at` (see the partition_timelogs command). Partitions cover whole
+# UTC months and are named after them; the rows that existed before the
+# conversion stay in one legacy partition reaching back to MINVALUE.
+
+LEGACY_PARTITION = f'{TimeLog._meta.db_table}_legacy'
+
+
+class Partition(NamedTuple):
+    name: str
+    start: Optional[datetime]  # None for MINVALUE
+    end: datetime
+
+
+def month_start(moment: datetime, months: int = 0) -> datetime:
+    """First instant (UTC) of the month `months` after the one holding `moment`."""
+    moment = moment.astimezone(dt_timezone.utc)
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def get_partition_name(start: datetime) -> str:
+    return f'{TimeLog._meta.db_table}_p{start:%Y_%m}'
+
+
+def is_partitioned() -> bool:
+    """Whether the time log table is a partitioned table."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)',
+            [TimeLog._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def get_partitions() -> List[Partition]:
+    """Partitions of the time log table, oldest first."""
+    with connection.cursor() as cursor:
+        # Let PostgreSQL parse the bounds it printed itself
+        cursor.execute(
+            r"""
+            SELECT child.relname,
+                   (regexp_match(bound, 'FROM \(''([^'']*)''\)'))[1]::timestamptz,
+                   (regexp_match(bound, 'TO \(''([^'']*)''\)'))[1]::timestamptz
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid,
+            LATERAL pg_get_expr(child.relpartbound, child.oid) AS bound
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            ORDER BY 3
+            """,
+            [TimeLog._meta.db_table]
+        )
+        return [Partition(*row) for row in cursor.fetchall()]
@@ -1,49 +1,509 @@
-from typing import List, Optional
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, connections, router, transaction
+from django.contrib.postgres.fields import DateTimeRangeField
+from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+from django.db.models import DateField, DateTimeField, F, Func, Q, Sum, Value
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
 from django.shortcuts import get_object_or_404
-from ..domain.interfaces import TimeLogRepositoryInterface
-from ..domain.models import TimeLog
+from django.utils import timezone
+from core.instrumentation import instrumented
+from ..domain.interfaces import TimeLogArchiveInterface, TimeLogRepositoryInterface
+from ..domain.models import DailyTimeTotal, TimeLog, TimeLogInterval, TimeLogTombstone
+from .archive import DjangoTimeLogArchive
+from .cache import get_user_logs_version, invalidate_user_logs
+from .filters import TimeLogFilter
 
+@instrumented('repository')
 class DjangoTimeLogRepository(TimeLogRepositoryInterface):
     """Django ORM implementation of the TimeLog repository."""
 
+    # SET clauses for each timer transition, evaluated against the old row.
+    # Running time is added to `duration` and paused time to
+    # `paused_duration` in SQL, so concurrent transitions cannot lose updates.
+    TRANSITION_ASSIGNMENTS = {
+        'start': """
+            paused_duration = paused_duration + COALESCE(%(now)s - pause_start_time, INTERVAL '0'),
+            pause_start_time = NULL,
+            start_time = %(now)s
+        """,
+        'pause': """
+            duration = duration + (%(now)s - start_time),
+            pause_start_time = %(now)s
+        """,
+        'resume': """
+            paused_duration = paused_duration + COALESCE(%(now)s - pause_start_time, INTERVAL '0'),
+            pause_start_time = NULL,
+            start_time = %(now)s
+        """,
+        'stop': """
+            duration = duration + CASE WHEN status = %(running)s THEN %(now)s - start_time ELSE INTERVAL '0' END,
+            paused_duration = paused_duration + COALESCE(%(now)s - pause_start_time, INTERVAL '0'),
+            pause_start_time = NULL,
+            end_time = %(now)s
+        """,
+    }
+
+    # Statements run alongside each transition's UPDATE (as `updated`):
+    # starts and resumes open an interval, pauses and stops close it.
+    OPEN_INTERVAL = """
+        INSERT INTO {intervals} (time_log_id, user_id, period)
+        SELECT id, user_id, tstzrange(%(now)s, NULL) FROM updated
+    """
+    # A racing writer's clock may be behind the one that opened the
+    # interval: it closes empty rather than with bounds out of order
+    CLOSE_INTERVAL = """
+        UPDATE {intervals} SET period = tstzrange(lower(period), GREATEST(lower(period), %(now)s))
+        WHERE time_log_id IN (SELECT id FROM updated) AND upper_inf(period)
+    """
+    TRANSITION_INTERVALS = {
+        'start': OPEN_INTERVAL,
+        'pause': CLOSE_INTERVAL,
+        'resume': OPEN_INTERVAL,
+        'stop': CLOSE_INTERVAL,
+    }
+
+    # Probes the GiST index on (user, period) once per new entry
+    OVERLAP_QUERY = """
+        SELECT entry.ordinal, recorded.time_log_id, lower(recorded.period), upper(recorded.period)
+        FROM unnest(%(ordinals)s::integer[], %(lowers)s::timestamptz[], %(uppers)s::timestamptz[])
+            AS entry(ordinal, lower_bound, upper_bound)
+        JOIN {intervals} AS recorded
+            ON recorded.user_id = %(user_id)s
+            AND recorded.period && tstzrange(entry.lower_bound, entry.upper_bound)
+        ORDER BY entry.ordinal, lower(recorded.period)
+    """
+
+    # First key of the per-user advisory lock taken by find_overlaps
+    OVERLAP_LOCK_NAMESPACE = 7301
+
+    # Bounds of the delta sync positions within a transaction
+    MIN_UUID = uuid.UUID(int=0)
+    MAX_UUID = uuid.UUID(int=2 ** 128 - 1)
+
+    BULK_BATCH_SIZE = 1000
+
+    PERIOD_FUNCTIONS = {
+        'day': TruncDay,
+        'week': TruncWeek,
+        'month': TruncMonth,
+    }
+
+    ACTIVE_STATUSES = (TimeLog.Status.RUNNING, TimeLog.Status.PAUSED)
+
+    def __init__(self, archive: Optional[TimeLogArchiveInterface] = None):
+        self.archive = archive or DjangoTimeLogArchive()
+
     def create(self, user_id: str, description: str) -> TimeLog:
-        return TimeLog.objects.create(
+        time_log = TimeLog.objects.create(
             user_id=user_id,
             description=description
         )
+        self.invalidate_user_logs(user_id)
+        return time_log
+
+    def create_many(self, time_logs: List[TimeLog]) -> List[TimeLog]:
+        time_logs = TimeLog.objects.bulk_create(time_logs, batch_size=self.BULK_BATCH_SIZE)
+        TimeLogInterval.objects.bulk_create(
+            [
+                TimeLogInterval(time_log=time_log, user_id=time_log.user_id, period=period)
+                for time_log in time_logs
+                if (period := self._get_initial_period(time_log)) is not None
+            ],
+            batch_size=self.BULK_BATCH_SIZE
+        )
+        for user_id in {time_log.user_id for time_log in time_logs}:
+            self.invalidate_user_logs(user_id)
+        for user_id in {time_log.user_id for time_log in time_logs if time_log.status in self.ACTIVE_STATUSES}:
+            self.invalidate_active_timer(user_id)
+        return time_logs
+
+    def _get_initial_period(self, time_log: TimeLog) -> Optional[DateTimeTZRange]:
+        """The interval a new log starts out with: running, or a manual entry."""
+        if time_log.start_time is None:
+            return None
+        if time_log.status == TimeLog.Status.RUNNING:
+            return DateTimeTZRange(time_log.start_time, None)
+        if time_log.status == TimeLog.Status.COMPLETED and time_log.duration:
+            return DateTimeTZRange(time_log.start_time, time_log.start_time + time_log.duration)
+        return None
 
     def get_by_id(self, time_log_id: str) -> Optional[TimeLog]:
         try:
             return TimeLog.objects.get(id=time_log_id)
-        except TimeLog.DoesNotExist:
+        except (TimeLog.DoesNotExist, ValidationError):
             return None
 
     def get_user_logs(self, user_id: str, **filters) -> List[TimeLog]:
-        queryset = TimeLog.objects.filter(user_id=user_id)
-        
-        # Apply filters
-        status = filters.get('status')
-        if status:
-            queryset = queryset.filter(status=status)
-            
-        start_date = filters.get('start_date')
-        if start_date:
-            queryset = queryset.filter(created_at__gte=start_date)
-            
-        end_date = filters.get('end_date')
-        if end_date:
-            queryset = queryset.filter(created_at__lte=end_date)
-            
-        return list(queryset)
+        # Same filters (status, start_date, end_date, tz) as the API listing
+        filterset = self._get_filterset(filters, TimeLog.objects.filter(user_id=user_id))
+        time_logs = list(filterset.qs) + list(self.get_archived_logs(user_id, filters))
+        time_logs.sort(key=lambda time_log: time_log.created_at, reverse=True)
+        return time_logs
+
+    def get_archived_logs(self, user_id: Optional[str], filters: Dict, search: str = '') -> Iterator[TimeLog]:
+        filterset = self._get_filterset(filters, TimeLog.objects.none())
+        return self.archive.get_logs(
+            user_id,
+            status=filterset.form.cleaned_data.get('status'),
+            ranges=filterset.get_ranges(),
+            search=search,
+        )
+
+    def _get_filterset(self, filters: Dict, queryset) -> TimeLogFilter:
+        filterset = TimeLogFilter(filters, queryset=queryset)
+        if not filterset.is_valid():
+            raise ValueError(f"Invalid time log filters: {filterset.errors.as_text()}")
+        return filterset
 
     def update(self, time_log: TimeLog) -> TimeLog:
         time_log.save()
+        self.invalidate_active_timer(time_log.user_id)
+        self.invalidate_user_logs(time_log.user_id)
         return time_log
 
+    def transition(self, time_log_id: str, action: str, at: datetime) -> Optional[TimeLog]:
+        try:
+            time_log_id = TimeLog._meta.pk.to_python(time_log_id)
+        except ValidationError:
+            return None
+
+        # A single conditional UPDATE, with its interval change: no prior
+        # read, and zero rows back means the log is missing or the
+        # transition is not allowed.
+        time_logs = self._apply_transition(action, at, 'id = %(id)s', {'id': time_log_id})
+        return time_logs[0] if time_logs else None
+
+    def transition_many(self,
+                        action: str,
+                        at: datetime,
+                        time_log_ids: Optional[List[str]] = None,
+                        user_ids: Optional[List[str]] = None,
+                        statuses: Optional[List[str]] = None) -> List[TimeLog]:
+        """
+        Apply a transition to every matching log that allows it, in one
+        statement. The logs are narrowed by ID, by user and by status;
+        leaving all three out matches every log.
+        """
+        conditions, params = [], {}
+        if time_log_ids is not None:
+            conditions.append('id = ANY(%(ids)s::uuid[])')
+            params['ids'] = [str(time_log_id) for time_log_id in time_log_ids]
+        if user_ids is not None:
+            conditions.append('user_id = ANY(%(user_ids)s::uuid[])')
+            params['user_ids'] = [str(user_id) for user_id in user_ids]
+        if statuses is not None:
+            conditions.append('status IN %(statuses)s')
+            params['statuses'] = tuple(statuses) or (None,)
+        return self._apply_transition(action, at, ' AND '.join(conditions) or 'TRUE', params)
+
+    def _apply_transition(self, action: str, at: datetime, condition: str, params: Dict) -> List[TimeLog]:
+        """Run a transition's UPDATE on the logs matching `condition`."""
+        from_statuses, to_status = TimeLog.TRANSITIONS[action]
+        intervals = connection.ops.quote_name(TimeLogInterval._meta.db_table)
+        sql = f"""
+            WITH updated AS (
+                UPDATE {connection.ops.quote_name(TimeLog._meta.db_table)}
+                SET {self.TRANSITION_ASSIGNMENTS[action]},
+                    status = %(to_status)s,
+                    updated_at = %(now)s
+                WHERE {condition} AND status IN %(from_statuses)s
+                RETURNING *
+            ), updated_interval AS (
+                {self.TRANSITION_INTERVALS[action].format(intervals=intervals)}
+            )
+            SELECT * FROM updated
+        """
+        params = {
+            **params,
+            'now': at,
+            'running': TimeLog.Status.RUNNING.value,
+            'to_status': to_status.value,
+            'from_statuses': tuple(status.value for status in from_statuses),
+        }
+        time_logs = list(TimeLog.objects.db_manager(router.db_for_write(TimeLog)).raw(sql, params))
+        for user_id in {time_log.user_id for time_log in time_logs}:
+            self.invalidate_active_timer(user_id)
+            self.invalidate_user_logs(user_id)
+        return time_logs
+
+    def get_statuses(self, time_log_ids: List[str], user_ids: Optional[List[str]] = None) -> Dict:
+        queryset = TimeLog.objects.filter(id__in=time_log_ids)
+        if user_ids is not None:
+            queryset = queryset.filter(user_id__in=user_ids)
+        return dict(queryset.values_list('id', 'status'))
+
     def delete(self, time_log_id: str) -> bool:
         try:
             time_log = TimeLog.objects.get(id=time_log_id)
-            time_log.delete()
+            # delete() clears the instance's pk
+            log_id = time_log.id
+            with transaction.atomic():
+                time_log.delete()
+                TimeLogInterval.objects.filter(time_log_id=log_id).delete()
+                # Tells delta sync clients to drop the log
+                TimeLogTombstone.objects.create(time_log_id=log_id, user_id=time_log.user_id)
+            self.invalidate_active_timer(time_log.user_id)
+            self.invalidate_user_logs(time_log.user_id)
             return True
         except TimeLog.DoesNotExist:
             return False
+
+    def get_changes(self, user_id: str, after: Optional[Tuple[int, uuid.UUID]], limit: int) -> Dict:
+        """
+        Get the user's logs written and tombstones left after a sync
+        position, oldest change first, and the position to continue from.
+
+        Positions are (change_xid, id) pairs. Only changes of transactions
+        below the snapshot's xmin are returned: all of those have finished,
+        and every later write gets a higher transaction ID. So a change
+        that commits after a newer one is held back rather than skipped.
+        """
+        alias = router.db_for_write(TimeLog)
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT txid_snapshot_xmin(txid_current_snapshot())')
+            horizon = cursor.fetchone()[0]
+
+        xid, last_id = after or (0, self.MIN_UUID)
+        time_logs = (
+            TimeLog.objects.using(alias)
+            .filter(Q(change_xid__gt=xid) | Q(change_xid=xid, id__gt=last_id),
+                    user_id=user_id, change_xid__lt=horizon)
+            .order_by('change_xid', 'id')[:limit + 1]
+        )
+        tombstones = (
+            TimeLogTombstone.objects.using(alias)
+            .filter(Q(change_xid__gt=xid) | Q(change_xid=xid, time_log_id__gt=last_id),
+                    user_id=user_id, change_xid__lt=horizon)
+            .order_by('change_xid', 'time_log_id')[:limit + 1]
+        )
+        changes = sorted(
+            [(time_log.change_xid, time_log.id, time_log) for time_log in time_logs]
+            + [(tombstone.change_xid, tombstone.time_log_id, None) for tombstone in tombstones],
+            key=lambda change: change[:2]
+        )
+
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        if has_more:
+            position = changes[-1][:2]
+        else:
+            # Everything below the horizon has been read
+            position = max((horizon - 1, self.MAX_UUID), (xid, last_id))
+        return {
+            'time_logs': [time_log for _, _, time_log in changes if time_log is not None],
+            'deleted': [time_log_id for _, time_log_id, time_log in changes if time_log is None],
+            'position': position,
+            'has_more': has_more,
+        }
+
+    def compact_tombstones(self, before: datetime) -> int:
+        deleted, _ = TimeLogTombstone.objects.filter(deleted_at__lt=before).delete()
+        return deleted
+
+    def get_worked_time(self, user_id: str, start: datetime, end: datetime) -> Dict:
+        """
+        Sum the user's intervals clipped to [start, end), per time log.
+
+        The GiST index finds the overlapping intervals and the clipping is
+        the intersection (*) of each interval with the window. Open
+        intervals of running timers are clipped at `end` as well.
+        """
+        window = Value(DateTimeTZRange(start, end), output_field=DateTimeRangeField())
+        clipped = Func(F('period'), window, arg_joiner=' * ', template='(%(expressions)s)',
+                       output_field=DateTimeRangeField())
+        rows = (
+            TimeLogInterval.objects
+            .filter(user_id=user_id, period__overlap=DateTimeTZRange(start, end))
+            .values('time_log_id')
+            .annotate(duration=Sum(
+                Func(clipped, function='upper', output_field=DateTimeField())
+                - Func(clipped, function='lower', output_field=DateTimeField())
+            ))
+        )
+        return {row['time_log_id']: row['duration'] for row in rows}
+
+    def find_overlaps(self, user_id: str, periods: List[Tuple[datetime, datetime]]) -> Dict[int, List[Dict]]:
+        """
+        Find the recorded intervals, and the other given periods, that
+        overlap each of the given periods.
+
+        Takes a per-user advisory lock until the end of the transaction, so
+        concurrent writers of the same user that also check for overlaps
+        see each other's entries. Call it in the transaction that inserts
+        the periods.
+        """
+        if not periods:
+            return {}
+
+        alias = router.db_for_write(TimeLogInterval)
+        sql = self.OVERLAP_QUERY.format(intervals=connections[alias].ops.quote_name(TimeLogInterval._meta.db_table))
+        overlaps = defaultdict(list)
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(%s, hashtext(%s))',
+                [self.OVERLAP_LOCK_NAMESPACE, str(user_id)]
+            )
+            cursor.execute(sql, {
+                'user_id': user_id,
+                'ordinals': list(range(len(periods))),
+                'lowers': [lower for lower, _ in periods],
+                'uppers': [upper for _, upper in periods],
+            })
+            for index, time_log_id, lower, upper in cursor.fetchall():
+                overlaps[index].append({'time_log_id': time_log_id, 'index': None,
+                                        'start_time': lower, 'end_time': upper})
+
+        # Overlaps among the new periods themselves: sweep them by start,
+        # each one against the furthest reaching period before it
+        furthest = None
+        for index in sorted(range(len(periods)), key=lambda index: periods[index]):
+            lower, upper = periods[index]
+            if lower >= upper:
+                continue
+            if furthest is not None and lower < periods[furthest][1]:
+                overlaps[index].append({'time_log_id': None, 'index': furthest,
+                                        'start_time': periods[furthest][0], 'end_time': periods[furthest][1]})
+            if furthest is None or upper > periods[furthest][1]:
+                furthest = index
+        return dict(overlaps)
+
+    def get_running_at(self, user_id: str, at: datetime) -> List[TimeLog]:
+        return list(
+            TimeLog.objects
+            .filter(id__in=TimeLogInterval.objects.filter(user_id=user_id, period__contains=at).values('time_log_id'))
+            .order_by('start_time')
+        )
+
+    def get_active_timer(self, user_id: str) -> Optional[TimeLog]:
+        """
+        Return the user's running timer, or else their most recently paused
+        one, from the cache when possible.
+
+        Cache entries are keyed by a per-user version that writes bump once
+        they commit. A reader that raced a write can only store its stale
+        result under the old version, which nobody reads any more.
+        """
+        key = f'timelogs:active:{user_id}:{self._get_active_timer_version(user_id)}'
+        cached = cache.get(key)
+        if cached is not None:
+            return cached[0]
+
+        time_log = (
+            TimeLog.objects
+            .filter(user_id=user_id, status__in=self.ACTIVE_STATUSES)
+            # 'RUNNING' sorts after 'PAUSED'
+            .order_by('-status', '-updated_at')
+            .first()
+        )
+        # Wrapped so that "no active timer" is cached too
+        cache.set(key, (time_log,), settings.TIMELOGS_ACTIVE_TIMER_CACHE_TTL)
+        return time_log
+
+    def invalidate_active_timer(self, user_id: str) -> None:
+        def bump_version():
+            try:
+                cache.incr(f'timelogs:active:{user_id}:version')
+            except ValueError:
+                # No version yet (or evicted): the next read starts a fresh one
+                pass
+
+        transaction.on_commit(bump_version)
+
+    def get_user_logs_version(self, user_id: str) -> int:
+        return get_user_logs_version(user_id)
+
+    def invalidate_user_logs(self, user_id: str) -> None:
+        invalidate_user_logs(user_id)
+
+    def _get_active_timer_version(self, user_id: str) -> int:
+        key = f'timelogs:active:{user_id}:version'
+        version = cache.get(key)
+        if version is None:
+            # Start from a value no earlier version of this key can have reached
+            cache.add(key, time.time_ns(), timeout=None)
+            version = cache.get(key)
+        return version
+
+    def add_to_daily_totals(self, time_log: TimeLog) -> None:
+        self._apply_daily_totals([time_log], sign=1)
+
+    def add_all_to_daily_totals(self, time_logs: List[TimeLog]) -> None:
+        self._apply_daily_totals(time_logs, sign=1)
+
+    def remove_from_daily_totals(self, time_log: TimeLog) -> None:
+        self._apply_daily_totals([time_log], sign=-1)
+
+    def _apply_daily_totals(self, time_logs: List[TimeLog], sign: int) -> None:
+        """Increment (or decrement) the rollup rows the logs contribute to."""
+        tz = timezone.get_default_timezone()
+        daily_totals = defaultdict(lambda: [timedelta(), timedelta(), 0])
+        for time_log in time_logs:
+            for day, active, paused, count in time_log.get_daily_totals(tz):
+                totals = daily_totals[(time_log.user_id, day)]
+                totals[0] += active
+                totals[1] += paused
+                totals[2] += count
+
+        for (user_id, day), (active, paused, count) in daily_totals.items():
+            changes = {
+                'active_duration': F('active_duration') + sign * active,
+                'paused_duration': F('paused_duration') + sign * paused,
+                'entry_count': F('entry_count') + sign * count,
+            }
+            rows = DailyTimeTotal.objects.filter(user_id=user_id, day=day)
+            if rows.update(**changes):
+                continue
+            try:
+                with transaction.atomic():
+                    DailyTimeTotal.objects.create(
+                        user_id=user_id,
+                        day=day,
+                        active_duration=sign * active,
+                        paused_duration=sign * paused,
+                        entry_count=sign * count,
+                    )
+            except IntegrityError:
+                # Another transaction created the row first
+                rows.update(**changes)
+
+        if sign < 0:
+            # Drop days that no longer hold any time
+            for user_id, day in daily_totals:
+                DailyTimeTotal.objects.filter(
+                    user_id=user_id,
+                    day=day,
+                    active_duration=timedelta(),
+                    paused_duration=timedelta(),
+                    entry_count=0,
+                ).delete()
+
+    def get_time_totals(self,
+                        user_id: str,
+                        period: str,
+                        start_date: Optional[date] = None,
+                        end_date: Optional[date] = None) -> List[Dict]:
+        queryset = DailyTimeTotal.objects.filter(user_id=user_id)
+        if start_date:
+            queryset = queryset.filter(day__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(day__lte=end_date)
+
+        trunc = self.PERIOD_FUNCTIONS[period]
+        return list(
+            queryset
+            .annotate(period_start=trunc('day', output_field=DateField()))
+            .values('period_start')
+            .annotate(
+                active_duration=Sum('active_duration'),
+                paused_duration=Sum('paused_duration'),
+                entry_count=Sum('entry_count'),
+            )
+            .order_by('period_start')
+        )
@@ -0,0 +1,169 @@
+import csv
+import heapq
+import json
+from functools import cmp_to_key, partial
+from itertools import chain
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from django.utils.duration import duration_string
+
+# Columns of an export row, in order, and the queryset values they come from
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('user', 'user__email'),
+    ('description', 'description'),
+    ('status', 'status'),
+    ('start_time', 'start_time'),
+    ('end_time', 'end_time'),
+    ('duration', 'duration'),
+    ('paused_duration', 'paused_duration'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+
+def format_datetime(value, tz=None):
+    """ISO 8601 in `tz` if given, with UTC written as `Z` like the JSON API does."""
+    if value is None:
+        return None
+    if tz is not None:
+        value = value.astimezone(tz)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def format_duration(value):
+    return None if value is None else duration_string(value)
+
+
+def get_formatters(tz):
+    """Formatters by column name, rendering datetimes in `tz`."""
+    as_datetime = partial(format_datetime, tz=tz)
+    return {
+        'id': str,
+        'start_time': as_datetime,
+        'end_time': as_datetime,
+        'duration': format_duration,
+        'paused_duration': format_duration,
+        'created_at': as_datetime,
+        'updated_at': as_datetime,
+    }
+
+
+def get_values(time_log):
+    """Export row of a model instance, as values_list() would return it."""
+    values = []
+    for _, source in EXPORT_COLUMNS:
+        value = time_log
+        for name in source.split('__'):
+            value = getattr(value, name)
+        values.append(value)
+    return tuple(values)
+
+
+def get_sort_key(ordering):
+    """
+    Sort key putting export rows in `ordering` (field names, '-' for
+    descending), with NULLs sorting as PostgreSQL does: last ascending,
+    first descending.
+    """
+    sources = [source for _, source in EXPORT_COLUMNS]
+    positions = [(sources.index(name.lstrip('-')), name.startswith('-')) for name in ordering]
+
+    def compare(row, other):
+        for position, descending in positions:
+            value, other_value = row[position], other[position]
+            if value == other_value:
+                continue
+            if value is None or other_value is None:
+                result = 1 if value is None else -1
+            else:
+                result = 1 if value > other_value else -1
+            return -result if descending else result
+        return 0
+
+    return cmp_to_key(compare)
+
+
+def merge_archived(rows, queryset, archived):
+    """
+    Merge the export rows of the `archived` time logs (an iterable, newest
+    first) into the ordered queryset rows. In that default order both
+    sides stream; other export orderings sort the archived rows first.
+    Orderings on anything but export columns (search rank) cannot be
+    reproduced, so archived rows then follow the others.
+    """
+    archived_rows = (get_values(time_log) for time_log in archived)
+    ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+    sources = {source for _, source in EXPORT_COLUMNS}
+    if not all(isinstance(name, str) and name.lstrip('-') in sources for name in ordering):
+        return chain(rows, archived_rows)
+    key = get_sort_key(ordering)
+    if ordering != ['-created_at']:
+        archived_rows = sorted(archived_rows, key=key)
+    return heapq.merge(rows, archived_rows, key=key)
+
+def iter_export_chunks(queryset, chunk_size, archived=()):
+    """
+    Yield lists of up to `chunk_size` export rows (lists of JSON-ready
+    values), fetched through a server-side cursor and merged with the
+    `archived` time logs (any iterable) in the queryset's order.
+    """
+    # Datetimes in the current time zone, as in the JSON API
+    formatters = get_formatters(timezone.get_current_timezone())
+    formatters = [formatters.get(name) for name, _ in EXPORT_COLUMNS]
+    rows = queryset.values_list(*[source for _, source in EXPORT_COLUMNS]).iterator(chunk_size=chunk_size)
+    if archived:
+        rows = merge_archived(rows, queryset, archived)
+    chunk = []
+    for row in rows:
+        chunk.append([
+            value if formatter is None or value is None else formatter(value)
+            for formatter, value in zip(formatters, row)
+        ])
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset, chunk_size, archived=()):
+    """Yield the CSV header, then one block of lines per chunk of rows."""
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for chunk in iter_export_chunks(queryset, chunk_size, archived):
+        yield ''.join(writer.writerow(row) for row in chunk)
+
+
+def stream_ndjson(queryset, chunk_size, archived=()):
+    """Yield one block of JSON lines per chunk of rows."""
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for chunk in iter_export_chunks(queryset, chunk_size, archived):
+        yield ''.join(json.dumps(dict(zip(names, row)), ensure_ascii=False) + '\n' for row in chunk)
+
+
+async def iterate_in_thread(iterator):
+    """
+    Async iterator over a sync one, advanced a step at a time with thread
+    sensitive calls. Under ASGI those run in the request's thread, whose
+    connection holds the export's server-side cursor, and a streaming
+    response given a sync iterator would read all of it before sending.
+    """
+    done = object()
+    advance = sync_to_async(next)
+    try:
+        while (item := await advance(iterator, done)) is not done:
+            yield item
+    finally:
+        await sync_to_async(iterator.close)()
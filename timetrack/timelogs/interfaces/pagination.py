@@ -0,0 +1,177 @@
+from base64 import b64decode, b64encode
+from types import SimpleNamespace
+from urllib import parse
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class TimeLogPageNumberPagination(PageNumberPagination):
+    """
+    Default page-number pagination for time logs.
+    Honors a client supplied `page_size` up to `TIMELOGS_MAX_PAGE_SIZE`.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = settings.TIMELOGS_MAX_PAGE_SIZE
+
+
+class TimeLogKeysetPagination(CursorPagination):
+    """
+    Keyset (cursor) pagination for time logs.
+
+    Pages are addressed by the `(sort_key, id)` position of the last row seen
+    instead of an OFFSET, and no COUNT(*) is issued, so deep pages cost the
+    same as the first one. Any single field from the view's `ordering_fields`
+    can be used; `id` breaks ties in the same direction as the sort key and
+    NULL sort keys rank above every value.
+    """
+    ordering = '-created_at'
+    page_size_query_param = 'page_size'
+    max_page_size = settings.TIMELOGS_MAX_PAGE_SIZE
+    tiebreak_field = 'id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.field_name, self.descending = self.get_ordering(request, queryset, view)
+        self.field = self._get_model_field(queryset.model, self.field_name)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = bool(self.cursor and self.cursor['reverse'])
+        queryset = queryset.order_by(*self._get_order_by(reverse))
+        if self.cursor is not None:
+            queryset = queryset.filter(self._get_after_condition(reverse))
+
+        # Fetch one extra row to find out whether there is a further page.
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Return the `(field_name, descending)` pair to paginate on.
+        Only the first term of the `ordering` query parameter is used.
+        """
+        ordering = None
+        if view is not None:
+            ordering = OrderingFilter().get_ordering(request, queryset, view)
+        term = ordering[0] if ordering else self.ordering
+        return term.lstrip('-'), term.startswith('-')
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._get_position(self.page[-1], reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self._get_position(self.page[0], reverse=True))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            ordering = tokens['o'][0]
+            position = tokens.get('p', [None])[0]
+            cursor = {
+                'position': None if position is None else self.field.to_python(position),
+                'id': tokens['i'][0],
+                'reverse': bool(int(tokens.get('r', ['0'])[0])),
+            }
+        except (KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # A cursor is only meaningful for the ordering it was issued for.
+        if ordering != self._get_ordering_term():
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, cursor):
+        tokens = {'o': self._get_ordering_term(), 'i': cursor['id']}
+        if cursor['position'] is not None:
+            tokens['p'] = cursor['position']
+        if cursor['reverse']:
+            tokens['r'] = '1'
+
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_model_field(self, model, field_name):
+        try:
+            return model._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_ordering_term(self):
+        return f"-{self.field_name}" if self.descending else self.field_name
+
+    def _get_position(self, instance, reverse):
+        if isinstance(instance, dict):
+            # A `.values()` row
+            instance = SimpleNamespace(**instance)
+        value = getattr(instance, self.field_name)
+        return {
+            'position': None if value is None else self.field.value_to_string(instance),
+            'id': str(getattr(instance, self.tiebreak_field)),
+            'reverse': reverse,
+        }
+
+    def _get_order_by(self, reverse):
+        """
+        Build the ORDER BY for the requested direction. Walking backwards
+        flips both keys. NULL sort keys rank above every value, which is
+        Postgres' own default and keeps the sort servable from an index.
+        """
+        descending = self.descending != reverse
+        if descending:
+            return [F(self.field_name).desc(nulls_first=True), F(self.tiebreak_field).desc()]
+        return [F(self.field_name).asc(nulls_last=True), F(self.tiebreak_field).asc()]
+
+    def _get_after_condition(self, reverse):
+        """
+        Build the WHERE condition selecting rows strictly after the cursor
+        position in the direction being walked.
+        """
+        descending = self.descending != reverse
+        position = self.cursor['position']
+        lookup = 'lt' if descending else 'gt'
+        tiebreak_after = Q(**{f"{self.tiebreak_field}__{lookup}": self.cursor['id']})
+        is_null = Q(**{f"{self.field_name}__isnull": True})
+
+        if position is None:
+            if descending:
+                return (is_null & tiebreak_after) | ~is_null
+            return is_null & tiebreak_after
+
+        condition = (
+            Q(**{f"{self.field_name}__{lookup}": position})
+            | (Q(**{self.field_name: position}) & tiebreak_after)
+        )
+        if not descending:
+            condition |= is_null
+        return condition
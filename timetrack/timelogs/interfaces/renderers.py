@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # Optional: without it there is no MessagePack renderer
+    msgpack = None
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renders a list of dicts (or a single dict, e.g. an error) as CSV.
+    Large exports bypass it and stream rows directly, see `exports.py`.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        buffer = io.StringIO()
+        if rows:
+            writer = csv.DictWriter(buffer, fieldnames=list(rows[0].keys()), extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+        return buffer.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Renders a list as newline-delimited JSON, one item per line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return ''.join(
+            json.dumps(item, cls=JSONEncoder, ensure_ascii=False) + '\n' for item in items
+        ).encode(self.charset)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders data as MessagePack, for clients that send
+    `Accept: application/msgpack` (or `?format=msgpack`). Values JSON has
+    no type for are converted the way the JSON renderer converts them.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=JSONEncoder().default)
+
+
+# Renderers offered next to the default ones where their dependency is installed
+OPTIONAL_RENDERERS = [MessagePackRenderer] if msgpack is not None else []
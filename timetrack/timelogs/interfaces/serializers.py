@@ -1,17 +1,41 @@
-from rest_framework import serializers
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from typing import List, Optional
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from core.instrumentation import instrumented
 from ..domain.models import TimeLog
-from ..application.services import TimeTrackingService
+from ..application.services import TimeLogOverlapError, TimeTrackingService
 from ..infrastructure.repositories import DjangoTimeLogRepository
+from .exports import format_datetime, format_duration
 
-class TimeLogSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """
+    Takes the names of the fields to keep as `fields`, e.g. from
+    get_sparse_fields(). The other fields are dropped up front, so their
+    values are never computed.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+@instrumented('serialize', ['to_representation'])
+class TimeLogSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for TimeLog model."""
     duration_minutes = serializers.SerializerMethodField()
     formatted_duration = serializers.SerializerMethodField()
     status_display = serializers.SerializerMethodField()
     paused_duration = serializers.DurationField(read_only=True)
     total_duration = serializers.SerializerMethodField()
-    new_duration = serializers.DurationField(required=False)
-    new_status = serializers.CharField(required=False)
+    new_duration = serializers.DurationField(required=False, write_only=True)
+    new_status = serializers.CharField(required=False, write_only=True)
     
     class Meta:
         model = TimeLog
@@ -80,6 +104,149 @@ class TimeLogSerializer(serializers.ModelSerializer):
         """Get human-readable status display."""
         return obj.get_status_display()
 
+
+def format_clock(value):
+    """Format a duration as HH:MM:SS, like TimeLog.format_duration."""
+    hours, remainder = divmod(int(value.total_seconds()), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+@instrumented('serialize', ['data'])
+class TimeLogRowSerializer:
+    """
+    Read-only twin of TimeLogSerializer for list pages.
+
+    Works on `.values()` rows instead of model instances and builds each
+    item with plain function calls, producing the same JSON as
+    TimeLogSerializer without DRF's per-field overhead. Given `fields`, it
+    builds only those output fields.
+    """
+    # Every column an item can be built from, to select with `.values()`
+    fields = [
+        'id',
+        'description',
+        'status',
+        'start_time',
+        'end_time',
+        'duration',
+        'paused_duration',
+        'created_at',
+    ]
+
+    # Output fields, in TimeLogSerializer order: (columns read, builder)
+    output_fields = {
+        'id': (['id'], lambda row, tz: str(row['id'])),
+        'description': (['description'], lambda row, tz: row['description']),
+        'status': (['status'], lambda row, tz: row['status']),
+        'start_time': (['start_time'], lambda row, tz: format_datetime(row['start_time'], tz)),
+        'end_time': (['end_time'], lambda row, tz: format_datetime(row['end_time'], tz)),
+        'duration': (['duration'], lambda row, tz: format_duration(row['duration'])),
+        'paused_duration': (['paused_duration'], lambda row, tz: format_duration(row['paused_duration'])),
+        'duration_minutes': (
+            ['duration'], lambda row, tz: row['duration'].total_seconds() / 60 if row['duration'] else 0
+        ),
+        'formatted_duration': (['duration'], lambda row, tz: format_clock(row['duration'])),
+        'total_duration': (
+            ['duration', 'paused_duration'], lambda row, tz: format_clock(row['duration'] + row['paused_duration'])
+        ),
+        'status_display': (
+            ['status'], lambda row, tz: TimeLog.STATUS_LABELS.get(row['status'], row['status'])
+        ),
+        'created_at': (['created_at'], lambda row, tz: format_datetime(row['created_at'], tz)),
+    }
+
+    def __init__(self, rows, fields=None):
+        self.rows = rows
+        self.builders = None
+        if fields is not None:
+            self.builders = [(name, build) for name, (_, build) in self.output_fields.items() if name in fields]
+
+    @classmethod
+    def get_columns(cls, fields=None) -> List[str]:
+        """The columns to select for the given output fields (all by default)."""
+        if fields is None:
+            return list(cls.fields)
+        needed = {column for name in fields for column in cls.output_fields[name][0]}
+        return [column for column in cls.fields if column in needed]
+
+    @property
+    def data(self):
+        tz = timezone.get_current_timezone()
+        return [self.to_representation(row, tz) for row in self.rows]
+
+    def to_representation(self, row, tz):
+        if self.builders is not None:
+            return {name: build(row, tz) for name, build in self.builders}
+
+        # Every field, spelled out: a tenth faster than going through the builders
+        duration = row['duration']
+        paused_duration = row['paused_duration']
+        return {
+            'id': str(row['id']),
+            'description': row['description'],
+            'status': row['status'],
+            'start_time': format_datetime(row['start_time'], tz),
+            'end_time': format_datetime(row['end_time'], tz),
+            'duration': format_duration(duration),
+            'paused_duration': format_duration(paused_duration),
+            'duration_minutes': duration.total_seconds() / 60 if duration else 0,
+            'formatted_duration': format_clock(duration),
+            'total_duration': format_clock(duration + paused_duration),
+            'status_display': TimeLog.STATUS_LABELS.get(row['status'], row['status']),
+            'created_at': format_datetime(row['created_at'], tz),
+        }
+
+
+def get_sparse_fields(params) -> Optional[List[str]]:
+    """
+    The output fields kept by the `fields` and `exclude` query parameters
+    (comma-separated field names), or None when neither is given.
+    """
+    if 'fields' not in params and 'exclude' not in params:
+        return None
+
+    available = list(TimeLogRowSerializer.output_fields)
+    fields = available
+    errors = {}
+    for param in ['fields', 'exclude']:
+        if param not in params:
+            continue
+        names = [name.strip() for name in params[param].split(',') if name.strip()]
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            errors[param] = [f"Unknown field(s): {', '.join(unknown)}."]
+        elif param == 'fields':
+            fields = [name for name in fields if name in names]
+        else:
+            fields = [name for name in fields if name not in names]
+    if errors:
+        raise serializers.ValidationError(errors)
+    return fields
+
+class TimeLogOverlapSerializer(serializers.Serializer):
+    """
+    Something a manual entry overlaps: a recorded time log interval, or
+    (`index`) another entry of the same bulk request.
+    """
+    time_log_id = serializers.UUIDField(allow_null=True)
+    index = serializers.IntegerField(allow_null=True)
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField(allow_null=True)
+
+class TimeLogOverlapConflict(APIException):
+    """
+    A 400 listing what rejected entries overlap. Unlike ValidationError,
+    the detail is passed through as is, so nulls and numbers stay JSON
+    nulls and numbers.
+    """
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_code = 'overlap'
+
+    def __init__(self, detail):
+        super().__init__()
+        self.detail = detail
+
 class TimeLogCreateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating time log entries, 
@@ -88,6 +255,11 @@ class TimeLogCreateSerializer(serializers.ModelSerializer):
     start_time = serializers.DateTimeField(required=True)
     duration = serializers.DurationField(required=True)
     end_time = serializers.DateTimeField(required=False, allow_null=True)
+    overlap = serializers.ChoiceField(
+        choices=TimeTrackingService.OVERLAP_POLICIES,
+        required=False,
+        write_only=True
+    )
 
     class Meta:
         model = TimeLog
@@ -95,7 +267,8 @@ class TimeLogCreateSerializer(serializers.ModelSerializer):
             'description', 
             'start_time', 
             'duration', 
-            'end_time'
+            'end_time',
+            'overlap'
         ]
 
     def create(self, validated_data):
@@ -117,12 +290,236 @@ class TimeLogCreateSerializer(serializers.ModelSerializer):
         
         # Use service to add manual time
         service = TimeTrackingService(DjangoTimeLogRepository())
-        time_log = service.add_manual_time(
-            user_id=user.id, 
-            description=description,
-            start_time=start_time,
-            duration=duration,
-            end_time=end_time
-        )
+        try:
+            time_log = service.add_manual_time(
+                user_id=user.id, 
+                description=description,
+                start_time=start_time,
+                duration=duration,
+                end_time=end_time,
+                overlap=validated_data.get('overlap')
+            )
+        except TimeLogOverlapError as e:
+            raise TimeLogOverlapConflict({
+                'overlaps': TimeLogOverlapSerializer(e.overlaps[0], many=True).data
+            })
         
         return time_log
+
+class TimeLogBulkCreateSerializer(serializers.Serializer):
+    """
+    Serializer for importing many manual time entries at once.
+
+    In `atomic` mode any invalid entry rejects the whole request; in
+    `partial` mode the valid entries are created and the errors of the
+    invalid ones are reported keyed by their index. Entries rejected by
+    the overlap policy count as invalid.
+    """
+    MODE_ATOMIC = 'atomic'
+    MODE_PARTIAL = 'partial'
+
+    mode = serializers.ChoiceField(choices=[MODE_ATOMIC, MODE_PARTIAL], default=MODE_ATOMIC)
+    entries = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=settings.TIMELOGS_BULK_MAX_ENTRIES
+    )
+    overlap = serializers.ChoiceField(choices=TimeTrackingService.OVERLAP_POLICIES, required=False)
+
+    def validate(self, attrs):
+        """Validate every entry with a single TimeLogCreateSerializer."""
+        entry_serializer = TimeLogCreateSerializer()
+        valid_entries, errors = [], {}
+        for index, entry in enumerate(attrs['entries']):
+            try:
+                valid_entries.append((index, entry_serializer.run_validation(entry)))
+            except serializers.ValidationError as exc:
+                errors[index] = exc.detail
+
+        if errors and (attrs['mode'] == self.MODE_ATOMIC or not valid_entries):
+            raise serializers.ValidationError({'entries': errors})
+
+        attrs['valid_entries'] = valid_entries
+        attrs['errors'] = errors
+        return attrs
+
+    def create(self, validated_data):
+        """Insert the valid entries in one transaction."""
+        user = self.context['request'].user
+        valid_entries = validated_data['valid_entries']
+        errors = dict(validated_data['errors'])
+
+        service = TimeTrackingService(DjangoTimeLogRepository())
+        while True:
+            indexes = [index for index, _ in valid_entries]
+            try:
+                time_logs = service.add_manual_time_entries(
+                    user_id=user.id,
+                    entries=[entry for _, entry in valid_entries],
+                    overlap=validated_data.get('overlap')
+                )
+                break
+            except TimeLogOverlapError as e:
+                overlap_errors = {
+                    indexes[position]: {'overlaps': self.get_overlaps(overlaps, indexes)}
+                    for position, overlaps in e.overlaps.items()
+                }
+                if validated_data['mode'] == self.MODE_ATOMIC or len(overlap_errors) == len(valid_entries):
+                    raise TimeLogOverlapConflict({'entries': {**errors, **overlap_errors}})
+                # Report the overlapping entries and insert the rest, which
+                # only overlap each other's earlier entries, if anything
+                errors.update(overlap_errors)
+                valid_entries = [(index, entry) for index, entry in valid_entries if index not in overlap_errors]
+
+        return {
+            'created': [
+                {'index': index, 'id': time_log.id}
+                for index, time_log in zip(indexes, time_logs)
+            ],
+            'errors': errors,
+            'overlaps': {
+                index: self.get_overlaps(time_log.overlaps, indexes)
+                for index, time_log in zip(indexes, time_logs)
+                if getattr(time_log, 'overlaps', None)
+            },
+        }
+
+    def get_overlaps(self, overlaps, indexes):
+        """Serialize overlaps, with other entries by their request index."""
+        return TimeLogOverlapSerializer([
+            {**overlap, 'index': indexes[overlap['index']] if overlap['index'] is not None else None}
+            for overlap in overlaps
+        ], many=True).data
+
+class TimeLogBulkResultSerializer(serializers.Serializer):
+    """Per-item outcome of a bulk time log import."""
+    created = serializers.ListField(child=serializers.DictField())
+    errors = serializers.DictField()
+    # Overlaps of created entries under the warn policy, by index
+    overlaps = serializers.DictField()
+
+class TimeLogBatchTransitionSerializer(serializers.Serializer):
+    """
+    Selects the timers of a batch transition: by ID, by status, or (staff
+    only) by user. Users other than staff only reach their own logs.
+    """
+    action = serializers.ChoiceField(choices=TimeTrackingService.BATCH_ACTIONS)
+    ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False,
+        allow_empty=False,
+        max_length=settings.TIMELOGS_BULK_MAX_ENTRIES
+    )
+    status = serializers.ListField(
+        child=serializers.ChoiceField(choices=[TimeLog.Status.RUNNING, TimeLog.Status.PAUSED]),
+        required=False,
+        allow_empty=False
+    )
+    users = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False,
+        allow_empty=False,
+        max_length=settings.TIMELOGS_BULK_MAX_ENTRIES
+    )
+
+    def validate(self, attrs):
+        user = self.context['request'].user
+        if 'users' in attrs and not user.is_staff:
+            raise serializers.ValidationError({"users": "Only staff can select other users' timers."})
+        if not ({'ids', 'status', 'users'} & set(attrs)):
+            raise serializers.ValidationError("Select the timers by ids, status or users.")
+        if user.is_staff and not ({'ids', 'users'} & set(attrs)):
+            raise serializers.ValidationError({"users": "Staff select timers by status together with users."})
+
+        attrs['user_ids'] = attrs.get('users') if user.is_staff else [user.id]
+        return attrs
+
+class TimeLogBatchOutcomeSerializer(serializers.Serializer):
+    """Outcome of a batch transition for one time log."""
+    id = serializers.UUIDField()
+    outcome = serializers.CharField()
+    status = serializers.CharField(allow_null=True)
+
+class TimeTotalQuerySerializer(serializers.Serializer):
+    """Validates the query parameters of the time totals summary."""
+    period = serializers.ChoiceField(choices=['day', 'week', 'month'], default='day')
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        start_date = attrs.get('start_date')
+        end_date = attrs.get('end_date')
+        if start_date and end_date and start_date > end_date:
+            raise serializers.ValidationError({"end_date": "end_date must not be before start_date."})
+        return attrs
+
+class TimeTotalSerializer(serializers.Serializer):
+    """Serializer for one day, week or month of rolled up time totals."""
+    period_start = serializers.DateField()
+    active_duration = serializers.DurationField()
+    paused_duration = serializers.DurationField()
+    entry_count = serializers.IntegerField()
+
+class WorkedTimeQuerySerializer(serializers.Serializer):
+    """Validates the query parameters of the worked time report."""
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+    def validate(self, attrs):
+        if attrs['end'] <= attrs['start']:
+            raise serializers.ValidationError({"end": "end must be after start."})
+        return attrs
+
+class WorkedTimeLogSerializer(serializers.Serializer):
+    """Serializer for one time log's share of the worked time."""
+    time_log_id = serializers.UUIDField()
+    duration = serializers.DurationField()
+
+class WorkedTimeSerializer(serializers.Serializer):
+    """Serializer for the exact active time worked within a time window."""
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    duration = serializers.DurationField()
+    time_logs = WorkedTimeLogSerializer(many=True)
+
+class RunningAtQuerySerializer(serializers.Serializer):
+    """Validates the query parameters of the running timers lookup."""
+    at = serializers.DateTimeField()
+
+SYNC_CURSOR_SALT = 'timelogs.sync-cursor'
+
+def encode_sync_cursor(position, issued_at: datetime) -> str:
+    """
+    Encode a delta sync position, and when it was handed out, as an opaque
+    cursor. It is signed, so clients cannot move the position or the issue
+    time that the retention check relies on.
+    """
+    xid, time_log_id = position
+    return signing.dumps([xid, str(time_log_id), int(issued_at.timestamp())], salt=SYNC_CURSOR_SALT)
+
+class TimeLogChangesQuerySerializer(serializers.Serializer):
+    """Validates the query parameters of the delta sync endpoint."""
+    since = serializers.CharField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.TIMELOGS_SYNC_BATCH_SIZE,
+        default=settings.TIMELOGS_SYNC_BATCH_SIZE
+    )
+
+    def validate_since(self, value):
+        """Decode the cursor into its position and issue time."""
+        try:
+            xid, time_log_id, issued_at = signing.loads(value, salt=SYNC_CURSOR_SALT)
+            return {
+                'position': (int(xid), uuid.UUID(time_log_id)),
+                'issued_at': datetime.fromtimestamp(int(issued_at), tz=dt_timezone.utc),
+            }
+        except (signing.BadSignature, TypeError, ValueError):
+            raise serializers.ValidationError("Invalid cursor.")
+
+class TimeLogChangesSerializer(serializers.Serializer):
+    """One batch of delta sync changes."""
+    time_logs = TimeLogSerializer(many=True)
+    deleted = serializers.ListField(child=serializers.UUIDField())
+    cursor = serializers.CharField()
+    has_more = serializers.BooleanField()
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+from authentication.authentication import CachedJWTAuthentication
+from ..application.services import TimeTrackingService
+from ..infrastructure.events import get_timer_event_broker
+from ..infrastructure.repositories import DjangoTimeLogRepository
+from .serializers import TimeLogRowSerializer
+
+
+def format_event(name, data):
+    """One Server-Sent Events message."""
+    return f'event: {name}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+def run_in_worker(func, *args):
+    """
+    Call func in the shared worker thread pool, so an idle stream holds
+    neither a thread nor a database connection. Connections of the pool's
+    threads are recycled per CONN_MAX_AGE, as at the ends of a request.
+    """
+    def call():
+        close_old_connections()
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+    return sync_to_async(call, thread_sensitive=False)()
+
+
+def authenticate_stream(request):
+    """
+    Authenticate the stream's JWT access token.
+
+    Returns:
+        tuple: (user, token expiry timestamp)
+
+    Raises:
+        InvalidToken, AuthenticationFailed: If the token is missing or rejected
+    """
+    authentication = CachedJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    # EventSource cannot set headers, so browsers pass the token as a parameter
+    raw_token = raw_token or request.GET.get('token', '').encode()
+    if not raw_token:
+        raise AuthenticationFailed('Authentication credentials were not provided.')
+    validated_token = authentication.get_validated_token(raw_token)
+    return authentication.get_user(validated_token), validated_token['exp']
+
+
+def get_active_timer(user_id):
+    return TimeTrackingService(DjangoTimeLogRepository()).get_active_timer(user_id)
+
+
+async def stream_events(user_id, expires_at, tz):
+    """
+    Yield a snapshot of the active timer, then each timer event of the
+    user, with keepalive comments while idle. The stream ends when the
+    access token expires; the client reconnects with a fresh one.
+    """
+    serializer = TimeLogRowSerializer([])
+
+    def represent(row):
+        return serializer.to_representation(row, tz)
+
+    async with get_timer_event_broker().subscribe(user_id) as subscription:
+        # Subscribed before reading the snapshot, so no change falls in between
+        active = await run_in_worker(get_active_timer, user_id)
+        yield format_event('snapshot', active and represent({
+            field: getattr(active, field) for field in TimeLogRowSerializer.fields
+        }))
+        events = aiter(subscription)
+        while True:
+            timeout = min(settings.TIMELOGS_STREAM_KEEPALIVE, expires_at - time.time())
+            if timeout <= 0:
+                return
+            try:
+                event = await asyncio.wait_for(anext(events), timeout)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(event['action'], represent(event['time_log']))
+
+
+@require_GET
+async def timer_event_stream(request):
+    """
+    Server-Sent Events stream of the authenticated user's timer changes.
+
+    Sends a `snapshot` event with the active timer (or null) first, then one
+    event per change, named after the action (start, pause, resume, stop,
+    delete), with the time log as in the list endpoint. Authenticate with a
+    Bearer header or, from EventSource, the `token` query parameter.
+
+    Serve it through core.asgi: over WSGI each open stream holds a thread.
+    """
+    try:
+        user, expires_at = await run_in_worker(authenticate_stream, request)
+    except (InvalidToken, AuthenticationFailed) as e:
+        return JsonResponse(e.detail, status=e.status_code, safe=False)
+
+    response = StreamingHttpResponse(
+        stream_events(user.id, expires_at, timezone.get_current_timezone()),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
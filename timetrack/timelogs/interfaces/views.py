@@ -1,15 +1,65 @@
+import hashlib
+from datetime import timedelta
+from typing import List, Optional
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from django.utils.translation import gettext_lazy as _
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
-from ..application.services import TimeTrackingService
+from core.db_routers import get_read_database, pin_to_primary
+from ..application.services import TimerConflictError, TimeTrackingService
+from ..infrastructure.events import get_timer_event_broker
 from ..infrastructure.repositories import DjangoTimeLogRepository
+from ..infrastructure.filters import TimeLogFilter, TimeLogSearchFilter
 from ..domain.models import TimeLog
-from .serializers import TimeLogSerializer, TimeLogCreateSerializer
+from .serializers import (
+    TimeLogSerializer,
+    TimeLogRowSerializer,
+    TimeLogCreateSerializer,
+    TimeLogBulkCreateSerializer,
+    TimeLogBulkResultSerializer,
+    TimeLogBatchTransitionSerializer,
+    TimeLogBatchOutcomeSerializer,
+    TimeLogChangesQuerySerializer,
+    TimeLogChangesSerializer,
+    encode_sync_cursor,
+    TimeLogOverlapSerializer,
+    TimeTotalQuerySerializer,
+    TimeTotalSerializer,
+    WorkedTimeQuerySerializer,
+    WorkedTimeSerializer,
+    RunningAtQuerySerializer,
+    get_sparse_fields,
+)
 from .permissions import TimeLogPermission
+from .pagination import TimeLogPageNumberPagination, TimeLogKeysetPagination
+from .renderers import CSVRenderer, NDJSONRenderer, OPTIONAL_RENDERERS
+from .exports import iterate_in_thread, stream_csv, stream_ndjson
+
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        name='fields',
+        description='Comma-separated time log fields to return, e.g. id,status,duration (all by default)',
+        required=False,
+        type=str
+    ),
+    OpenApiParameter(
+        name='exclude',
+        description='Comma-separated time log fields to leave out',
+        required=False,
+        type=str
+    ),
+]
 
 @extend_schema(tags=['timelogs'])
 class TimeLogViewSet(viewsets.ModelViewSet):
@@ -18,22 +68,19 @@ class TimeLogViewSet(viewsets.ModelViewSet):
     Implements CRUD operations and timer controls.
     """
     permission_classes = [TimeLogPermission]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, *OPTIONAL_RENDERERS]
     serializer_class = TimeLogSerializer
+    pagination_class = TimeLogPageNumberPagination
     
     # Add filter backends
     filter_backends = [
         DjangoFilterBackend, 
-        filters.SearchFilter, 
+        TimeLogSearchFilter, 
         filters.OrderingFilter
     ]
     
-    # Filterable fields
-    filterset_fields = [
-        'status', 
-        'start_time', 
-        'end_time', 
-        'created_at'
-    ]
+    # Filterable fields (status, start_date, end_date, tz, ...)
+    filterset_class = TimeLogFilter
     
     # Search fields
     search_fields = [
@@ -51,28 +98,99 @@ class TimeLogViewSet(viewsets.ModelViewSet):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.repository = DjangoTimeLogRepository()
-        self.service = TimeTrackingService(self.repository)
+        self.service = TimeTrackingService(self.repository, get_timer_event_broker())
+
+    @property
+    def paginator(self):
+        """
+        Use keyset pagination when the client opts in with `pagination=cursor`
+        (or follows a cursor link), page-number pagination otherwise.
+        """
+        if not hasattr(self, '_paginator'):
+            request = getattr(self, 'request', None)
+            params = request.query_params if request is not None else {}
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = TimeLogKeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    # Read-only actions served from a read replica
+    replica_actions = {'list', 'retrieve', 'export'}
 
     def get_queryset(self):
         """Filter queryset based on user permissions."""
         queryset = TimeLog.objects.all() if self.request.user.is_staff else TimeLog.objects.filter(user=self.request.user)
-        
-        # Additional custom filtering
-        status = self.request.query_params.get('status')
-        start_date = self.request.query_params.get('start_date')
-        end_date = self.request.query_params.get('end_date')
-        
-        if status:
-            queryset = queryset.filter(status=status)
-        
-        if start_date:
-            queryset = queryset.filter(start_time__date__gte=start_date)
-        
-        if end_date:
-            queryset = queryset.filter(end_time__date__lte=end_date)
-        
+        if self.action in self.replica_actions:
+            queryset = queryset.using(get_read_database(self.request.user.id))
+        if self.action == 'retrieve':
+            fields = self.get_sparse_fields()
+            if fields is not None:
+                # The owner is read by the object permission check
+                queryset = queryset.only('user', *TimeLogRowSerializer.get_columns(fields))
         return queryset
 
+    def get_sparse_fields(self) -> Optional[List[str]]:
+        """Output fields picked with `?fields=` / `?exclude=`, None for all."""
+        return get_sparse_fields(self.request.query_params)
+
+    def get_serializer(self, *args, **kwargs):
+        """Serialize the time logs a GET reads with the requested fields only."""
+        if self.request.method in ('GET', 'HEAD') and self.get_serializer_class() is TimeLogSerializer:
+            kwargs.setdefault('fields', self.get_sparse_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        # Owners of the logs the request writes, besides the caller
+        self.written_user_ids = set()
+        super().initial(request, *args, **kwargs)
+
+    def record_written(self, *time_logs):
+        """Note the owners of written logs, whose reads must see the write too."""
+        self.written_user_ids.update(time_log.user_id for time_log in time_logs if time_log is not None)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """
+        Keep the reads of a user who just wrote on the primary for a while,
+        and of the users whose logs they wrote: staff write other users' logs.
+        """
+        if request.method not in SAFE_METHODS and request.user.is_authenticated:
+            for user_id in {request.user.id, *getattr(self, 'written_user_ids', ())}:
+                pin_to_primary(user_id)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def get_etag(self, request) -> Optional[str]:
+        """
+        ETag of a list or retrieve response: the user's time log version
+        plus everything else the response depends on. Staff read other
+        users' logs, which no single version covers, so they get none.
+        """
+        if request.user.is_staff:
+            return None
+        # Taken before the query: a write committing in between leaves the
+        # new rows under the old version, which the next request replaces.
+        version = self.repository.get_user_logs_version(request.user.id)
+        key = f'{request.user.id}:{version}:{request.accepted_renderer.format}:{request.build_absolute_uri()}'
+        return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        """
+        Answer a matching If-None-Match with 304 before querying anything,
+        otherwise run the handler and tag its response.
+        """
+        etag = self.get_etag(request)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            # Browsers keep the page but check back every time
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
     @extend_schema(
         summary="Search and filter time logs",
         description="Retrieve time logs with advanced filtering and search capabilities.",
@@ -95,9 +213,27 @@ class TimeLogViewSet(viewsets.ModelViewSet):
                 required=False, 
                 type=str
             ),
+            OpenApiParameter(
+                name='created_from', 
+                description='Filter logs created on or after this date', 
+                required=False, 
+                type=str
+            ),
+            OpenApiParameter(
+                name='created_to', 
+                description='Filter logs created on or before this date', 
+                required=False, 
+                type=str
+            ),
+            OpenApiParameter(
+                name='tz', 
+                description='IANA time zone the date filters are interpreted in (defaults to UTC)', 
+                required=False, 
+                type=str
+            ),
             OpenApiParameter(
                 name='search', 
-                description='Search logs by description', 
+                description='Search logs by description (word prefixes, tolerant of typos, ranked by relevance)', 
                 required=False, 
                 type=str
             ),
@@ -106,7 +242,26 @@ class TimeLogViewSet(viewsets.ModelViewSet):
                 description='Order results (prefix with - for descending)', 
                 required=False, 
                 type=str
-            )
+            ),
+            OpenApiParameter(
+                name='pagination', 
+                description='Set to "cursor" for keyset pagination (no total count, constant cost per page)', 
+                required=False, 
+                type=str
+            ),
+            OpenApiParameter(
+                name='cursor', 
+                description='Opaque cursor taken from the next/previous link of a cursor-paginated response', 
+                required=False, 
+                type=str
+            ),
+            OpenApiParameter(
+                name='page_size', 
+                description='Number of results per page (capped server-side)', 
+                required=False, 
+                type=int
+            ),
+            *SPARSE_FIELDSET_PARAMETERS
         ]
     )
     def list(self, request, *args, **kwargs):
@@ -117,10 +272,47 @@ class TimeLogViewSet(viewsets.ModelViewSet):
         - status: Filter by log status
         - start_date: Logs started on or after this date
         - end_date: Logs ended on or before this date
+        - tz: Time zone for start_date/end_date
         - search: Search in description
         - ordering: Order results
+        - pagination: "cursor" to switch to keyset pagination
+        - cursor: Position returned in a previous cursor-paginated response
+        - page_size: Results per page, up to TIMELOGS_MAX_PAGE_SIZE
+        - fields / exclude: Comma-separated output fields to keep / leave out
         """
-        return super().list(request, *args, **kwargs)
+        return self.conditional_response(request, self._list, *args, **kwargs)
+
+    def _list(self, request, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = TimeLogRowSerializer.get_columns(fields)
+        if isinstance(self.paginator, TimeLogKeysetPagination):
+            # Cursors are built from the sort key and id of the page's rows
+            sort_field, _ = self.paginator.get_ordering(request, queryset, self)
+            columns = list(dict.fromkeys([*columns, sort_field, 'id']))
+        # Serialize `.values()` rows, same JSON as TimeLogSerializer
+        queryset = queryset.values(*columns)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(TimeLogRowSerializer(page, fields).data)
+        return Response(TimeLogRowSerializer(queryset, fields).data)
+
+    @extend_schema(parameters=SPARSE_FIELDSET_PARAMETERS)
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a time log, answering If-None-Match like list."""
+        return self.conditional_response(request, super().retrieve, *args, **kwargs)
+
+    def perform_update(self, serializer):
+        """Save, then drop the user's cached active timer and log version."""
+        time_log = serializer.save()
+        self.record_written(time_log)
+        self.repository.invalidate_active_timer(time_log.user_id)
+        self.repository.invalidate_user_logs(time_log.user_id)
+
+    def perform_destroy(self, instance):
+        """Delete through the service so the daily rollup stays in step."""
+        self.record_written(instance)
+        self.service.delete_time_log(instance.id)
 
     def get_serializer_class(self):
         """Return appropriate serializer class."""
@@ -130,7 +322,12 @@ class TimeLogViewSet(viewsets.ModelViewSet):
 
     @extend_schema(
         summary="Log work time manually",
-        description="Create a time log entry by specifying start time, duration, and optional end time.",
+        description=(
+            "Create a time log entry by specifying start time, duration, and optional end time. "
+            "`overlap` decides what happens when the entry overlaps the user's recorded time: "
+            "`allow` it, `warn` with an `overlaps` list in the response, or `reject` it with a 400 "
+            "listing the `overlaps`. It defaults to TIMELOGS_OVERLAP_POLICY."
+        ),
         request=TimeLogCreateSerializer,
         responses={201: TimeLogSerializer},
         examples=[
@@ -155,14 +352,57 @@ class TimeLogViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         time_log = serializer.save(user=self.request.user)
         
-        response_serializer = TimeLogSerializer(time_log)
-        return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+        data = TimeLogSerializer(time_log).data
+        if getattr(time_log, 'overlaps', None):
+            # Created under the warn policy
+            data['overlaps'] = TimeLogOverlapSerializer(time_log.overlaps, many=True).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        summary="Log many work time entries at once",
+        description=(
+            "Creates up to TIMELOGS_BULK_MAX_ENTRIES manual entries in one transaction. "
+            "In atomic mode any invalid entry rejects the request; in partial mode the "
+            "valid entries are created and the invalid ones are returned by index. `overlap` applies "
+            "to every entry, checked against recorded time and against the other entries."
+        ),
+        request=TimeLogBulkCreateSerializer,
+        responses={201: TimeLogBulkResultSerializer},
+        examples=[
+            OpenApiExample(
+                'Bulk Import',
+                value={
+                    'mode': 'partial',
+                    'entries': [
+                        {
+                            'description': 'Project documentation',
+                            'start_time': '2025-02-01T09:00:00Z',
+                            'duration': '01:30:00'
+                        },
+                        {
+                            'description': 'Code review',
+                            'start_time': '2025-02-01T11:00:00Z',
+                            'duration': '00:45:00'
+                        }
+                    ]
+                },
+                request_only=True,
+            ),
+        ]
+    )
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Create many manual time entries."""
+        serializer = TimeLogBulkCreateSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save()
+        return Response(TimeLogBulkResultSerializer(result).data, status=status.HTTP_201_CREATED)
 
     @extend_schema(
         summary="Create and start a new timer",
         description="Creates a new time log and immediately starts tracking time.",
         request=TimeLogCreateSerializer,
-        responses={201: TimeLogSerializer},
+        responses={201: TimeLogSerializer, 409: None},
         examples=[
             OpenApiExample(
                 'Valid Request',
@@ -181,25 +421,36 @@ class TimeLogViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        time_log = self.service.create_and_start_timer(
-            user_id=request.user.id,
-            description=description
-        )
+        try:
+            time_log = self.service.create_and_start_timer(
+                user_id=request.user.id,
+                description=description
+            )
+        except TimerConflictError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         serializer = self.get_serializer(time_log)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @extend_schema(
         summary="Start a timer for an existing time log",
         description="Starts a previously created time log timer.",
-        responses={200: TimeLogSerializer}
+        responses={200: TimeLogSerializer, 409: None}
     )
     @action(detail=True, methods=['post'])
     def start(self, request, pk=None):
         """Start an existing timer."""
         try:
             time_log = self.service.start_timer(pk)
+            self.record_written(time_log)
             serializer = self.get_serializer(time_log)
             return Response(serializer.data)
+        except TimerConflictError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
         except ValueError as e:
             return Response(
                 {'error': str(e)},
@@ -216,6 +467,7 @@ class TimeLogViewSet(viewsets.ModelViewSet):
         """Pause an active timer."""
         try:
             time_log = self.service.pause_timer(pk)
+            self.record_written(time_log)
             serializer = self.get_serializer(time_log)
             return Response(serializer.data)
         except ValueError as e:
@@ -227,15 +479,18 @@ class TimeLogViewSet(viewsets.ModelViewSet):
     @extend_schema(
         summary="Resume a paused timer",
         description="Resumes a previously paused timer.",
-        responses={200: TimeLogSerializer}
+        responses={200: TimeLogSerializer, 409: None}
     )
     @action(detail=True, methods=['post'])
     def resume(self, request, pk=None):
         """Resume a paused timer."""
         try:
             time_log = self.service.resume_timer(pk)
+            self.record_written(time_log)
             serializer = self.get_serializer(time_log)
             return Response(serializer.data)
+        except TimerConflictError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
         except ValueError as e:
             return Response(
                 {'error': str(e)},
@@ -252,6 +507,7 @@ class TimeLogViewSet(viewsets.ModelViewSet):
         """Stop an active timer."""
         try:
             time_log = self.service.stop_timer(pk)
+            self.record_written(time_log)
             serializer = self.get_serializer(time_log)
             return Response(serializer.data)
         except ValueError as e:
@@ -259,3 +515,182 @@ class TimeLogViewSet(viewsets.ModelViewSet):
                 {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+    @extend_schema(
+        summary="Pause or stop many timers",
+        description=(
+            "Applies `pause` or `stop` to the selected timers in one transaction, with the same rules as "
+            "the single-timer endpoints. Select them by `ids` and/or `status` (e.g. all RUNNING); staff "
+            "may also select `users`. Returns one outcome per requested id (`applied`, `not_allowed` "
+            "with the current status, or `not_found`), or the applied ones when no ids are given."
+        ),
+        request=TimeLogBatchTransitionSerializer,
+        responses={200: TimeLogBatchOutcomeSerializer(many=True)},
+        examples=[
+            OpenApiExample(
+                'Stop my running timers',
+                value={'action': 'stop', 'status': ['RUNNING']},
+                request_only=True,
+            ),
+        ]
+    )
+    @action(detail=False, methods=['post'])
+    def batch_transition(self, request):
+        """Pause or stop many timers at once."""
+        serializer = TimeLogBatchTransitionSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        outcomes = self.service.transition_many(
+            data['action'],
+            time_log_ids=data.get('ids'),
+            user_ids=data['user_ids'],
+            statuses=data.get('status')
+        )
+        self.record_written(*(outcome['time_log'] for outcome in outcomes))
+        # Like the caller after a failed write, selected users stay pinned even if none of their timers moved
+        self.written_user_ids.update(data['user_ids'] or ())
+        return Response(TimeLogBatchOutcomeSerializer(outcomes, many=True).data)
+
+    @extend_schema(
+        summary="Time log changes since a sync cursor",
+        description=(
+            "Returns the current user's time logs written and the IDs of those deleted since `since`, "
+            "oldest change first, at most `limit` per batch, and the cursor to pass next. Without "
+            "`since` it starts from the beginning. Keep requesting while `has_more` is true. Changes "
+            "of transactions still in progress are held back until they finish, so none is skipped. "
+            "Cursors older than TIMELOGS_TOMBSTONE_RETENTION_DAYS are answered with 410: sync again "
+            "from scratch."
+        ),
+        parameters=[TimeLogChangesQuerySerializer],
+        responses={200: TimeLogChangesSerializer, 410: None}
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def changes(self, request):
+        """Get a batch of the current user's time log changes."""
+        query = TimeLogChangesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        since = query.validated_data.get('since')
+
+        now = timezone.now()
+        if since and since['issued_at'] < now - timedelta(days=settings.TIMELOGS_TOMBSTONE_RETENTION_DAYS):
+            # Tombstones it has not seen may be compacted away
+            return Response(
+                {'error': _('Cursor expired, sync again without since')},
+                status=status.HTTP_410_GONE
+            )
+
+        changes = self.service.get_changes(
+            request.user.id,
+            since and since['position'],
+            query.validated_data['limit']
+        )
+        changes['cursor'] = encode_sync_cursor(changes.pop('position'), now)
+        return Response(TimeLogChangesSerializer(changes).data)
+
+    @extend_schema(
+        summary="Get the current timer",
+        description=(
+            "Returns the current user's running timer, or else their most recently paused one. "
+            "Responds with 204 when no timer is running or paused."
+        ),
+        parameters=SPARSE_FIELDSET_PARAMETERS,
+        responses={200: TimeLogSerializer, 204: None}
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def active(self, request):
+        """Get the current user's active timer."""
+        time_log = self.service.get_active_timer(request.user.id)
+        if time_log is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        serializer = self.get_serializer(time_log)
+        return Response(serializer.data)
+
+    @extend_schema(
+        summary="Daily, weekly or monthly time totals",
+        description="Returns the current user's active time, paused time and entry count per period, read from the daily rollup.",
+        parameters=[TimeTotalQuerySerializer],
+        responses={200: TimeTotalSerializer(many=True)}
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def summary(self, request):
+        """Get the current user's time totals grouped by period."""
+        query = TimeTotalQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        totals = self.service.get_time_totals(
+            user_id=request.user.id,
+            **query.validated_data
+        )
+        serializer = TimeTotalSerializer(totals, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(
+        summary="Exact time worked within a time window",
+        description=(
+            "Returns the current user's active time between start (inclusive) and end (exclusive), "
+            "in total and per time log, from the recorded timer intervals. Intervals are clipped at "
+            "the window edges and running timers count up to now."
+        ),
+        parameters=[WorkedTimeQuerySerializer],
+        responses={200: WorkedTimeSerializer}
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def worked(self, request):
+        """Get the current user's active time within a window."""
+        query = WorkedTimeQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        worked = self.service.get_worked_time(request.user.id, **query.validated_data)
+        return Response(WorkedTimeSerializer(worked).data)
+
+    @extend_schema(
+        summary="Time logs running at a moment",
+        description="Returns the current user's time logs that were running (or manually logged) at the given moment.",
+        parameters=[RunningAtQuerySerializer, *SPARSE_FIELDSET_PARAMETERS],
+        responses={200: TimeLogSerializer(many=True)}
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def running_at(self, request):
+        """Get the current user's time logs running at a moment."""
+        query = RunningAtQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        time_logs = self.service.get_running_at(request.user.id, query.validated_data['at'])
+        serializer = self.get_serializer(time_logs, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(
+        summary="Export time logs",
+        description=(
+            "Streams every time log matching the list filters (status, start_date, end_date, "
+            "created_from, created_to, tz, search, ordering) as CSV or newline-delimited JSON, "
+            "archived logs included. Pick the format with ?format=csv|ndjson or the Accept header."
+        ),
+        responses={(200, 'text/csv'): str, (200, 'application/x-ndjson'): str}
+    )
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer], pagination_class=None)
+    def export(self, request):
+        """Stream the filtered time logs without loading them into memory."""
+        queryset = self.filter_queryset(self.get_queryset())
+        chunk_size = settings.TIMELOGS_EXPORT_CHUNK_SIZE
+        # Lazy: archived segments are opened as the response streams, and only
+        # for the months the filters reach
+        archived = self.repository.get_archived_logs(
+            None if request.user.is_staff else request.user.id,
+            request.query_params,
+            search=' '.join(TimeLogSearchFilter().get_search_terms(request)),
+        )
+
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            content, media_type, extension = (
+                stream_ndjson(queryset, chunk_size, archived), NDJSONRenderer.media_type, 'ndjson'
+            )
+        else:
+            content, media_type, extension = stream_csv(queryset, chunk_size, archived), CSVRenderer.media_type, 'csv'
+        if isinstance(request._request, ASGIRequest):
+            content = iterate_in_thread(content)
+
+        response = StreamingHttpResponse(content, content_type=f'{media_type}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="timelogs.{extension}"'
+        return response
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from ...infrastructure.archive import archive_completed_logs
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Move completed time logs older than the archive age out of the time log table '
+        'into compressed per-user, per-month archive segments'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=settings.TIMELOGS_ARCHIVE_AFTER_MONTHS,
+            help='Archive logs created before the month this many months before the current one'
+        )
+        parser.add_argument(
+            '--user',
+            dest='emails',
+            action='append',
+            help='Only archive the logs of this user (can be repeated)'
+        )
+
+    def handle(self, *args, **options):
+        if options['months'] < 0:
+            raise CommandError('--months must not be negative')
+
+        user_ids = None
+        if options['emails']:
+            user_ids = list(User.objects.filter(email__in=options['emails']).values_list('pk', flat=True))
+
+        user_count, log_count = archive_completed_logs(options['months'], user_ids)
+        self.stdout.write(self.style.SUCCESS(f'Archived {log_count} time logs of {user_count} users'))
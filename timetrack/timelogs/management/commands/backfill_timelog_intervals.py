@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import List, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...domain.models import TimeLog, TimeLogInterval
+from ...infrastructure.archive import DjangoTimeLogArchive
+
+User = get_user_model()
+
+
+def reconstruct_periods(time_log: TimeLog) -> List[Tuple[datetime, Optional[datetime]]]:
+    """
+    Rebuild the timer intervals of a log written before they were recorded.
+
+    Only the last run is known: it began at `start_time` (the last start or
+    resume) and is still open, or ended at the pause or the stop. The rest
+    of the active time becomes one interval ending where the paused time
+    before the last run begins. Logs stopped while paused, and manual
+    entries, get one interval of `duration` from `start_time`.
+    """
+    start = time_log.start_time
+    if start is None:
+        return []
+
+    if time_log.status == TimeLog.Status.RUNNING:
+        last_end = None
+        earlier = time_log.duration
+    elif time_log.status == TimeLog.Status.PAUSED and time_log.pause_start_time:
+        last_end = time_log.pause_start_time
+        earlier = time_log.duration - (last_end - start)
+    elif (time_log.status == TimeLog.Status.COMPLETED and time_log.end_time
+            and time_log.end_time - start <= time_log.duration):
+        # Stopped while running
+        last_end = time_log.end_time
+        earlier = time_log.duration - (last_end - start)
+    elif time_log.duration:
+        return [(start, start + time_log.duration)]
+    else:
+        return []
+
+    periods = []
+    if earlier > timedelta():
+        earlier_end = start - time_log.paused_duration
+        periods.append((earlier_end - earlier, earlier_end))
+    if last_end is None or last_end > start:
+        periods.append((start, last_end))
+    return periods
+
+
+class Command(BaseCommand):
+    help = 'Record timer intervals for the time logs written before intervals were recorded'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            dest='emails',
+            action='append',
+            help='Only backfill the time logs of this user (can be repeated)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Number of time logs fetched per database round trip'
+        )
+
+    def backfill_user(self, user_id, chunk_size):
+        """Record the intervals of one user's logs that have none, in a single transaction."""
+        recorded = set(TimeLogInterval.objects.filter(user_id=user_id).values_list('time_log_id', flat=True))
+        logs = TimeLog.objects.filter(user_id=user_id, start_time__isnull=False).exclude(id__in=recorded)
+
+        with transaction.atomic():
+            # Locked, so a timer transition cannot change them halfway through
+            active = list(logs.filter(status__in=[TimeLog.Status.RUNNING, TimeLog.Status.PAUSED]).select_for_update())
+            completed = logs.filter(status=TimeLog.Status.COMPLETED).iterator(chunk_size=chunk_size)
+            # Archived logs keep their intervals too
+            archived = (time_log for time_log in self.archive.get_logs(user_id) if time_log.id not in recorded)
+
+            intervals = [
+                TimeLogInterval(time_log_id=time_log.id, user_id=user_id, period=period)
+                for time_log in chain(active, completed, archived)
+                for period in reconstruct_periods(time_log)
+            ]
+            TimeLogInterval.objects.bulk_create(intervals, batch_size=chunk_size)
+        return len(intervals), len({interval.time_log_id for interval in intervals})
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['emails']:
+            users = users.filter(email__in=options['emails'])
+
+        self.archive = DjangoTimeLogArchive()
+        interval_count = log_count = user_count = 0
+        for user_id in users.values_list('pk', flat=True).iterator(chunk_size=options['chunk_size']):
+            intervals, logs = self.backfill_user(user_id, options['chunk_size'])
+            interval_count += intervals
+            log_count += logs
+            user_count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Recorded {interval_count} intervals for {log_count} time logs of {user_count} users'
+        ))
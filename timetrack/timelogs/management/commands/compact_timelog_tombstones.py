@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ...infrastructure.repositories import DjangoTimeLogRepository
+
+
+class Command(BaseCommand):
+    help = 'Delete the delta sync tombstones that no unexpired cursor can still need'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.TIMELOGS_TOMBSTONE_RETENTION_DAYS,
+            help='Days delta sync cursors stay valid (defaults to TIMELOGS_TOMBSTONE_RETENTION_DAYS)'
+        )
+
+    def handle(self, *args, **options):
+        # A day of slack for deletes whose transaction was still open when
+        # the oldest valid cursor was issued
+        before = timezone.now() - timedelta(days=options['days'] + 1)
+        deleted = DjangoTimeLogRepository().compact_tombstones(before)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstones from before {before:%Y-%m-%d %H:%M}'))
@@ -1,124 +1,308 @@
-from django.core.management.base import BaseCommand
+import csv
+import io
+import math
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, connections, transaction
 from django.utils import timezone
-from datetime import timedelta
-import random
 
 from ...domain.models import TimeLog
 
 User = get_user_model()
 
+DESCRIPTIONS = [
+    'Project Development',
+    'Client Meeting',
+    'Code Review',
+    'Documentation',
+    'Bug Fixing',
+    'Feature Implementation',
+    'Design Session',
+    'Research',
+    'Training',
+    'Performance Optimization'
+]
+
+# Columns written for every generated row, in COPY order
+COLUMNS = [
+    'id', 'user_id', 'description', 'duration', 'paused_duration', 'start_time',
+    'pause_start_time', 'end_time', 'status', 'created_at', 'updated_at'
+]
+
+
+@contextmanager
+def explicit_timestamps():
+    """Let generated rows keep their own created_at/updated_at values."""
+    fields = [TimeLog._meta.get_field('created_at'), TimeLog._meta.get_field('updated_at')]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def generate_user_logs(rng, user_id, count, days, now):
+    """
+    Yield one user's logs as dicts, in chronological order.
+
+    Logs follow each other without overlapping across the last `days` days,
+    so some naturally run over midnight. About a third are paused and
+    resumed a few times. The most recent log may still be running or
+    paused, and a few are created but never started.
+    """
+    span = timedelta(days=days)
+    # Average running plus paused minutes of a log, before scaling
+    mean_minutes = 70
+    # Heavy users get shorter entries so their history still fits the span
+    scale = min(1.0, span.total_seconds() * 0.8 / (count * mean_minutes * 60))
+
+    cursor = now - span
+    for index in range(count):
+        # Spread the time left before now over the remaining logs
+        remaining = count - index
+        mean_gap = ((now - cursor).total_seconds() - remaining * mean_minutes * 60 * scale) / remaining
+        cursor += timedelta(seconds=rng.expovariate(1 / mean_gap) if mean_gap > 0 else 0)
+        description = f'{rng.choice(DESCRIPTIONS)} #{rng.randint(1, 500)}'
+        is_last = index == count - 1
+
+        if rng.random() < 0.02:
+            yield {
+                'id': uuid.uuid4(), 'user_id': user_id, 'description': description,
+                'duration': timedelta(), 'paused_duration': timedelta(), 'start_time': None,
+                'pause_start_time': None, 'end_time': None, 'status': TimeLog.Status.CREATED,
+                'created_at': cursor, 'updated_at': cursor,
+            }
+            continue
+
+        # Alternate running and paused segments
+        segments = 1 + (rng.randint(1, 4) if rng.random() < 0.3 else 0)
+        first_start = cursor
+        duration = paused = timedelta()
+        segment_start = cursor
+        for segment in range(segments):
+            if segment:
+                pause = timedelta(minutes=rng.uniform(2, 30) * scale)
+                paused += pause
+                cursor += pause
+                segment_start = cursor
+            minutes = min(480, max(5, rng.lognormvariate(math.log(40), 0.7))) * scale / segments
+            run = timedelta(minutes=minutes)
+            duration += run
+            cursor += run
+
+        status = TimeLog.Status.COMPLETED
+        if is_last:
+            status = rng.choices(
+                [TimeLog.Status.COMPLETED, TimeLog.Status.RUNNING, TimeLog.Status.PAUSED],
+                weights=[6, 2, 2]
+            )[0]
+
+        log = {
+            'id': uuid.uuid4(), 'user_id': user_id, 'description': description,
+            'duration': duration, 'paused_duration': paused, 'start_time': segment_start,
+            'pause_start_time': None, 'end_time': cursor, 'status': status,
+            'created_at': first_start, 'updated_at': cursor,
+        }
+        if status == TimeLog.Status.RUNNING:
+            # The current segment is only added to duration on pause or stop
+            log['duration'] = duration - run
+            log['end_time'] = None
+        elif status == TimeLog.Status.PAUSED:
+            log['end_time'] = None
+            log['pause_start_time'] = cursor
+        yield log
+
+
+def to_copy_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, timedelta):
+        return f'{value.total_seconds()} seconds'
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def write_batch(rows, method):
+    if method == 'copy':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([to_copy_value(row[column]) for column in COLUMNS])
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {TimeLog._meta.db_table} ({", ".join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)',
+                buffer
+            )
+    else:
+        TimeLog.objects.bulk_create([TimeLog(**row) for row in rows])
+
+
+def generate_logs(job):
+    """
+    Generate and insert the logs of a slice of users.
+    Runs in a worker process, each with its own database connection.
+    """
+    users, seed, days, batch_size, method = job
+    now = timezone.now()
+    written = 0
+    batch = []
+    with explicit_timestamps():
+        for user_index, user_id, count in users:
+            # Seeded per user, so the data does not depend on the worker count
+            rng = random.Random(f'{seed}-{user_index}')
+            for log in generate_user_logs(rng, user_id, count, days, now):
+                batch.append(log)
+                if len(batch) >= batch_size:
+                    with transaction.atomic():
+                        write_batch(batch, method)
+                    written += len(batch)
+                    batch = []
+        if batch:
+            with transaction.atomic():
+                write_batch(batch, method)
+            written += len(batch)
+    connections.close_all()
+    return written
+
+
 class Command(BaseCommand):
     help = 'Populate database with sample time log data'
 
     def add_arguments(self, parser):
         parser.add_argument(
-            '--users', 
-            type=int, 
-            default=5, 
+            '--users',
+            type=int,
+            default=5,
             help='Number of users to create'
         )
         parser.add_argument(
-            '--logs-per-user', 
-            type=int, 
-            default=10, 
-            help='Number of time logs per user'
+            '--logs-per-user',
+            type=int,
+            default=10,
+            help='Average number of time logs per user'
+        )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.0,
+            help='Zipf exponent of the per-user log volume (0 gives every user the same volume)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Spread the logs over this many days before now'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='Random seed, for reproducible datasets'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of parallel worker processes'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows written per bulk insert or COPY'
+        )
+        parser.add_argument(
+            '--method',
+            choices=['auto', 'copy', 'bulk'],
+            default='auto',
+            help='Write with PostgreSQL COPY or bulk_create (auto picks COPY on PostgreSQL)'
+        )
+        parser.add_argument(
+            '--append',
+            action='store_true',
+            help='Keep existing time logs instead of deleting them first'
+        )
+        parser.add_argument(
+            '--skip-totals',
+            action='store_true',
+            help='Do not rebuild the daily totals of the generated users'
         )
 
-    def create_user(self, index):
-        """Create a sample user."""
-        username = f'user_{index}'
-        email = f'user_{index}@example.com'
-        try:
-            return User.objects.get(username=username)
-        except User.DoesNotExist:
-            return User.objects.create_user(
-                username=username, 
-                email=email, 
-                password=f'password_{index}'
-            )
+    def get_users(self, count):
+        """Get or create the sample users in one query each way."""
+        usernames = [f'user_{i}' for i in range(count)]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        # Hash once: every generated user shares the password "password"
+        password = make_password('password')
+        User.objects.bulk_create(
+            [
+                User(username=username, email=f'{username}@example.com', password=password)
+                for username in usernames if username not in existing
+            ],
+            batch_size=1000
+        )
+        ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+        return [ids[username] for username in usernames]
 
-    def generate_time_log(self, user):
-        """Generate a random time log for a user."""
-        # Possible descriptions
-        descriptions = [
-            'Project Development', 
-            'Client Meeting', 
-            'Code Review', 
-            'Documentation', 
-            'Bug Fixing', 
-            'Feature Implementation',
-            'Design Session', 
-            'Research', 
-            'Training', 
-            'Performance Optimization'
-        ]
+    def get_volumes(self, user_count, logs_per_user, skew, rng):
+        """Split the total log count over users following a Zipf distribution."""
+        weights = [1 / (rank + 1) ** skew for rank in range(user_count)]
+        rng.shuffle(weights)
+        total = user_count * logs_per_user
+        scale = total / sum(weights)
+        return [max(1, round(weight * scale)) for weight in weights]
 
-        # Possible statuses
-        statuses = [
-            TimeLog.Status.CREATED, 
-            TimeLog.Status.RUNNING, 
-            TimeLog.Status.PAUSED, 
-            TimeLog.Status.COMPLETED
-        ]
+    def handle(self, *args, **options):
+        method = options['method']
+        if method == 'auto':
+            method = 'copy' if connection.vendor == 'postgresql' else 'bulk'
 
-        # Random start time within last 30 days
-        start_time = timezone.now() - timedelta(days=random.randint(0, 30))
-        
-        # Random duration between 15 minutes and 4 hours
-        duration = timedelta(minutes=random.randint(15, 240))
-
-        # Create time log with randomized attributes
-        time_log = TimeLog.objects.create(
-            user=user,
-            description=random.choice(descriptions),
-            status=random.choice(statuses),
-            start_time=start_time,
-            duration=duration
-        )
+        if not options['append']:
+            # Clear existing time logs
+            TimeLog.objects.all().delete()
 
-        # Additional logic for specific statuses
-        if time_log.status == TimeLog.Status.PAUSED:
-            time_log.pause_start_time = start_time + timedelta(minutes=random.randint(15, 120))
-            time_log.paused_duration = timedelta(minutes=random.randint(10, 60))
-            time_log.save()
+        user_ids = self.get_users(options['users'])
+        rng = random.Random(options['seed'])
+        seed = options['seed'] if options['seed'] is not None else rng.getrandbits(32)
+        volumes = self.get_volumes(len(user_ids), options['logs_per_user'], options['skew'], rng)
 
-        return time_log
+        users = [(index, user_id, count) for index, (user_id, count) in enumerate(zip(user_ids, volumes))]
+        workers = max(1, min(options['workers'], len(users)))
+        jobs = [
+            (users[worker::workers], seed, options['days'], options['batch_size'], method)
+            for worker in range(workers)
+        ]
 
-    def handle(self, *args, **options):
-        # Clear existing time logs
-        TimeLog.objects.all().delete()
-        
-        # Number of users and logs
-        num_users = options['users']
-        logs_per_user = options['logs_per_user']
-
-        # Track created entities
-        created_users = []
-        created_logs = []
-
-        # Create users
-        for i in range(num_users):
-            user = self.create_user(i)
-            created_users.append(user)
-            
-            # Create time logs for each user
-            for _ in range(logs_per_user):
-                log = self.generate_time_log(user)
-                created_logs.append(log)
+        started = time.perf_counter()
+        if workers == 1:
+            written = generate_logs(jobs[0])
+        else:
+            # Forked workers must not share the parent's connection
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                written = sum(executor.map(generate_logs, jobs))
+        elapsed = time.perf_counter() - started
 
         # Output summary
         self.stdout.write(self.style.SUCCESS(
-            f'Successfully created {len(created_users)} users '
-            f'and {len(created_logs)} time logs'
+            f'Successfully created {written} time logs for {len(user_ids)} users '
+            f'in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s, {method}, {workers} workers)'
         ))
 
-        # Optional: Print some sample data
-        self.stdout.write("\nSample Created Logs:")
-        for log in created_logs[:5]:
-            self.stdout.write(
-                f"User: {log.user.username}, "
-                f"Description: {log.description}, "
-                f"Status: {log.status}, "
-                f"Duration: {log.duration}"
-            )
+        if not options['skip_totals'] and user_ids:
+            emails = list(User.objects.filter(id__in=user_ids).values_list('email', flat=True))
+            call_command('rebuild_time_totals', emails=emails, stdout=self.stdout)
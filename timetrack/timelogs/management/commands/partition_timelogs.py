@@ -0,0 +1,292 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.utils import timezone
+
+from ...domain.models import TimeLog
+from ...infrastructure.cache import invalidate_user_logs
+from ...infrastructure.partitions import (
+    LEGACY_PARTITION, get_partition_name, get_partitions, is_partitioned, month_start
+)
+
+# Unique indexes of a partitioned table must contain the partition key, so
+# the one-running-timer-per-user rule moves to this table, kept up to date
+# by a trigger. A second running timer violates its primary key, which
+# surfaces as the same IntegrityError the partial unique index raised.
+RUNNING_TIMER_SQL = [
+    """
+    CREATE TABLE timelogs_running_timer (
+        user_id uuid PRIMARY KEY,
+        time_log_id uuid NOT NULL
+    )
+    """,
+    """
+    CREATE FUNCTION timelogs_track_running_timer() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP <> 'INSERT' AND OLD.status = 'RUNNING' THEN
+            DELETE FROM timelogs_running_timer WHERE user_id = OLD.user_id AND time_log_id = OLD.id;
+        END IF;
+        IF TG_OP <> 'DELETE' AND NEW.status = 'RUNNING' THEN
+            INSERT INTO timelogs_running_timer (user_id, time_log_id) VALUES (NEW.user_id, NEW.id);
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER timelog_one_running_per_user
+    AFTER INSERT OR UPDATE OF status, user_id OR DELETE ON timelogs_timelog
+    FOR EACH ROW EXECUTE FUNCTION timelogs_track_running_timer()
+    """,
+    """
+    INSERT INTO timelogs_running_timer (user_id, time_log_id)
+    SELECT user_id, id FROM timelogs_timelog WHERE status = 'RUNNING'
+    """,
+]
+
+# Stamps change_xid for delta sync (see migration 0010)
+CHANGE_XID_TRIGGER = 'timelog_change_xid'
+
+
+def get_legacy_name(name: str) -> str:
+    # Identifiers are cut at 63 bytes
+    return f'{name[:56]}_legacy'
+
+
+def literal(moment) -> str:
+    return f"'{moment.isoformat()}'"
+
+
+class Command(BaseCommand):
+    help = (
+        'Partition the time log table by month on created_at: convert the existing '
+        'table, create partitions ahead of time or detach partitions past the retention'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'action',
+            choices=['convert', 'create', 'detach'],
+            help=(
+                'convert: turn the existing table into the first partition of a partitioned table; '
+                'create: add the monthly partitions for the coming months; '
+                'detach: detach the partitions older than the retention'
+            )
+        )
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=settings.TIMELOGS_PARTITION_MONTHS_AHEAD,
+            help='Months after the current one that must have a partition'
+        )
+        parser.add_argument(
+            '--retention-months',
+            type=int,
+            default=settings.TIMELOGS_PARTITION_RETENTION_MONTHS,
+            help='Months before the current one whose partitions are kept'
+        )
+        parser.add_argument(
+            '--drop',
+            action='store_true',
+            help='Drop detached partitions instead of keeping them as standalone tables'
+        )
+        parser.add_argument(
+            '--concurrently',
+            action='store_true',
+            help='Detach without blocking queries on the table (PostgreSQL 14+)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Print the DDL statements instead of running them'
+        )
+
+    def run(self, sql):
+        if self.dry_run:
+            self.stdout.write(f"{' '.join(sql.split())};")
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
+
+    def fetch(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def convert(self, months_ahead):
+        """
+        Swap the table for a partitioned one, keeping every existing row in
+        place: the old table is attached as the partition of everything
+        created before the cutoff. Its new primary key and the proof that
+        it holds nothing past the cutoff are built before the swap without
+        blocking writes, so the swap itself only takes a short lock.
+        """
+        if is_partitioned():
+            raise CommandError('The time log table is already partitioned')
+        # Migrations like 0008 and 0010 add indexes CONCURRENTLY, which a
+        # partitioned table does not support: they must all run before
+        executor = MigrationExecutor(connection)
+        pending = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if pending:
+            raise CommandError(
+                'Apply the pending migrations before converting: '
+                + ', '.join(f'{migration.app_label}.{migration.name}' for migration, _ in pending)
+            )
+
+        table = TimeLog._meta.db_table
+        # Past every existing row, and at least a week away so no row written
+        # before the swap ends up past it either
+        latest = self.fetch(f'SELECT max(created_at) FROM {table}', [])[0][0]
+        cutoff = month_start(max(filter(None, [latest, timezone.now() + timedelta(days=7)])), 1)
+        key_index = f'{table}_id_created_at'
+        bound = f'{table}_legacy_bound'
+        concurrently = '' if connection.in_atomic_block else ' CONCURRENTLY'
+
+        self.run(f'CREATE UNIQUE INDEX{concurrently} IF NOT EXISTS {key_index} ON {table} (id, created_at)')
+        self.run(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {bound}')
+        self.run(f'ALTER TABLE {table} ADD CONSTRAINT {bound} CHECK (created_at < {literal(cutoff)}) NOT VALID')
+        self.run(f'ALTER TABLE {table} VALIDATE CONSTRAINT {bound}')
+
+        indexes = self.fetch(
+            """
+            SELECT index.relname, pg_get_indexdef(index.oid), pg_index.indisunique
+            FROM pg_index JOIN pg_class index ON index.oid = pg_index.indexrelid
+            WHERE pg_index.indrelid = %s::regclass AND NOT pg_index.indisprimary AND index.relname <> %s
+            """,
+            [table, key_index]
+        )
+        constraints = self.fetch(
+            """
+            SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype IN ('p', 'f')
+            """,
+            [table]
+        )
+        primary_key = next(name for name, kind, _ in constraints if kind == 'p')
+        foreign_keys = [(name, definition) for name, kind, definition in constraints if kind == 'f']
+
+        with transaction.atomic():
+            self.run(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+            self.run(f'ALTER TABLE {table} RENAME TO {LEGACY_PARTITION}')
+            self.run(
+                f'ALTER TABLE {LEGACY_PARTITION} DROP CONSTRAINT {primary_key}, '
+                f'ADD CONSTRAINT {LEGACY_PARTITION}_pkey PRIMARY KEY USING INDEX {key_index}'
+            )
+            for name, definition, unique in indexes:
+                if unique:
+                    # Replaced by the running timer table below
+                    self.run(f'DROP INDEX {name}')
+                else:
+                    self.run(f'ALTER INDEX {name} RENAME TO {get_legacy_name(name)}')
+            for name, _ in foreign_keys:
+                self.run(f'ALTER TABLE {LEGACY_PARTITION} RENAME CONSTRAINT {name} TO {get_legacy_name(name)}')
+
+            # The parent gets the old names; attaching reuses the old table's
+            # matching indexes and foreign keys instead of building new ones.
+            self.run(
+                f'CREATE TABLE {table} (LIKE {LEGACY_PARTITION} INCLUDING DEFAULTS INCLUDING STORAGE) '
+                f'PARTITION BY RANGE (created_at)'
+            )
+            self.run(f'ALTER TABLE {table} ADD CONSTRAINT {primary_key} PRIMARY KEY (id, created_at)')
+            for name, definition, unique in indexes:
+                if not unique:
+                    self.run(definition)
+            for name, definition in foreign_keys:
+                self.run(f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}')
+            # The delta sync trigger moves to the parent, which clones it
+            # onto every partition, the old table included
+            self.run(f'DROP TRIGGER {CHANGE_XID_TRIGGER} ON {LEGACY_PARTITION}')
+            self.run(
+                f'CREATE TRIGGER {CHANGE_XID_TRIGGER} BEFORE INSERT OR UPDATE ON {table} '
+                f'FOR EACH ROW EXECUTE FUNCTION timelogs_set_change_xid()'
+            )
+            self.run(
+                f'ALTER TABLE {table} ATTACH PARTITION {LEGACY_PARTITION} '
+                f'FOR VALUES FROM (MINVALUE) TO ({literal(cutoff)})'
+            )
+            self.run(f'ALTER TABLE {LEGACY_PARTITION} DROP CONSTRAINT {bound}')
+            for sql in RUNNING_TIMER_SQL:
+                self.run(sql)
+            self.create(months_ahead, end=cutoff)
+
+        # Autovacuum never analyzes a partitioned table itself
+        self.run(f'ANALYZE {table}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Partitioned {table}, the existing rows form {LEGACY_PARTITION} up to {cutoff:%Y-%m-%d}'
+        ))
+
+    def create(self, months_ahead, end=None):
+        """Add monthly partitions until the one of `months_ahead` months from now."""
+        table = TimeLog._meta.db_table
+        if end is None:
+            end = get_partitions()[-1].end
+        last = month_start(timezone.now(), months_ahead + 1)
+
+        created = 0
+        while end < last:
+            start, end = end, month_start(end, 1)
+            self.run(
+                f'CREATE TABLE {get_partition_name(start)} PARTITION OF {table} '
+                f'FOR VALUES FROM ({literal(start)}) TO ({literal(end)})'
+            )
+            created += 1
+        return created
+
+    def detach(self, retention_months, drop, concurrently):
+        """
+        Detach the partitions ending before the retention window. Detached
+        partitions stay behind as standalone tables (to dump or archive)
+        unless dropped. Partitions still holding running or paused timers
+        are left attached.
+        """
+        if retention_months <= 0:
+            raise CommandError('Set --retention-months (or TIMELOGS_PARTITION_RETENTION_MONTHS) to detach partitions')
+        if concurrently and (connection.pg_version < 140000 or connection.in_atomic_block):
+            raise CommandError('Detaching concurrently needs PostgreSQL 14+ and no surrounding transaction')
+
+        table = TimeLog._meta.db_table
+        cutoff = month_start(timezone.now(), -retention_months)
+        detached = 0
+        for partition in get_partitions():
+            if partition.end > cutoff:
+                break
+            active = self.fetch(
+                f'SELECT EXISTS (SELECT 1 FROM {partition.name} WHERE status IN %s)',
+                [(TimeLog.Status.RUNNING.value, TimeLog.Status.PAUSED.value)]
+            )[0][0]
+            if active:
+                self.stdout.write(self.style.WARNING(f'Kept {partition.name}: it holds unfinished timers'))
+                continue
+
+            user_ids = self.fetch(f'SELECT DISTINCT user_id FROM {partition.name}', [])
+            self.run(f"ALTER TABLE {table} DETACH PARTITION {partition.name}{' CONCURRENTLY' if concurrently else ''}")
+            if drop:
+                self.run(f'DROP TABLE {partition.name}')
+            if not self.dry_run:
+                for (user_id,) in user_ids:
+                    invalidate_user_logs(user_id)
+            detached += 1
+        return detached
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Time log partitioning requires PostgreSQL')
+        self.dry_run = options['dry_run']
+
+        if options['action'] == 'convert':
+            self.convert(options['months_ahead'])
+            return
+
+        if not is_partitioned():
+            raise CommandError('The time log table is not partitioned, run "partition_timelogs convert" first')
+
+        if options['action'] == 'create':
+            created = self.create(options['months_ahead'])
+            self.stdout.write(self.style.SUCCESS(f'Created {created} partition(s)'))
+        else:
+            detached = self.detach(options['retention_months'], options['drop'], options['concurrently'])
+            verb = 'Dropped' if options['drop'] else 'Detached'
+            self.stdout.write(self.style.SUCCESS(f'{verb} {detached} partition(s)'))
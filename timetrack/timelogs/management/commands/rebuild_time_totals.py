@@ -0,0 +1,80 @@
+from collections import defaultdict
+from datetime import timedelta
+from itertools import chain
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from ...domain.models import DailyTimeTotal, TimeLog
+from ...infrastructure.archive import DjangoTimeLogArchive
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-day time totals rollup from the completed time logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            dest='emails',
+            action='append',
+            help='Only rebuild the totals of this user (can be repeated)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Number of time logs fetched per database round trip'
+        )
+
+    def rebuild_user(self, user_id, chunk_size, tz):
+        """Recompute one user's rollup rows in a single transaction."""
+        totals = defaultdict(lambda: [timedelta(), timedelta(), 0])
+        logs = (
+            TimeLog.objects
+            .filter(user_id=user_id, status=TimeLog.Status.COMPLETED)
+            .only('start_time', 'end_time', 'duration', 'paused_duration')
+        )
+
+        with transaction.atomic():
+            DailyTimeTotal.objects.filter(user_id=user_id).delete()
+            # Archived logs still count towards the totals
+            for time_log in chain(logs.iterator(chunk_size=chunk_size), self.archive.get_logs(user_id)):
+                for day, active, paused, count in time_log.get_daily_totals(tz):
+                    totals[day][0] += active
+                    totals[day][1] += paused
+                    totals[day][2] += count
+
+            DailyTimeTotal.objects.bulk_create(
+                [
+                    DailyTimeTotal(
+                        user_id=user_id,
+                        day=day,
+                        active_duration=active,
+                        paused_duration=paused,
+                        entry_count=count,
+                    )
+                    for day, (active, paused, count) in totals.items()
+                ],
+                batch_size=chunk_size
+            )
+        return len(totals)
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['emails']:
+            users = users.filter(email__in=options['emails'])
+
+        self.archive = DjangoTimeLogArchive()
+        tz = timezone.get_default_timezone()
+        user_count = day_count = 0
+        for user_id in users.values_list('pk', flat=True).iterator(chunk_size=options['chunk_size']):
+            day_count += self.rebuild_user(user_id, options['chunk_size'], tz)
+            user_count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {day_count} daily totals for {user_count} users'
+        ))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:14
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('timelogs', '0002_timelog_pause_start_time_timelog_paused_duration_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='timelog',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='timelog_user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='timelog',
+            index=models.Index(fields=['user', 'start_time', 'id'], name='timelog_user_start_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='timelog',
+            index=models.Index(fields=['user', 'end_time', 'id'], name='timelog_user_end_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='timelog',
+            index=models.Index(fields=['user', 'duration', 'id'], name='timelog_user_duration_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='timelog',
+            index=models.Index(fields=['user', 'status', '-created_at'], name='timelog_user_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='timelog',
+            index=models.Index(condition=models.Q(('status__in', ['RUNNING', 'PAUSED'])), fields=['user'], name='timelog_user_active_idx'),
+        ),
+    ]
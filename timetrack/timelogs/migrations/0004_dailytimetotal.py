@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:17
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timelogs', '0003_timelog_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTimeTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('active_duration', models.DurationField(default=datetime.timedelta)),
+                ('paused_duration', models.DurationField(default=datetime.timedelta)),
+                ('entry_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='daily_total_user_day_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('timelogs', '0005_timelog_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Users with several running timers keep the most recently started
+        # one running; the others are paused as the pause transition would.
+        migrations.RunSQL(
+            sql="""
+                UPDATE timelogs_timelog AS timelog
+                SET status = 'PAUSED',
+                    duration = timelog.duration + COALESCE(now() - timelog.start_time, INTERVAL '0'),
+                    pause_start_time = now(),
+                    updated_at = now()
+                FROM (
+                    SELECT id, row_number() OVER (
+                        PARTITION BY user_id ORDER BY start_time DESC NULLS LAST, id DESC
+                    ) AS position
+                    FROM timelogs_timelog
+                    WHERE status = 'RUNNING'
+                ) AS running
+                WHERE timelog.id = running.id AND running.position > 1
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='timelog',
+                    constraint=models.UniqueConstraint(condition=models.Q(('status', 'RUNNING')), fields=('user',), name='timelog_one_running_per_user'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    sql="""
+                        CREATE UNIQUE INDEX CONCURRENTLY timelog_one_running_per_user
+                        ON timelogs_timelog (user_id) WHERE status = 'RUNNING'
+                    """,
+                    reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS timelog_one_running_per_user',
+                ),
+            ],
+        ),
+    ]
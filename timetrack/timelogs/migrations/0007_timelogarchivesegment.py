@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timelogs', '0006_timelog_one_running_per_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimeLogArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('log_count', models.IntegerField()),
+                ('min_start_time', models.DateTimeField(null=True)),
+                ('max_start_time', models.DateTimeField(null=True)),
+                ('min_end_time', models.DateTimeField(null=True)),
+                ('max_end_time', models.DateTimeField(null=True)),
+                ('data', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', 'month'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'month'), name='archive_segment_user_month_uniq')],
+            },
+        ),
+    ]
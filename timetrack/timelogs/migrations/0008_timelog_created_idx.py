@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:58
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('timelogs', '0007_timelogarchivesegment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='timelog',
+            index=models.Index(fields=['-created_at', '-id'], name='timelog_created_idx'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('timelogs', '0009_timelog_intervals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timelog',
+            name='change_xid',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='TimeLogTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('time_log_id', models.UUIDField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('change_xid', models.BigIntegerField(editable=False, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['user', 'change_xid', 'time_log_id'], name='tombstone_user_change_idx'),
+                    models.Index(fields=['deleted_at'], name='tombstone_deleted_at_idx'),
+                ],
+            },
+        ),
+        migrations.RunSQL(
+            sql=[
+                """
+                CREATE FUNCTION timelogs_set_change_xid() RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    NEW.change_xid := txid_current();
+                    RETURN NEW;
+                END
+                $$
+                """,
+                """
+                CREATE TRIGGER timelog_change_xid
+                BEFORE INSERT OR UPDATE ON timelogs_timelog
+                FOR EACH ROW EXECUTE FUNCTION timelogs_set_change_xid()
+                """,
+                """
+                CREATE TRIGGER tombstone_change_xid
+                BEFORE INSERT OR UPDATE ON timelogs_timelogtombstone
+                FOR EACH ROW EXECUTE FUNCTION timelogs_set_change_xid()
+                """,
+                # The trigger stamps the existing rows
+                'UPDATE timelogs_timelog SET change_xid = NULL WHERE change_xid IS NULL',
+            ],
+            reverse_sql=[
+                'DROP TRIGGER tombstone_change_xid ON timelogs_timelogtombstone',
+                'DROP TRIGGER timelog_change_xid ON timelogs_timelog',
+                'DROP FUNCTION timelogs_set_change_xid()',
+            ],
+        ),
+        AddIndexConcurrently(
+            model_name='timelog',
+            index=models.Index(fields=['user', 'change_xid', 'id'], name='timelog_user_change_idx'),
+        ),
+    ]
@@ -0,0 +1,13 @@
+'use strict';
+{
+    // Reload the changelist filtered by the user picked in the autocomplete box
+    const $ = django.jQuery;
+    $(document).on('change', '.user-autocomplete-filter select', function() {
+        const filter = this.closest('.user-autocomplete-filter');
+        const params = new URLSearchParams(filter.dataset.queryString);
+        if (this.value) {
+            params.set(filter.dataset.parameter, this.value);
+        }
+        window.location.search = params.toString();
+    });
+}
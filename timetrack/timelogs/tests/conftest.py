@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..application.services import TimeTrackingService
+from ..domain.models import TimeLog
+from ..infrastructure.repositories import DjangoTimeLogRepository
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Cached timers, user logs and sync state must not leak between tests."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def sample_user():
+    """Create a sample user for testing."""
+    return User.objects.create_user(
+        username='testuser',
+        email='test@example.com',
+        password='testpass123'
+    )
+
+
+@pytest.fixture
+def api(sample_user):
+    client = APIClient()
+    client.force_authenticate(sample_user)
+    return client
+
+
+@pytest.fixture
+def service():
+    return TimeTrackingService(DjangoTimeLogRepository())
+
+
+@pytest.fixture
+def create_logs():
+    """
+    Factory inserting `count` time logs of a user in one statement:
+
+        create_logs(user, count=1, start_time=None, duration=1 hour, created_at=None,
+                    description='Work {index}', status=COMPLETED, **fields)
+
+    Completed logs run back to back for `duration` from `start_time` (30
+    days ago by default); others only get their start. Each was created as
+    it started unless `created_at` says otherwise, and `description` may
+    refer to the log's {index}. Other `fields` apply as given. Returns the
+    logs in order, as stored.
+    """
+    def create(user, count=1, start_time=None, duration=timedelta(hours=1), created_at=None,
+               description='Work {index}', status=TimeLog.Status.COMPLETED, **fields):
+        start_time = start_time or timezone.now() - timedelta(days=30)
+        time_logs = []
+        for index in range(count):
+            started = start_time + index * duration
+            values = {'start_time': started}
+            if status == TimeLog.Status.COMPLETED:
+                values.update(end_time=started + duration, duration=duration)
+            time_logs.append(TimeLog(user=user, description=description.format(index=index), status=status,
+                                     **{**values, **fields}))
+        ids = [time_log.id for time_log in TimeLog.objects.bulk_create(time_logs, batch_size=5000)]
+
+        # created_at is set on insert
+        TimeLog.objects.filter(id__in=ids).update(created_at=created_at or F('start_time'))
+        stored = TimeLog.objects.in_bulk(ids)
+        return [stored[time_log_id] for time_log_id in ids]
+    return create
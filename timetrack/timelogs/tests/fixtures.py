@@ -5,15 +5,6 @@ from ..domain.models import TimeLog
 
 User = get_user_model()
 
-@pytest.fixture
-def sample_user():
-    """Create a sample user for testing."""
-    return User.objects.create_user(
-        username='testuser', 
-        email='test@example.com', 
-        password='testpass123'
-    )
-
 @pytest.fixture
 def sample_timelog(sample_user):
     """Create a sample time log for testing."""
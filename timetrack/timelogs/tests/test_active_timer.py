@@ -0,0 +1,169 @@
+import random
+import threading
+
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+
+from ..domain.models import TimeLog
+from ..infrastructure.repositories import DjangoTimeLogRepository
+
+
+# Cache invalidation runs on commit, so these tests commit for real
+
+@pytest.mark.django_db(transaction=True)
+def test_active_follows_transitions(api, django_assert_num_queries):
+    assert api.get('/api/timelogs/active/').status_code == 204
+
+    time_log = api.post('/api/timelogs/start_new/', {'description': 'Work'}).json()
+    assert api.get('/api/timelogs/active/').json()['status'] == 'RUNNING'
+    with django_assert_num_queries(0):
+        assert api.get('/api/timelogs/active/').json()['id'] == time_log['id']
+
+    api.post(f"/api/timelogs/{time_log['id']}/pause/")
+    assert api.get('/api/timelogs/active/').json()['status'] == 'PAUSED'
+
+    api.patch(f"/api/timelogs/{time_log['id']}/", {'description': 'Renamed'})
+    assert api.get('/api/timelogs/active/').json()['description'] == 'Renamed'
+
+    api.post(f"/api/timelogs/{time_log['id']}/stop/")
+    assert api.get('/api/timelogs/active/').status_code == 204
+
+    time_log = api.post('/api/timelogs/start_new/', {'description': 'More work'}).json()
+    assert api.get('/api/timelogs/active/').status_code == 200
+    api.delete(f"/api/timelogs/{time_log['id']}/")
+    assert api.get('/api/timelogs/active/').status_code == 204
+
+
+@pytest.mark.django_db(transaction=True)
+def test_running_timer_wins_over_paused(api, sample_user, service):
+    paused = service.create_and_start_timer(sample_user.id, 'Paused')
+    service.pause_timer(paused.id)
+    running = service.create_and_start_timer(sample_user.id, 'Running')
+
+    assert service.get_active_timer(sample_user.id).id == running.id
+    service.stop_timer(running.id)
+    assert service.get_active_timer(sample_user.id).id == paused.id
+
+
+@pytest.mark.django_db(transaction=True)
+def test_one_running_timer_per_user(api, sample_user):
+    first = api.post('/api/timelogs/start_new/', {'description': 'First'}).json()
+
+    response = api.post('/api/timelogs/start_new/', {'description': 'Second'})
+    assert response.status_code == 409
+
+    api.post(f"/api/timelogs/{first['id']}/pause/")
+    second = api.post('/api/timelogs/start_new/', {'description': 'Second'}).json()
+    response = api.post(f"/api/timelogs/{first['id']}/resume/")
+    assert response.status_code == 409
+    assert 'another timer is running' in response.json()['error']
+
+    assert list(
+        TimeLog.objects.filter(user=sample_user, status=TimeLog.Status.RUNNING).values_list('id', flat=True)
+    ) == [TimeLog._meta.pk.to_python(second['id'])]
+    assert api.get('/api/timelogs/active/').json()['id'] == second['id']
+
+
+def run_threads(target, count):
+    errors = []
+
+    def run(index):
+        try:
+            target(index)
+        except Exception as error:  # Reported by the main thread
+            errors.append(error)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cache_stays_coherent_under_concurrent_transitions(sample_user, service):
+    """
+    Writers race random transitions over a few timers while readers keep
+    filling the cache. Once they are done, the cached answer must match a
+    fresh database read, and at most one timer may be running.
+    """
+    time_logs = [service.repository.create(sample_user.id, f'Timer {index}') for index in range(3)]
+    actions = ['start', 'pause', 'resume', 'stop']
+    writers = [4]
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def work(index):
+        if index < 4:
+            rng = random.Random(index)
+            try:
+                for _ in range(50):
+                    try:
+                        getattr(service, f'{rng.choice(actions)}_timer')(rng.choice(time_logs).id)
+                    except ValueError:
+                        pass
+            finally:
+                # A failing writer must not leave the readers spinning
+                with lock:
+                    writers[0] -= 1
+                    if not writers[0]:
+                        done.set()
+        else:
+            while not done.is_set():
+                service.get_active_timer(sample_user.id)
+
+    run_threads(work, 6)
+
+    active = (
+        TimeLog.objects
+        .filter(user=sample_user, status__in=DjangoTimeLogRepository.ACTIVE_STATUSES)
+        .order_by('-status', '-updated_at')
+        .first()
+    )
+    cached = service.get_active_timer(sample_user.id)
+    if active is None:
+        assert cached is None
+    else:
+        assert (cached.id, cached.status, cached.duration) == (active.id, active.status, active.duration)
+    assert TimeLog.objects.filter(user=sample_user, status=TimeLog.Status.RUNNING).count() <= 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_starts_leave_one_running_timer(sample_user, service):
+    time_logs = [service.repository.create(sample_user.id, f'Timer {index}') for index in range(8)]
+    started = []
+
+    def start(index):
+        try:
+            started.append(service.start_timer(time_logs[index].id))
+        except ValueError:
+            pass
+
+    run_threads(start, len(time_logs))
+
+    assert len(started) == 1
+    assert service.get_active_timer(sample_user.id).id == started[0].id
+
+
+@pytest.mark.django_db(transaction=True)
+def test_simultaneous_starts_conflict(sample_user):
+    """Two devices start a timer at once: one gets it, the other a 409."""
+    for round_index in range(10):
+        barrier = threading.Barrier(2)
+        statuses = []
+
+        def start(index):
+            client = APIClient()
+            client.force_authenticate(sample_user)
+            barrier.wait()
+            statuses.append(client.post('/api/timelogs/start_new/', {'description': f'Device {index}'}).status_code)
+
+        run_threads(start, 2)
+
+        assert sorted(statuses) == [201, 409], round_index
+        assert TimeLog.objects.filter(user=sample_user, status=TimeLog.Status.RUNNING).count() == 1
+        TimeLog.objects.filter(user=sample_user).delete()
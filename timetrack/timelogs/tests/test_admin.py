@@ -0,0 +1,98 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..domain.models import TimeLog
+
+User = get_user_model()
+
+pytestmark = pytest.mark.django_db
+
+CHANGELIST = '/admin/timelogs/timelog/'
+
+# Session, user, count, page of logs (joined with their users); the user
+# filter adds the selected user
+MAX_CHANGELIST_QUERIES = 5
+
+
+@pytest.fixture
+def admin_client(client):
+    admin = User.objects.create_superuser(email='admin@example.com', username='admin', password='password')
+    client.force_login(admin)
+    return client
+
+
+@pytest.fixture
+def users():
+    return [
+        User.objects.create_user(email=f'{name}@example.com', username=name, password='password')
+        for name in ('alice', 'bob', 'carol')
+    ]
+
+
+def create_logs(users, count):
+    TimeLog.objects.bulk_create(
+        TimeLog(user=users[index % len(users)], description=f'Task {index}') for index in range(count)
+    )
+
+
+def get_changelist(admin_client, params=None):
+    with CaptureQueriesContext(connection) as context:
+        response = admin_client.get(CHANGELIST, params or {})
+    assert response.status_code == 200
+    return response, [query['sql'] for query in context.captured_queries]
+
+
+def test_changelist_query_count(admin_client, users):
+    create_logs(users, 10)
+    _, small = get_changelist(admin_client)
+    create_logs(users, 150)
+    response, large = get_changelist(admin_client)
+
+    assert len(large) == len(small) <= MAX_CHANGELIST_QUERIES
+    assert len(response.context['cl'].result_list) == 100
+    # Users are not listed in the sidebar
+    assert not [query for query in large if 'FROM "authentication_user"' in query and 'WHERE' not in query]
+
+
+@override_settings(TIMELOGS_ADMIN_EXACT_COUNT_LIMIT=100)
+def test_large_changelists_are_estimated(admin_client, users):
+    create_logs(users, 30)
+    response, queries = get_changelist(admin_client, {'status__exact': 'CREATED'})
+    assert response.context['cl'].result_count == 30
+    assert any('COUNT(*)' in query for query in queries)
+
+    with override_settings(TIMELOGS_ADMIN_EXACT_COUNT_LIMIT=0):
+        response, queries = get_changelist(admin_client)
+    assert response.context['cl'].result_count > 0
+    assert not any('COUNT(*)' in query for query in queries)
+    assert response.context['cl'].full_result_count is None
+
+
+def test_user_filter(admin_client, users):
+    bob = users[1]
+    create_logs(users, 30)
+    response, queries = get_changelist(admin_client, {'user__id__exact': str(bob.id)})
+    assert {log.user_id for log in response.context['cl'].result_list} == {bob.id}
+    assert len(queries) <= MAX_CHANGELIST_QUERIES + 1
+    assert 'bob@example.com' in response.content.decode()
+
+    def autocomplete(term):
+        response = admin_client.get('/admin/autocomplete/', {
+            'app_label': 'timelogs', 'model_name': 'timelog', 'field_name': 'user', 'term': term,
+        })
+        return [result['text'] for result in response.json()['results']]
+
+    assert autocomplete('AL') == ['alice@example.com']
+    assert autocomplete('ob') == []
+    assert autocomplete('car') == ['carol@example.com']
+
+
+def test_query_matches_user_prefixes(admin_client, users):
+    create_logs(users, 9)
+    response, _ = get_changelist(admin_client, {'q': 'bo'})
+    assert len(response.context['cl'].result_list) == 3
+    response, _ = get_changelist(admin_client, {'q': 'ob'})
+    assert len(response.context['cl'].result_list) == 0
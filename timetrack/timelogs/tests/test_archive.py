@@ -0,0 +1,217 @@
+import io
+import json
+import os
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..domain.models import DailyTimeTotal, TimeLog, TimeLogArchiveSegment
+from ..infrastructure.archive import DjangoTimeLogArchive, archive_completed_logs
+from ..infrastructure.partitions import month_start
+from ..infrastructure.repositories import DjangoTimeLogRepository
+
+User = get_user_model()
+
+BENCHMARK_SIZE = os.getenv('TIMELOGS_ARCHIVE_BENCHMARK')
+BENCHMARK_OUTPUT = os.getenv('TIMELOGS_ARCHIVE_BENCHMARK_OUTPUT', 'archive-benchmark-results.json')
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def old_month():
+    return month_start(timezone.now(), -6)
+
+
+@pytest.fixture
+def logs(sample_user, old_month, create_logs):
+    archived, = create_logs(sample_user, start_time=old_month + timedelta(days=3, microseconds=7),
+                            duration=timedelta(hours=2, microseconds=5), description='Old work')
+    running, = create_logs(sample_user, start_time=timezone.now(), created_at=old_month + timedelta(days=4),
+                           status=TimeLog.Status.RUNNING, description='Old work')
+    recent, = create_logs(sample_user, start_time=timezone.now() - timedelta(days=1), description='Recent work')
+    return {'archived': archived, 'running': running, 'recent': recent}
+
+
+def test_archives_old_completed_logs(sample_user, logs, old_month, create_logs):
+    assert archive_completed_logs(months=3) == (1, 1)
+    assert set(TimeLog.objects.values_list('id', flat=True)) == {logs['running'].id, logs['recent'].id}
+
+    segment = TimeLogArchiveSegment.objects.get()
+    assert (segment.user_id, segment.month, segment.log_count) == (sample_user.id, old_month.date(), 1)
+    assert segment.min_start_time == segment.max_start_time == logs['archived'].start_time
+    assert segment.min_end_time == segment.max_end_time == logs['archived'].end_time
+
+    # Logs completed later join the month's segment
+    late, = create_logs(sample_user, start_time=old_month + timedelta(days=20))
+    assert archive_completed_logs(months=3) == (1, 1)
+    segment.refresh_from_db()
+    assert segment.log_count == 2
+    assert segment.max_end_time == late.end_time
+
+    # Nothing left to do
+    assert archive_completed_logs(months=3) == (0, 0)
+
+
+def test_archived_logs_keep_their_values(sample_user, logs):
+    archive_completed_logs(months=3)
+    archived = list(DjangoTimeLogArchive().get_logs(sample_user.id))
+    assert len(archived) == 1
+    original = logs['archived']
+    for field in TimeLog._meta.concrete_fields:
+        assert getattr(archived[0], field.attname) == getattr(original, field.attname), field.name
+    assert archived[0].user.email == sample_user.email
+
+
+def test_get_user_logs_reads_through(sample_user, logs, old_month):
+    repository = DjangoTimeLogRepository()
+    archive_completed_logs(months=3)
+
+    def ids(**filters):
+        return [time_log.id for time_log in repository.get_user_logs(sample_user.id, **filters)]
+
+    assert ids() == [logs['recent'].id, logs['running'].id, logs['archived'].id]
+    assert ids(status='COMPLETED') == [logs['recent'].id, logs['archived'].id]
+    assert ids(status='RUNNING') == [logs['running'].id]
+
+    day = (old_month + timedelta(days=3)).date()
+    assert ids(created_from=day, created_to=day) == [logs['archived'].id]
+    assert ids(start_date=day, end_date=day) == [logs['archived'].id]
+    assert logs['archived'].id not in ids(created_from=day + timedelta(days=1))
+    assert logs['archived'].id not in ids(end_date=day - timedelta(days=1))
+
+    with pytest.raises(ValueError, match='Invalid time log filters'):
+        repository.get_user_logs(sample_user.id, created_from='yesterday')
+
+
+def test_manifest_limits_opened_segments(sample_user, logs, old_month):
+    archive_completed_logs(months=3)
+    archive = DjangoTimeLogArchive()
+    next_month = month_start(old_month, 1)
+
+    assert archive.get_segments(sample_user.id, {}).count() == 1
+    assert archive.get_segments(sample_user.id, {'created_at': (old_month, next_month)}).count() == 1
+    assert not archive.get_segments(sample_user.id, {'created_at': (next_month, None)}).exists()
+    assert not archive.get_segments(sample_user.id, {'created_at': (None, old_month)}).exists()
+    assert not archive.get_segments(sample_user.id, {'start_time': (next_month, None)}).exists()
+    assert not archive.get_segments(sample_user.id, {'end_time': (None, old_month)}).exists()
+
+
+def test_get_logs_opens_segments_lazily(sample_user, old_month, create_logs, django_assert_num_queries):
+    newer, = create_logs(sample_user, start_time=month_start(old_month, 1) + timedelta(days=2))
+    older, = create_logs(sample_user, start_time=old_month + timedelta(days=2))
+    archive_completed_logs(months=3)
+
+    with django_assert_num_queries(0):
+        time_logs = DjangoTimeLogArchive().get_logs(sample_user.id)
+    # The manifest, then the newest month's data only
+    with django_assert_num_queries(2):
+        assert next(time_logs).id == newer.id
+    with django_assert_num_queries(1):
+        assert [time_log.id for time_log in time_logs] == [older.id]
+
+
+def test_export_merges_archived_logs(api, sample_user, logs):
+    archive_completed_logs(months=3)
+
+    def export(**params):
+        response = api.get('/api/timelogs/export/', {'format': 'ndjson', **params})
+        return [json.loads(line)['id'] for line in response.getvalue().decode().splitlines()]
+
+    ids = {name: str(time_log.id) for name, time_log in logs.items()}
+    assert export() == [ids['recent'], ids['running'], ids['archived']]
+    assert export(ordering='-duration') == [ids['archived'], ids['recent'], ids['running']]
+    assert export(ordering='end_time') == [ids['archived'], ids['recent'], ids['running']]
+    assert export(status='RUNNING') == [ids['running']]
+    assert export(created_to=timezone.now().date() - timedelta(days=30)) == [ids['running'], ids['archived']]
+
+
+def test_rebuild_time_totals_counts_archived_logs(sample_user, logs):
+    archive_completed_logs(months=3)
+    call_command('rebuild_time_totals', stdout=io.StringIO())
+    assert sum(DailyTimeTotal.objects.filter(user=sample_user).values_list('entry_count', flat=True)) == 2
+
+
+def test_command(sample_user, logs):
+    stdout = io.StringIO()
+    call_command('archive_timelogs', '--months', '3', '--user', 'nobody@example.com', stdout=stdout)
+    assert 'Archived 0 time logs of 0 users' in stdout.getvalue()
+    call_command('archive_timelogs', '--months', '3', '--user', sample_user.email, stdout=stdout)
+    assert 'Archived 1 time logs of 1 users' in stdout.getvalue()
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(not BENCHMARK_SIZE, reason='set TIMELOGS_ARCHIVE_BENCHMARK (e.g. 100k) to run')
+def test_archive_benchmark():
+    """
+    Hot table size and list latency before and after archiving the older
+    year of two years of history. Both sides are measured after VACUUM
+    FULL, so the sizes compare live data rather than bloat.
+    """
+    size = int(BENCHMARK_SIZE.replace('k', '000').replace('M', '000000'))
+    users = max(1, size // 1000)
+    call_command(
+        'dump_timelogs', users=users, logs_per_user=size // users, days=730, seed=42,
+        workers=4, skip_totals=True, stdout=io.StringIO()
+    )
+    user = User.objects.annotate(log_count=Count('timelog')).order_by('-log_count').first()
+    client = Client(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    recent = (timezone.now() - timedelta(days=60)).date()
+    cases = {
+        'list': {},
+        'list_page_20': {'page': 20},
+        'list_cursor': {'pagination': 'cursor'},
+        'list_created_recent': {'created_from': recent},
+        'list_start_date_recent': {'start_date': recent},
+    }
+
+    def measure():
+        with connection.cursor() as cursor:
+            cursor.execute(f'VACUUM FULL ANALYZE {TimeLog._meta.db_table}')
+            cursor.execute('SELECT pg_total_relation_size(%s), pg_total_relation_size(%s)',
+                           [TimeLog._meta.db_table, TimeLogArchiveSegment._meta.db_table])
+            hot_bytes, archive_bytes = cursor.fetchone()
+        result = {
+            'hot_rows': TimeLog.objects.count(),
+            'hot_table_bytes': hot_bytes,
+            'archive_table_bytes': archive_bytes,
+        }
+        for name, params in cases.items():
+            timings = []
+            for round_index in range(25):
+                started = time.perf_counter()
+                response = client.get('/api/timelogs/', params)
+                elapsed = time.perf_counter() - started
+                assert response.status_code == 200
+                if round_index >= 5:
+                    timings.append(elapsed * 1000)
+            result[f'{name}_p95_ms'] = round(statistics.quantiles(timings, n=100, method='inclusive')[94], 3)
+        return result
+
+    before = measure()
+    started = time.perf_counter()
+    users_archived, logs_archived = archive_completed_logs(months=12)
+    archive_seconds = time.perf_counter() - started
+    after = measure()
+
+    report = {
+        'size': BENCHMARK_SIZE,
+        'archived_logs': logs_archived,
+        'archived_users': users_archived,
+        'archive_seconds': round(archive_seconds, 2),
+        'before': before,
+        'after': after,
+    }
+    Path(BENCHMARK_OUTPUT).write_text(json.dumps(report, indent=2))
+    assert after['hot_table_bytes'] < before['hot_table_bytes']
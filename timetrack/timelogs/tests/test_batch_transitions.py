@@ -0,0 +1,180 @@
+import json
+import os
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..domain.models import DailyTimeTotal, TimeLog, TimeLogInterval
+from ..infrastructure.repositories import DjangoTimeLogRepository
+
+User = get_user_model()
+
+BENCHMARK_SIZE = os.getenv('TIMELOGS_BATCH_BENCHMARK')
+BENCHMARK_OUTPUT = os.getenv('TIMELOGS_BATCH_BENCHMARK_OUTPUT', 'batch-benchmark-results.json')
+
+pytestmark = pytest.mark.django_db
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def create_timers(users, status=TimeLog.Status.RUNNING):
+    """One timer per user, started an hour ago, with its open interval."""
+    started = timezone.now() - timedelta(hours=1)
+    return DjangoTimeLogRepository().create_many([
+        TimeLog(user=user, description='Work', status=status, start_time=started)
+        for user in users
+    ])
+
+
+@pytest.fixture
+def other_user():
+    return User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+
+
+@pytest.fixture
+def staff_user():
+    return User.objects.create_user(username='staff', email='staff@example.com', password='testpass123',
+                                    is_staff=True)
+
+
+def test_stop_by_ids(sample_user, other_user):
+    mine, = create_timers([sample_user])
+    theirs, = create_timers([other_user])
+    completed = TimeLog.objects.create(user=sample_user, description='Done', status=TimeLog.Status.COMPLETED)
+    missing = uuid.uuid4()
+
+    response = client_for(sample_user).post('/api/timelogs/batch_transition/', {
+        'action': 'stop',
+        'ids': [str(mine.id), str(theirs.id), str(completed.id), str(missing)],
+    }, format='json')
+    assert response.status_code == 200
+    assert [(outcome['outcome'], outcome['status']) for outcome in response.json()] == [
+        ('applied', 'COMPLETED'),
+        # Other users' timers are out of reach
+        ('not_found', None),
+        ('not_allowed', 'COMPLETED'),
+        ('not_found', None),
+    ]
+
+    mine.refresh_from_db()
+    assert mine.status == TimeLog.Status.COMPLETED
+    assert mine.duration >= timedelta(hours=1)
+    assert not TimeLogInterval.objects.filter(time_log_id=mine.id, period__upper_inf=True).exists()
+    assert DailyTimeTotal.objects.filter(user=sample_user).exists()
+    theirs.refresh_from_db()
+    assert theirs.status == TimeLog.Status.RUNNING
+
+
+def test_pause_by_status(sample_user):
+    running, = create_timers([sample_user])
+    paused, = create_timers([sample_user], status=TimeLog.Status.PAUSED)
+
+    response = client_for(sample_user).post('/api/timelogs/batch_transition/', {
+        'action': 'pause', 'status': ['RUNNING'],
+    }, format='json')
+    assert response.json() == [{'id': str(running.id), 'outcome': 'applied', 'status': 'PAUSED'}]
+
+
+def test_staff_stop_by_users(sample_user, other_user, staff_user):
+    create_timers([sample_user, other_user])
+
+    response = client_for(staff_user).post('/api/timelogs/batch_transition/', {
+        'action': 'stop', 'status': ['RUNNING', 'PAUSED'], 'users': [str(sample_user.id), str(other_user.id)],
+    }, format='json')
+    assert len(response.json()) == 2
+    assert not TimeLog.objects.exclude(status=TimeLog.Status.COMPLETED).exists()
+
+
+def test_validation(sample_user, staff_user):
+    api = client_for(sample_user)
+    assert api.post('/api/timelogs/batch_transition/', {'action': 'stop'}, format='json').status_code == 400
+    assert api.post('/api/timelogs/batch_transition/', {
+        'action': 'resume', 'status': ['PAUSED'],
+    }, format='json').status_code == 400
+    assert api.post('/api/timelogs/batch_transition/', {
+        'action': 'stop', 'users': [str(staff_user.id)],
+    }, format='json').status_code == 400
+    # Staff must narrow a status selection to some users
+    assert client_for(staff_user).post('/api/timelogs/batch_transition/', {
+        'action': 'stop', 'status': ['RUNNING'],
+    }, format='json').status_code == 400
+
+
+def create_users(count):
+    return User.objects.bulk_create([
+        User(username=f'user-{index}', email=f'user-{index}@example.com') for index in range(count)
+    ])
+
+
+@pytest.mark.parametrize('action', ['pause', 'stop'])
+def test_transition_is_one_statement(action, django_assert_num_queries):
+    time_logs = create_timers(create_users(20))
+
+    with django_assert_num_queries(1):
+        changed = DjangoTimeLogRepository().transition_many(action, timezone.now(),
+                                                            [time_log.id for time_log in time_logs])
+    assert len(changed) == 20
+
+
+def test_batch_queries_do_not_grow_with_timers(staff_user, django_assert_num_queries):
+    api = client_for(staff_user)
+
+    def pause(time_logs):
+        return api.post('/api/timelogs/batch_transition/', {
+            'action': 'pause', 'ids': [str(time_log.id) for time_log in time_logs],
+        }, format='json')
+
+    users = create_users(21)
+    one, many = create_timers(users[:1]), create_timers(users[1:])
+    with CaptureQueriesContext(connection) as context:
+        pause(one)
+    with django_assert_num_queries(len(context.captured_queries)):
+        response = pause(many)
+    assert [outcome['outcome'] for outcome in response.json()] == ['applied'] * 20
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(not BENCHMARK_SIZE, reason='set TIMELOGS_BATCH_BENCHMARK (e.g. 10k) to run')
+def test_batch_benchmark(staff_user):
+    """Stopping BENCHMARK_SIZE running timers: one request per timer against one batch request."""
+    size = int(BENCHMARK_SIZE.replace('k', '000'))
+    users = User.objects.bulk_create([
+        User(username=f'benchmark-{index}', email=f'benchmark-{index}@example.com') for index in range(size)
+    ])
+    api = client_for(staff_user)
+
+    time_logs = create_timers(users)
+    started = time.perf_counter()
+    for time_log in time_logs:
+        assert api.post(f'/api/timelogs/{time_log.id}/stop/').status_code == 200
+    loop_seconds = time.perf_counter() - started
+
+    time_logs = create_timers(users)
+    started = time.perf_counter()
+    response = api.post('/api/timelogs/batch_transition/', {
+        'action': 'stop', 'ids': [str(time_log.id) for time_log in time_logs],
+    }, format='json')
+    batch_seconds = time.perf_counter() - started
+    assert all(outcome['outcome'] == 'applied' for outcome in response.json())
+
+    report = {
+        'size': BENCHMARK_SIZE,
+        'per_id_seconds': round(loop_seconds, 3),
+        'batch_seconds': round(batch_seconds, 3),
+        'speedup': round(loop_seconds / batch_seconds, 1),
+    }
+    Path(BENCHMARK_OUTPUT).write_text(json.dumps(report, indent=2))
+    assert batch_seconds < loop_seconds
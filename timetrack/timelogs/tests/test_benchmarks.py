@@ -0,0 +1,467 @@
+"""
+Endpoint benchmarks.
+
+Seeds datasets with dump_timelogs, drives every TimeLogViewSet and auth
+endpoint through the Django test client, and records p50/p95 latency, SQL
+query count and response size per endpoint and dataset size. Results are
+written to a JSON file that can be compared across commits, and the run
+fails when an endpoint exceeds its budget in benchmark_budgets.json.
+
+Skipped unless TIMELOGS_BENCHMARK_SIZES is set, e.g.:
+
+    TIMELOGS_BENCHMARK_SIZES=1k,100k,1M pytest timelogs/tests/test_benchmarks.py
+
+Other settings:
+    TIMELOGS_BENCHMARK_ROUNDS   timed requests per endpoint (default 20)
+    TIMELOGS_BENCHMARK_OUTPUT   results file (default benchmark-results.json)
+    TIMELOGS_BENCHMARK_WORKERS  dump_timelogs worker processes (default 4)
+"""
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import timeit
+import tracemalloc
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+import django
+import pytest
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from ..domain.models import TimeLog
+from ..interfaces.renderers import OPTIONAL_RENDERERS, MessagePackRenderer
+from ..interfaces.serializers import TimeLogRowSerializer, TimeLogSerializer
+
+User = get_user_model()
+
+SIZES = [size for size in os.getenv('TIMELOGS_BENCHMARK_SIZES', '').split(',') if size]
+ROUNDS = int(os.getenv('TIMELOGS_BENCHMARK_ROUNDS', 20))
+WARMUP_ROUNDS = 2
+OUTPUT = os.getenv('TIMELOGS_BENCHMARK_OUTPUT', 'benchmark-results.json')
+WORKERS = int(os.getenv('TIMELOGS_BENCHMARK_WORKERS', 4))
+BUDGETS = json.loads((Path(__file__).parent / 'benchmark_budgets.json').read_text())
+PASSWORD = 'password'
+SERIALIZER_ROWS = 10000
+# What a mobile client shows of each log
+SPARSE_FIELDS = ['id', 'description', 'status', 'start_time', 'duration']
+
+pytestmark = [
+    pytest.mark.benchmark,
+    pytest.mark.django_db,
+    pytest.mark.skipif(not SIZES, reason='set TIMELOGS_BENCHMARK_SIZES to run the benchmarks'),
+]
+
+
+def parse_size(label):
+    """'1k' -> 1000, '1M' -> 1000000."""
+    multipliers = {'k': 1000, 'M': 1000000}
+    if label[-1] in multipliers:
+        return int(label[:-1]) * multipliers[label[-1]]
+    return int(label)
+
+
+class Dataset:
+    def __init__(self, label, user, access, refresh):
+        self.label = label
+        self.user = user
+        self.access = access
+        self.refresh = refresh
+        self.user_logs = TimeLog.objects.filter(user=user).count()
+        self.log = TimeLog.objects.filter(user=user).order_by('-created_at').first()
+
+    @property
+    def auth(self):
+        return {'HTTP_AUTHORIZATION': f'Bearer {self.access}'}
+
+
+def create_log(dataset, status, **fields):
+    """Create one of the benchmark user's logs, outside the timed request."""
+    now = timezone.now()
+    if status != TimeLog.Status.CREATED:
+        fields.setdefault('start_time', now - timedelta(minutes=30))
+    if status == TimeLog.Status.PAUSED:
+        fields.setdefault('pause_start_time', now - timedelta(minutes=5))
+    return TimeLog.objects.create(user=dataset.user, description='Benchmark', status=status, **fields)
+
+
+def stop_running(dataset):
+    TimeLog.objects.filter(user=dataset.user, status=TimeLog.Status.RUNNING).update(
+        status=TimeLog.Status.COMPLETED, end_time=timezone.now()
+    )
+
+
+def list_cases():
+    """Every list variant: filters, search, orderings and both paginations."""
+    today = timezone.now().date()
+    params = [
+        ('list', {}),
+        ('list_page_size_100', {'page_size': 100}),
+        ('list_sparse_fields', {'page_size': 100, 'fields': ','.join(SPARSE_FIELDS)}),
+        ('list_search', {'search': 'review'}),
+        ('list_search_prefix', {'search': 'rev'}),
+        ('list_search_words', {'search': 'code review 42'}),
+        ('list_search_typo', {'search': 'reveiw'}),
+        ('list_date_range', {'start_date': today - timedelta(days=30), 'end_date': today}),
+        ('list_start_date', {'start_date': today - timedelta(days=30)}),
+        ('list_end_date', {'end_date': today - timedelta(days=30)}),
+    ]
+    params += [(f'list_status_{value.lower()}', {'status': value}) for value in TimeLog.Status.values]
+    for field in ['start_time', 'end_time', 'duration', 'created_at']:
+        for ordering in [field, f'-{field}']:
+            params.append((f'list_ordering_{ordering}', {'ordering': ordering}))
+            params.append((f'list_cursor_{ordering}', {'pagination': 'cursor', 'ordering': ordering}))
+    cases = [
+        (name, lambda dataset, query=query: ('get', '/api/timelogs/', query, dataset.auth))
+        for name, query in params
+    ]
+    if OPTIONAL_RENDERERS:
+        cases.append((
+            'list_msgpack',
+            lambda dataset: ('get', '/api/timelogs/', {'page_size': 100}, {**dataset.auth, 'HTTP_ACCEPT': 'application/msgpack'})
+        ))
+    return cases
+
+
+def timelog_cases():
+    """Non-list TimeLogViewSet endpoints."""
+
+    def retrieve(dataset):
+        return 'get', f'/api/timelogs/{dataset.log.id}/', None, dataset.auth
+
+    def create(dataset):
+        data = {
+            'description': 'Benchmark',
+            'start_time': (timezone.now() - timedelta(hours=2)).isoformat(),
+            'duration': '01:00:00',
+        }
+        return 'post', '/api/timelogs/', data, dataset.auth
+
+    def bulk(dataset):
+        start = timezone.now() - timedelta(days=10)
+        entries = [
+            {
+                'description': f'Benchmark {index}',
+                'start_time': (start + timedelta(hours=index)).isoformat(),
+                'duration': '00:30:00',
+            }
+            for index in range(100)
+        ]
+        return 'post', '/api/timelogs/bulk/', {'entries': entries}, dataset.auth
+
+    def start_new(dataset):
+        stop_running(dataset)
+        return 'post', '/api/timelogs/start_new/', {'description': 'Benchmark'}, dataset.auth
+
+    def transition(action, status):
+        def case(dataset):
+            if status == TimeLog.Status.CREATED or action == 'resume':
+                stop_running(dataset)
+            time_log = create_log(dataset, status)
+            return 'post', f'/api/timelogs/{time_log.id}/{action}/', None, dataset.auth
+        return case
+
+    def active(dataset):
+        return 'get', '/api/timelogs/active/', None, dataset.auth
+
+    def summary(dataset):
+        return 'get', '/api/timelogs/summary/', {'period': 'week'}, dataset.auth
+
+    def export(dataset):
+        return 'get', '/api/timelogs/export/', {'format': 'csv'}, dataset.auth
+
+    return [
+        ('retrieve', retrieve),
+        ('create', create),
+        ('bulk_100', bulk),
+        ('start_new', start_new),
+        ('start', transition('start', TimeLog.Status.CREATED)),
+        ('pause', transition('pause', TimeLog.Status.RUNNING)),
+        ('resume', transition('resume', TimeLog.Status.PAUSED)),
+        ('stop', transition('stop', TimeLog.Status.RUNNING)),
+        ('active', active),
+        ('summary', summary),
+        ('export_csv', export),
+    ]
+
+
+def auth_cases():
+    """Authentication endpoints."""
+
+    def register(dataset):
+        username = f'bench_{uuid.uuid4().hex[:12]}'
+        data = {
+            'username': username,
+            'email': f'{username}@example.com',
+            'password': 'Bench-pass-123',
+            'password2': 'Bench-pass-123',
+        }
+        return 'post', '/api/auth/register/', data, {}
+
+    def login(dataset):
+        data = {'email': dataset.user.email, 'password': PASSWORD}
+        return 'post', '/api/auth/login/', data, {}
+
+    def refresh(dataset):
+        return 'post', '/api/auth/refresh/', {'refresh': dataset.refresh}, {}
+
+    def me(dataset):
+        return 'get', '/api/auth/me/', None, dataset.auth
+
+    return [
+        ('auth_register', register),
+        ('auth_login', login),
+        ('auth_refresh', refresh),
+        ('auth_me', me),
+    ]
+
+
+CASES = list_cases() + timelog_cases() + auth_cases()
+
+
+def pytest_generate_tests(metafunc):
+    if 'dataset' in metafunc.fixturenames:
+        metafunc.parametrize('dataset', SIZES, indirect=True, scope='module')
+    if 'case' in metafunc.fixturenames:
+        metafunc.parametrize('case', CASES, ids=[name for name, _ in CASES])
+
+
+@pytest.fixture(scope='module')
+def dataset(request, django_db_setup, django_db_blocker):
+    """
+    Seed `size` logs spread over size/1000 users with skewed volume, and
+    benchmark as the user with the most logs.
+    """
+    label = request.param
+    size = parse_size(label)
+    users = max(1, size // 1000)
+    with django_db_blocker.unblock():
+        call_command(
+            'dump_timelogs',
+            users=users,
+            logs_per_user=size // users,
+            seed=42,
+            workers=WORKERS,
+            skip_totals=True,
+            stdout=io.StringIO()
+        )
+        user = (
+            User.objects.filter(username__startswith='user_')
+            .annotate(log_count=Count('timelog'))
+            .order_by('-log_count')
+            .first()
+        )
+        user.set_password(PASSWORD)
+        user.save(update_fields=['password'])
+        call_command('rebuild_time_totals', emails=[user.email], stdout=io.StringIO())
+
+        tokens = Client().post(
+            '/api/auth/login/', {'email': user.email, 'password': PASSWORD}, content_type='application/json'
+        ).json()
+        yield Dataset(label, user, tokens['access'], tokens['refresh'])
+
+
+@pytest.fixture(scope='session')
+def benchmark_results():
+    """Collect results and write them once the session ends."""
+    results = {}
+    yield results
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    report = {
+        'commit': commit,
+        'created_at': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'rounds': ROUNDS,
+        'results': results,
+    }
+    Path(OUTPUT).write_text(json.dumps(report, indent=2, sort_keys=True))
+
+
+def response_size(response):
+    if response.streaming:
+        return sum(len(block) for block in response.streaming_content)
+    return len(response.content)
+
+
+def run_case(client, dataset, build):
+    """Time ROUNDS requests (after warmup), preparing each one untimed."""
+    timings = []
+    queries = size = status = 0
+    for round_index in range(WARMUP_ROUNDS + ROUNDS):
+        method, path, data, headers = build(dataset)
+        send = getattr(client, method)
+        kwargs = {'content_type': 'application/json'} if method == 'post' else {}
+
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = send(path, data, **kwargs, **headers)
+            body_size = response_size(response)
+            elapsed = time.perf_counter() - started
+
+        status = response.status_code
+        assert status < 400, f'{method.upper()} {path} returned {status}: {response.content[:500]!r}'
+        if round_index >= WARMUP_ROUNDS:
+            timings.append(elapsed * 1000)
+            queries = max(queries, len(context.captured_queries))
+            size = max(size, body_size)
+
+    percentiles = statistics.quantiles(timings, n=100, method='inclusive')
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentiles[94], 3),
+        'queries': queries,
+        'bytes': size,
+        'status': status,
+        'user_logs': dataset.user_logs,
+    }
+
+
+def check_budget(name, label, result):
+    """Return the ways `result` exceeds its budget, if it has one."""
+    budget = BUDGETS.get(name, {})
+    failures = []
+    if 'queries' in budget and result['queries'] > budget['queries']:
+        failures.append(f"{result['queries']} queries > {budget['queries']}")
+    p95_budget = budget.get('p95_ms')
+    if isinstance(p95_budget, dict):
+        p95_budget = p95_budget.get(label)
+    if p95_budget is not None and result['p95_ms'] > p95_budget:
+        failures.append(f"p95 {result['p95_ms']}ms > {p95_budget}ms")
+    return failures
+
+
+def test_endpoint(dataset, case, benchmark_results):
+    name, build = case
+    result = run_case(Client(), dataset, build)
+    benchmark_results.setdefault(dataset.label, {})[name] = result
+
+    failures = check_budget(name, dataset.label, result)
+    assert not failures, f'{name} at {dataset.label}: ' + ', '.join(failures)
+
+
+def test_serializer_throughput(dataset, benchmark_results):
+    """
+    Rows/second of TimeLogSerializer over model instances against
+    TimeLogRowSerializer over `.values()` rows, with and without the fetch.
+    """
+    queryset = TimeLog.objects.filter(user=dataset.user).order_by('-created_at')
+
+    def model_serializer(items=None):
+        return TimeLogSerializer(items or queryset[:SERIALIZER_ROWS], many=True).data
+
+    def row_serializer(items=None):
+        return TimeLogRowSerializer(items or queryset.values(*TimeLogRowSerializer.fields)[:SERIALIZER_ROWS]).data
+
+    instances = list(queryset[:SERIALIZER_ROWS])
+    rows = list(queryset.values(*TimeLogRowSerializer.fields)[:SERIALIZER_ROWS])
+    cases = {
+        'model_serializer': lambda: model_serializer(instances),
+        'row_serializer': lambda: row_serializer(rows),
+        'model_serializer_with_fetch': model_serializer,
+        'row_serializer_with_fetch': row_serializer,
+    }
+    throughput = {
+        name: round(len(rows) / min(timeit.repeat(case, number=1, repeat=5)))
+        for name, case in cases.items()
+    }
+    benchmark_results.setdefault(dataset.label, {})['serializer_rows_per_second'] = throughput
+
+    assert throughput['row_serializer'] > throughput['model_serializer']
+    assert throughput['row_serializer_with_fetch'] > throughput['model_serializer_with_fetch']
+
+
+def test_page_payload(dataset, benchmark_results):
+    """
+    Bytes and serialization time (rows to response body) of a page of
+    TIMELOGS_MAX_PAGE_SIZE logs, with every field and with SPARSE_FIELDS,
+    as JSON and as MessagePack.
+    """
+    page_size = settings.TIMELOGS_MAX_PAGE_SIZE
+    queryset = TimeLog.objects.filter(user=dataset.user).order_by('-created_at')
+    renderers = {'json': JSONRenderer()}
+    if OPTIONAL_RENDERERS:
+        renderers['msgpack'] = MessagePackRenderer()
+
+    payload = {}
+    for fields_label, fields in [('all_fields', None), ('sparse_fields', SPARSE_FIELDS)]:
+        rows = list(queryset.values(*TimeLogRowSerializer.get_columns(fields))[:page_size])
+        for format, renderer in renderers.items():
+            def render():
+                return renderer.render({'results': TimeLogRowSerializer(rows, fields).data})
+
+            seconds = min(timeit.repeat(render, number=10, repeat=5)) / 10
+            payload[f'{fields_label}_{format}'] = {
+                'rows': len(rows),
+                'bytes': len(render()),
+                'serialize_ms': round(seconds * 1000, 3),
+            }
+    benchmark_results.setdefault(dataset.label, {})['page_payload'] = payload
+
+    assert payload['sparse_fields_json']['bytes'] < payload['all_fields_json']['bytes']
+    if 'all_fields_msgpack' in payload:
+        assert payload['all_fields_msgpack']['bytes'] < payload['all_fields_json']['bytes']
+
+
+def test_instrumentation_overhead(dataset, benchmark_results):
+    """
+    Median latency of a 100-log list page with instrumentation off, with
+    Server-Timing and metrics on, and with allocation tracking on top.
+    Requests of the three modes are interleaved, in rotating order, so
+    drift and after-effects hit them alike;
+    tracemalloc, which slows down the whole process, only runs during the
+    requests that track allocations.
+    """
+    modes = {
+        'off': {},
+        'server_timing_and_metrics': {'SERVER_TIMING_ENABLED': True, 'METRICS_ENABLED': True},
+        'with_allocations': {'SERVER_TIMING_ENABLED': True, 'METRICS_ENABLED': True, 'SERVER_TIMING_ALLOCATIONS': True},
+    }
+    clients = {}
+    timings = {mode: [] for mode in modes}
+    names = list(modes)
+    for round_index in range(WARMUP_ROUNDS + ROUNDS * 5):
+        shift = round_index % len(names)
+        for mode in names[shift:] + names[:shift]:
+            overrides = modes[mode]
+            with override_settings(**overrides):
+                if overrides.get('SERVER_TIMING_ALLOCATIONS'):
+                    tracemalloc.start()
+                # Middleware is set up on a client's first request
+                client = clients.setdefault(mode, Client())
+                started = time.perf_counter()
+                response = client.get('/api/timelogs/', {'page_size': 100}, **dataset.auth)
+                elapsed = time.perf_counter() - started
+                tracemalloc.stop()
+            assert response.status_code == 200
+            if round_index >= WARMUP_ROUNDS:
+                timings[mode].append(elapsed * 1000)
+
+    medians = {mode: statistics.median(values) for mode, values in timings.items()}
+    result = {
+        mode: {
+            'p50_ms': round(median, 3),
+            'overhead_percent': round((median / medians['off'] - 1) * 100, 1),
+        }
+        for mode, median in medians.items()
+    }
+    benchmark_results.setdefault(dataset.label, {})['instrumentation_overhead'] = result
+
+    assert result['server_timing_and_metrics']['overhead_percent'] < 5
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+import pytest
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..domain.models import DailyTimeTotal, TimeLog, TimeLogInterval
+
+pytestmark = pytest.mark.django_db
+
+
+def entries(count, start=None):
+    start = start or timezone.now().replace(microsecond=0) - timedelta(days=10)
+    return [
+        {'description': f'Imported {index}', 'start_time': (start + timedelta(hours=index)).isoformat(),
+         'duration': '00:30:00'}
+        for index in range(count)
+    ]
+
+
+def bulk(api, entries, **options):
+    return api.post('/api/timelogs/bulk/', {'entries': entries, **options}, format='json')
+
+
+def test_atomic_import(api, sample_user):
+    response = bulk(api, entries(3))
+    assert response.status_code == 201
+    body = response.json()
+    assert [created['index'] for created in body['created']] == [0, 1, 2]
+    assert body['errors'] == {}
+
+    time_logs = TimeLog.objects.filter(user=sample_user).order_by('start_time')
+    assert [str(time_log.id) for time_log in time_logs] == [created['id'] for created in body['created']]
+    assert {time_log.status for time_log in time_logs} == {TimeLog.Status.COMPLETED}
+    assert all(time_log.end_time == time_log.start_time + timedelta(minutes=30) for time_log in time_logs)
+    # The rollup and the intervals are written along with the logs
+    assert TimeLogInterval.objects.filter(user=sample_user).count() == 3
+    assert sum(DailyTimeTotal.objects.filter(user=sample_user).values_list('entry_count', flat=True)) == 3
+
+
+def test_atomic_rejects_everything(api, sample_user):
+    batch = entries(3)
+    batch[1]['duration'] = 'soon'
+    del batch[2]['description']
+
+    response = bulk(api, batch)
+    assert response.status_code == 400
+    assert sorted(response.json()['entries']) == ['1', '2']
+    assert not TimeLog.objects.exists()
+
+
+def test_partial_import(api, sample_user):
+    batch = entries(3)
+    batch[1]['duration'] = 'soon'
+
+    response = bulk(api, batch, mode='partial')
+    assert response.status_code == 201
+    assert [created['index'] for created in response.json()['created']] == [0, 2]
+    assert list(response.json()['errors']) == ['1']
+    assert TimeLog.objects.filter(user=sample_user).count() == 2
+
+    # Nothing valid at all is still a bad request
+    assert bulk(api, [batch[1]], mode='partial').status_code == 400
+
+
+def test_request_limits(api):
+    assert bulk(api, []).status_code == 400
+    assert bulk(api, [{}] * (settings.TIMELOGS_BULK_MAX_ENTRIES + 1)).status_code == 400
+    assert bulk(api, entries(1), mode='sometimes').status_code == 400
+
+
+def test_query_count_does_not_grow_with_entries(api):
+    def queries(count, start):
+        with CaptureQueriesContext(connection) as context:
+            assert bulk(api, entries(count, start)).status_code == 201
+        return len(context.captured_queries)
+
+    # Both batches fall on a single day: the rollup takes a write per day
+    start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=60)
+    assert queries(2, start) == queries(20, start + timedelta(days=20))
@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..domain.models import TimeLog
+from ..infrastructure.archive import archive_completed_logs
+from ..infrastructure.partitions import month_start
+
+User = get_user_model()
+
+
+# Versions are bumped on commit, so these tests commit for real
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def test_unchanged_list_is_not_modified(api, sample_user, service, django_assert_num_queries):
+    time_log = service.create_and_start_timer(sample_user.id, 'Work')
+
+    response = api.get('/api/timelogs/', {'status': 'RUNNING'})
+    etag = response['ETag']
+    assert response.status_code == 200
+    assert 'private' in response['Cache-Control'] and 'no-cache' in response['Cache-Control']
+
+    with django_assert_num_queries(0):
+        response = api.get('/api/timelogs/', {'status': 'RUNNING'}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+    assert not response.content
+
+    # Another page of the same logs
+    assert api.get('/api/timelogs/', {'status': 'PAUSED'}, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    response = api.get(f'/api/timelogs/{time_log.id}/')
+    with django_assert_num_queries(0):
+        assert api.get(f'/api/timelogs/{time_log.id}/', HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+    assert response['ETag'] != etag
+
+
+def test_service_writes_change_the_etag(api, sample_user, service):
+    start = timezone.now() - timedelta(days=1)
+    time_log = service.create_and_start_timer(sample_user.id, 'Work')
+    writes = [
+        lambda: service.pause_timer(str(time_log.id)),
+        lambda: service.resume_timer(str(time_log.id)),
+        lambda: service.stop_timer(str(time_log.id)),
+        lambda: service.add_manual_time(sample_user.id, 'Manual', start, timedelta(hours=1)),
+        lambda: service.add_manual_time_entries(
+            sample_user.id, [{'description': 'Bulk', 'start_time': start, 'duration': timedelta(hours=1)}]
+        ),
+        lambda: service.start_timer(str(service.repository.create(sample_user.id, 'Created').id)),
+        lambda: service.delete_time_log(str(time_log.id)),
+    ]
+
+    etags = {api.get('/api/timelogs/')['ETag']}
+    for write in writes:
+        previous = api.get('/api/timelogs/')['ETag']
+        write()
+        response = api.get('/api/timelogs/', HTTP_IF_NONE_MATCH=previous)
+        assert response.status_code == 200
+        etags.add(response['ETag'])
+    assert len(etags) == len(writes) + 1
+
+
+def test_rejected_transition_keeps_the_etag(api, sample_user, service):
+    time_log = service.create_and_start_timer(sample_user.id, 'Work')
+    etag = api.get('/api/timelogs/')['ETag']
+    with pytest.raises(ValueError):
+        service.resume_timer(str(time_log.id))
+    assert api.get('/api/timelogs/', HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+
+def test_api_writes_change_the_etag(api):
+    time_log = api.post('/api/timelogs/start_new/', {'description': 'Work'}).json()
+    response = api.get(f"/api/timelogs/{time_log['id']}/")
+
+    api.patch(f"/api/timelogs/{time_log['id']}/", {'description': 'Renamed'})
+    response = api.get(f"/api/timelogs/{time_log['id']}/", HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == 200
+    assert response.json()['description'] == 'Renamed'
+
+
+def test_archiving_changes_the_etag(api, sample_user):
+    time_log = TimeLog.objects.create(user=sample_user, description='Old', status=TimeLog.Status.COMPLETED)
+    TimeLog.objects.filter(id=time_log.id).update(created_at=month_start(timezone.now(), -6))
+    etag = api.get('/api/timelogs/')['ETag']
+
+    archive_completed_logs(months=3)
+    response = api.get('/api/timelogs/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()['results'] == []
+
+
+def test_other_users_writes_keep_the_etag(api, sample_user, service):
+    other = User.objects.create_user(email='other@example.com', username='other', password='password')
+    etag = api.get('/api/timelogs/')['ETag']
+    service.create_and_start_timer(other.id, 'Other work')
+    assert api.get('/api/timelogs/', HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+
+def test_staff_get_no_etag(sample_user):
+    staff = User.objects.create_user(email='staff@example.com', username='staff', password='password', is_staff=True)
+    client = APIClient()
+    client.force_authenticate(staff)
+    response = client.get('/api/timelogs/')
+    assert response.status_code == 200
+    assert 'ETag' not in response
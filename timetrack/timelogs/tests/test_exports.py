@@ -0,0 +1,104 @@
+import asyncio
+import csv
+import io
+import json
+import tracemalloc
+import warnings
+from datetime import timedelta
+from functools import partial
+
+import pytest
+from django.test import AsyncClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..interfaces.exports import EXPORT_COLUMNS
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def add_logs(sample_user, create_logs):
+    """Adds minute-long logs of the user, with descriptions long enough to weigh on memory."""
+    return partial(create_logs, sample_user, duration=timedelta(minutes=1),
+                   description='Work item {index} ' + 'x' * 100)
+
+
+def export_peak(api, export_format):
+    """Stream an export, keeping none of it; returns (rows, peak traced bytes)."""
+    tracemalloc.start()
+    try:
+        response = api.get('/api/timelogs/export/', {'format': export_format})
+        lines = sum(block.count(b'\n') for block in response.streaming_content)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return lines, peak
+
+
+async def async_export_peak(client, user, export_format):
+    """As export_peak, sent through the response's async iterator as the ASGI handler does."""
+    tracemalloc.start()
+    try:
+        response = await client.get('/api/timelogs/export/', {'format': export_format},
+                                    headers={'Authorization': f'Bearer {AccessToken.for_user(user)}'})
+        lines = 0
+        async for block in response:
+            lines += block.count(b'\n')
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return lines, peak
+
+
+def test_csv_and_ndjson(api, sample_user, add_logs):
+    add_logs(3)
+
+    response = api.get('/api/timelogs/export/', {'format': 'csv'})
+    assert response['Content-Disposition'] == 'attachment; filename="timelogs.csv"'
+    rows = list(csv.reader(io.StringIO(response.getvalue().decode())))
+    assert rows[0] == [name for name, _ in EXPORT_COLUMNS]
+    assert [row[rows[0].index('user')] for row in rows[1:]] == [sample_user.email] * 3
+
+    response = api.get('/api/timelogs/export/', {'format': 'ndjson'})
+    time_logs = [json.loads(line) for line in response.getvalue().decode().splitlines()]
+    assert [time_log['duration'] for time_log in time_logs] == ['00:01:00'] * 3
+
+
+@pytest.mark.parametrize('export_format', ['csv', 'ndjson'])
+def test_export_memory_is_bounded(api, add_logs, settings, export_format):
+    """Ten times the rows must not take ten times the memory: rows go out a chunk at a time."""
+    settings.TIMELOGS_EXPORT_CHUNK_SIZE = 200
+    size = 1000
+    add_logs(size)
+    # Warm up whatever gets set up once per process
+    export_peak(api, export_format)
+    small_lines, small_peak = export_peak(api, export_format)
+
+    add_logs(size * 9)
+    large_lines, large_peak = export_peak(api, export_format)
+
+    header = 1 if export_format == 'csv' else 0
+    assert (small_lines, large_lines) == (size + header, size * 10 + header)
+    assert large_peak < small_peak * 2, (small_peak, large_peak)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('export_format', ['csv', 'ndjson'])
+def test_asgi_export_memory_is_bounded(sample_user, add_logs, settings, export_format):
+    """The same under ASGI, which the entrypoint serves: no reading the whole export up front."""
+    settings.TIMELOGS_EXPORT_CHUNK_SIZE = 200
+    size = 1000
+    client = AsyncClient()
+    add_logs(size)
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        asyncio.run(async_export_peak(client, sample_user, export_format))
+        small_lines, small_peak = asyncio.run(async_export_peak(client, sample_user, export_format))
+        add_logs(size * 9)
+        large_lines, large_peak = asyncio.run(async_export_peak(client, sample_user, export_format))
+
+    header = 1 if export_format == 'csv' else 0
+    assert (small_lines, large_lines) == (size + header, size * 10 + header)
+    assert large_peak < small_peak * 2, (small_peak, large_peak)
+    assert not [warning for warning in caught if 'must consume synchronous iterators' in str(warning.message)]
@@ -0,0 +1,161 @@
+import io
+import json
+import os
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+
+from ..domain.models import TimeLog
+from ..infrastructure.filters import TimeLogFilter
+from ..infrastructure.partitions import get_partitions
+from ..infrastructure.repositories import DjangoTimeLogRepository
+from .test_query_plans import find_problems
+
+User = get_user_model()
+
+BENCHMARK_SIZE = os.getenv('TIMELOGS_FILTER_BENCHMARK')
+BENCHMARK_OUTPUT = os.getenv('TIMELOGS_FILTER_BENCHMARK_OUTPUT', 'filter-benchmark-results.json')
+
+pytestmark = pytest.mark.django_db
+
+UTC = ZoneInfo('UTC')
+
+
+@pytest.fixture
+def logs(sample_user, create_logs):
+    def create_log(description, start_time, end_time, created_at):
+        time_log, = create_logs(sample_user, start_time=start_time, duration=end_time - start_time,
+                                created_at=created_at, description=description)
+        return time_log
+
+    return {
+        # March 1st in UTC, already March 2nd in Berlin
+        'late': create_log('Late', datetime(2026, 3, 1, 23, 30, tzinfo=UTC), datetime(2026, 3, 1, 23, 45, tzinfo=UTC),
+                           created_at=datetime(2026, 3, 1, 23, 45, tzinfo=UTC)),
+        # Ends exactly as March 3rd begins
+        'midnight': create_log('Midnight', datetime(2026, 3, 2, 23, tzinfo=UTC), datetime(2026, 3, 3, tzinfo=UTC),
+                               created_at=datetime(2026, 3, 3, 9, tzinfo=UTC)),
+        'last_moment': create_log('Last moment', datetime(2026, 3, 2, 23, tzinfo=UTC),
+                                  datetime(2026, 3, 2, 23, 59, 59, 999999, tzinfo=UTC),
+                                  created_at=datetime(2026, 3, 2, 9, tzinfo=UTC)),
+    }
+
+
+def descriptions(api, **params):
+    response = api.get('/api/timelogs/', params)
+    assert response.status_code == 200, response.content
+    return sorted(time_log['description'] for time_log in response.json()['results'])
+
+
+def test_start_date_is_a_day_in_the_time_zone(api, logs):
+    assert descriptions(api, start_date='2026-03-02') == ['Last moment', 'Midnight']
+    assert descriptions(api, start_date='2026-03-02', tz='Europe/Berlin') == ['Last moment', 'Late', 'Midnight']
+
+
+def test_end_date_covers_the_whole_day(api, logs):
+    # Half-open: the next day's first instant is out
+    assert descriptions(api, end_date='2026-03-02') == ['Last moment', 'Late']
+    assert descriptions(api, end_date='2026-03-03') == ['Last moment', 'Late', 'Midnight']
+    assert descriptions(api, start_date='2026-03-02', end_date='2026-03-02') == ['Last moment']
+
+
+def test_created_dates(api, logs):
+    assert descriptions(api, created_from='2026-03-03') == ['Midnight']
+    assert descriptions(api, created_to='2026-03-02') == ['Last moment', 'Late']
+    assert descriptions(api, created_to='2026-03-01', tz='Europe/Berlin') == []
+
+
+def test_invalid_filters(api, logs):
+    assert api.get('/api/timelogs/', {'tz': 'Mars/Olympus'}).status_code == 400
+    assert api.get('/api/timelogs/', {'start_date': 'yesterday'}).status_code == 400
+
+    with pytest.raises(ValueError, match='start_date'):
+        DjangoTimeLogRepository().get_user_logs(logs['late'].user_id, start_date='yesterday')
+
+
+def test_repository_uses_the_same_filters(sample_user, logs):
+    time_logs = DjangoTimeLogRepository().get_user_logs(sample_user.id, start_date=date(2026, 3, 2),
+                                                        tz='Europe/Berlin')
+    assert {time_log.id for time_log in time_logs} == {logs['late'].id, logs['midnight'].id, logs['last_moment'].id}
+
+
+def test_ranges():
+    filterset = TimeLogFilter({'start_date': '2026-03-02', 'end_date': '2026-03-03', 'tz': 'Europe/Berlin'},
+                              queryset=TimeLog.objects.none())
+    assert filterset.is_valid()
+    berlin = ZoneInfo('Europe/Berlin')
+    assert filterset.get_ranges() == {
+        'start_time': (datetime(2026, 3, 2, tzinfo=berlin), None),
+        'end_time': (None, datetime(2026, 3, 4, tzinfo=berlin)),
+    }
+
+
+def get_scans(node):
+    """Scan nodes of a JSON plan, with the index each one uses."""
+    scans = []
+    if 'Scan' in node['Node Type']:
+        scans.append(' '.join(filter(None, [node['Node Type'], node.get('Index Name')])))
+    for child in node.get('Plans', []):
+        scans += get_scans(child)
+    return scans
+
+
+def median_ms(func, rounds=15, warmup=3):
+    timings = []
+    for round_index in range(rounds + warmup):
+        started = time.perf_counter()
+        func()
+        if round_index >= warmup:
+            timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(not BENCHMARK_SIZE, reason='set TIMELOGS_FILTER_BENCHMARK (e.g. 1M) to run')
+def test_date_range_benchmark():
+    """
+    One week of a user with BENCHMARK_SIZE logs, filtered the old way
+    (casting start_time and end_time to dates) and with the half-open
+    ranges of TimeLogFilter: the count and the first list page of each.
+    """
+    size = int(BENCHMARK_SIZE.replace('k', '000').replace('M', '000000'))
+    call_command('dump_timelogs', users=1, logs_per_user=size, days=365, seed=42, workers=4, skip_totals=True,
+                 stdout=io.StringIO())
+    user = User.objects.annotate(log_count=Count('timelog')).order_by('-log_count').first()
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {TimeLog._meta.db_table}')
+
+    latest = TimeLog.objects.filter(user=user, end_time__isnull=False).latest('end_time').end_time.date()
+    first, last = latest - timedelta(days=37), latest - timedelta(days=31)
+    variants = {
+        'date_cast': TimeLog.objects.filter(user=user, start_time__date__gte=first, end_time__date__lte=last),
+        'half_open': TimeLogFilter({'start_date': first, 'end_date': last, 'tz': 'UTC'},
+                                   queryset=TimeLog.objects.filter(user=user)).qs,
+    }
+
+    report = {'size': BENCHMARK_SIZE, 'days': [first.isoformat(), last.isoformat()]}
+    plans = {}
+    for name, queryset in variants.items():
+        page = queryset.order_by('-created_at', '-id')[:50]
+        plans[name] = json.loads(queryset.values('id').explain(format='json'))[0]['Plan']
+        report[name] = {
+            'rows': queryset.count(),
+            'scans': get_scans(plans[name]),
+            'count_p50_ms': median_ms(queryset.count),
+            'page_p50_ms': median_ms(lambda: list(page.all())),
+        }
+
+    Path(BENCHMARK_OUTPUT).write_text(json.dumps(report, indent=2))
+    assert report['half_open']['rows'] == report['date_cast']['rows'] > 0
+    tables = {TimeLog._meta.db_table, *(partition.name for partition in get_partitions())}
+    assert not find_problems(plans['half_open'], tables, allow_sort=True), json.dumps(plans['half_open'], indent=2)
+    assert report['half_open']['count_p50_ms'] < report['date_cast']['count_p50_ms']
@@ -0,0 +1,94 @@
+import re
+import tracemalloc
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
+from prometheus_client import REGISTRY
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+pytestmark = pytest.mark.django_db
+
+
+def parse_server_timing(header):
+    """{name: {'dur': ..., 'desc': ...}} of a Server-Timing header."""
+    entries = {}
+    for entry in header.split(', '):
+        name, *params = entry.split(';')
+        entries[name] = dict(re.match(r'(\w+)=("?)(.*)\2$', param).group(1, 3) for param in params)
+    return entries
+
+
+@override_settings(SERVER_TIMING_ENABLED=True)
+def test_server_timing(api):
+    with CaptureQueriesContext(connection) as context:
+        response = api.post('/api/timelogs/start_new/', {'description': 'Work'})
+    timing = parse_server_timing(response['Server-Timing'])
+    assert timing['db']['desc'] == f'{len(context.captured_queries)} queries'
+    assert {'service', 'repository', 'serialize', 'total'} <= set(timing)
+    assert float(timing['service']['dur']) >= float(timing['repository']['dur'])
+    assert float(timing['total']['dur']) >= float(timing['service']['dur']) + float(timing['serialize']['dur'])
+    assert 'alloc' not in timing
+
+    timing = parse_server_timing(api.get('/api/timelogs/', {'page_size': 50})['Server-Timing'])
+    assert 'service' not in timing
+    assert float(timing['serialize']['dur']) > 0
+
+
+def test_off_by_default(api):
+    assert 'Server-Timing' not in api.get('/api/timelogs/')
+    assert api.get('/metrics').status_code == 404
+
+
+@override_settings(SERVER_TIMING_ENABLED=True, SERVER_TIMING_ALLOCATIONS=True)
+def test_allocations(api):
+    try:
+        timing = parse_server_timing(api.get('/api/timelogs/')['Server-Timing'])
+    finally:
+        tracemalloc.stop()
+    assert re.fullmatch(r'\d+ KiB peak', timing['alloc']['desc'])
+
+
+# Served from another thread, which only sees committed data
+@pytest.mark.django_db(transaction=True)
+@override_settings(SERVER_TIMING_ENABLED=True)
+def test_async_requests(sample_user):
+    response = async_to_sync(AsyncClient().get)(
+        '/api/timelogs/', headers={'Authorization': f'Bearer {AccessToken.for_user(sample_user)}'}
+    )
+    assert response.status_code == 200
+    timing = parse_server_timing(response['Server-Timing'])
+    assert int(timing['db']['desc'].split()[0]) >= 1
+
+
+@override_settings(METRICS_ENABLED=True)
+def test_metrics(api, django_capture_on_commit_callbacks):
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    list_labels = {'view': 'timelog-list', 'method': 'GET'}
+    requests = sample('timetrack_request_duration_seconds_count', **list_labels)
+    starts = sample('timetrack_timer_transitions_total', action='start')
+    pauses = sample('timetrack_timer_transitions_total', action='pause')
+
+    api.get('/api/timelogs/')
+    with django_capture_on_commit_callbacks(execute=True):
+        time_log = api.post('/api/timelogs/start_new/', {'description': 'Work'}).json()
+    with django_capture_on_commit_callbacks(execute=True):
+        api.post(f"/api/timelogs/{time_log['id']}/pause/")
+    with django_capture_on_commit_callbacks(execute=True):
+        # Rejected: not counted
+        api.post(f"/api/timelogs/{time_log['id']}/pause/")
+
+    assert sample('timetrack_request_duration_seconds_count', **list_labels) == requests + 1
+    assert sample('timetrack_timer_transitions_total', action='start') == starts + 1
+    assert sample('timetrack_timer_transitions_total', action='pause') == pauses + 1
+
+    response = api.get('/metrics')
+    assert response['Content-Type'].startswith('text/plain')
+    body = response.content.decode()
+    assert 'timetrack_request_db_queries_bucket{le="2.0",method="GET",view="timelog-list"}' in body
+    assert 'timetrack_timer_transitions_total{action="pause"}' in body
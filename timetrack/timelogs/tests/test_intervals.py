@@ -0,0 +1,151 @@
+import io
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from ..domain.models import TimeLog, TimeLogInterval
+from ..infrastructure.repositories import DjangoTimeLogRepository
+from ..management.commands.backfill_timelog_intervals import reconstruct_periods
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def repository():
+    return DjangoTimeLogRepository()
+
+
+@pytest.fixture
+def base():
+    return timezone.now().replace(microsecond=0) - timedelta(days=1)
+
+
+@pytest.fixture
+def paused_twice(sample_user, repository, base):
+    """Runs 09:00-10:00 and 11:00-12:30 (relative to `base`), then stops."""
+    time_log = repository.create(sample_user.id, 'Work')
+    repository.transition(time_log.id, 'start', base)
+    repository.transition(time_log.id, 'pause', base + timedelta(hours=1))
+    repository.transition(time_log.id, 'resume', base + timedelta(hours=2))
+    return repository.transition(time_log.id, 'stop', base + timedelta(hours=3, minutes=30))
+
+
+def periods(time_log):
+    return [
+        (interval.period.lower, interval.period.upper)
+        for interval in TimeLogInterval.objects.filter(time_log_id=time_log.id).order_by('period')
+    ]
+
+
+def test_transitions_record_intervals(paused_twice, base):
+    assert periods(paused_twice) == [
+        (base, base + timedelta(hours=1)),
+        (base + timedelta(hours=2), base + timedelta(hours=3, minutes=30)),
+    ]
+    assert paused_twice.duration == timedelta(hours=2, minutes=30)
+
+
+def test_running_timer_has_open_interval(sample_user, repository, base):
+    time_log = repository.create(sample_user.id, 'Work')
+    repository.transition(time_log.id, 'start', base)
+    assert periods(time_log) == [(base, None)]
+
+
+def test_close_before_open_leaves_empty_interval(sample_user, repository, base):
+    # A pause whose timestamp was taken before the racing resume's
+    time_log = repository.create(sample_user.id, 'Work')
+    repository.transition(time_log.id, 'start', base)
+    repository.transition(time_log.id, 'pause', base - timedelta(seconds=1))
+    interval = TimeLogInterval.objects.get(time_log_id=time_log.id)
+    assert interval.period.isempty
+
+
+def test_worked_time_clips_at_window_edges(sample_user, repository, paused_twice, base):
+    worked = repository.get_worked_time(
+        sample_user.id, base + timedelta(minutes=30), base + timedelta(hours=2, minutes=15)
+    )
+    assert worked == {paused_twice.id: timedelta(minutes=45)}
+
+    assert repository.get_worked_time(
+        sample_user.id, base + timedelta(hours=1), base + timedelta(hours=2)
+    ) == {}
+
+
+def test_worked_time_counts_running_timer_until_now(service, sample_user, base):
+    time_log = service.create_and_start_timer(sample_user.id, 'Work')
+
+    worked = service.get_worked_time(sample_user.id, base, base + timedelta(days=7))
+    assert worked['time_logs'][0]['time_log_id'] == time_log.id
+    assert timedelta() <= worked['duration'] <= timezone.now() - time_log.start_time
+
+
+def test_manual_entries_are_intervals(service, sample_user, base):
+    time_log = service.add_manual_time(sample_user.id, 'Meeting', base, timedelta(hours=1))
+    assert periods(time_log) == [(base, base + timedelta(hours=1))]
+
+
+def test_running_at(sample_user, repository, paused_twice, base):
+    assert repository.get_running_at(sample_user.id, base + timedelta(minutes=30)) == [paused_twice]
+    assert repository.get_running_at(sample_user.id, base + timedelta(hours=1, minutes=30)) == []
+    # Upper bounds are exclusive
+    assert repository.get_running_at(sample_user.id, base + timedelta(hours=1)) == []
+
+
+def test_delete_removes_intervals(repository, paused_twice):
+    repository.delete(paused_twice.id)
+    assert not TimeLogInterval.objects.exists()
+
+
+def test_worked_endpoint(api, sample_user, paused_twice, base):
+    response = api.get('/api/timelogs/worked/', {
+        'start': base.isoformat(), 'end': (base + timedelta(hours=3)).isoformat()
+    })
+    assert response.status_code == 200
+    assert response.json()['duration'] == '02:00:00'
+    assert response.json()['time_logs'] == [{'time_log_id': str(paused_twice.id), 'duration': '02:00:00'}]
+
+    response = api.get('/api/timelogs/worked/', {'start': base.isoformat(), 'end': base.isoformat()})
+    assert response.status_code == 400
+
+    response = api.get('/api/timelogs/running_at/', {'at': (base + timedelta(hours=3)).isoformat()})
+    assert [time_log['id'] for time_log in response.json()] == [str(paused_twice.id)]
+
+
+def test_reconstruct_periods(sample_user, base):
+    # Ran 1h, paused 1h, ran 1.5h, stopped: only the last run is exact
+    time_log = TimeLog(
+        user=sample_user,
+        status=TimeLog.Status.COMPLETED,
+        start_time=base + timedelta(hours=2),
+        end_time=base + timedelta(hours=3, minutes=30),
+        duration=timedelta(hours=2, minutes=30),
+        paused_duration=timedelta(hours=1),
+    )
+    assert reconstruct_periods(time_log) == [
+        (base, base + timedelta(hours=1)),
+        (base + timedelta(hours=2), base + timedelta(hours=3, minutes=30)),
+    ]
+
+    time_log = TimeLog(user=sample_user, status=TimeLog.Status.RUNNING, start_time=base)
+    assert reconstruct_periods(time_log) == [(base, None)]
+
+
+def test_backfill_command(sample_user, base):
+    time_log = TimeLog.objects.create(
+        user=sample_user,
+        description='Old work',
+        status=TimeLog.Status.COMPLETED,
+        start_time=base,
+        end_time=base + timedelta(hours=1),
+        duration=timedelta(hours=1),
+    )
+    out = io.StringIO()
+    call_command('backfill_timelog_intervals', stdout=out)
+    assert 'Recorded 1 intervals for 1 time logs of 1 users' in out.getvalue()
+    assert periods(time_log) == [(base, base + timedelta(hours=1))]
+
+    # Logs that have intervals are left alone
+    call_command('backfill_timelog_intervals', stdout=io.StringIO())
+    assert TimeLogInterval.objects.count() == 1
@@ -0,0 +1,182 @@
+import json
+import os
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from ..application.services import TimeLogOverlapError, TimeTrackingService
+from ..domain.models import TimeLog, TimeLogInterval
+
+BENCHMARK_SIZE = os.getenv('TIMELOGS_OVERLAP_BENCHMARK')
+BENCHMARK_OUTPUT = os.getenv('TIMELOGS_OVERLAP_BENCHMARK_OUTPUT', 'overlap-benchmark-results.json')
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def base():
+    return timezone.now().replace(microsecond=0) - timedelta(days=1)
+
+
+@pytest.fixture
+def meeting(sample_user, service, base):
+    """A manual entry from `base` to one hour later."""
+    return service.add_manual_time(sample_user.id, 'Meeting', base, timedelta(hours=1))
+
+
+def entry(start, minutes, description='Work'):
+    return {'description': description, 'start_time': start.isoformat(), 'duration': f'00:{minutes:02d}:00'}
+
+
+def test_allow_is_the_default(sample_user, service, meeting, base):
+    time_log = service.add_manual_time(sample_user.id, 'Overlapping', base, timedelta(minutes=30))
+    assert not hasattr(time_log, 'overlaps')
+
+
+def test_reject(sample_user, service, meeting, base):
+    with pytest.raises(TimeLogOverlapError) as error:
+        service.add_manual_time(sample_user.id, 'Overlapping', base + timedelta(minutes=30),
+                                timedelta(hours=1), overlap='reject')
+    assert [overlap['time_log_id'] for overlap in error.value.overlaps[0]] == [meeting.id]
+    assert TimeLog.objects.count() == 1
+
+    # Touching the end of the meeting is not an overlap
+    service.add_manual_time(sample_user.id, 'After', base + timedelta(hours=1), timedelta(hours=1),
+                            overlap='reject')
+
+
+def test_reject_covers_running_timers(sample_user, service):
+    service.create_and_start_timer(sample_user.id, 'Running')
+    with pytest.raises(TimeLogOverlapError):
+        service.add_manual_time(sample_user.id, 'Meanwhile', timezone.now(), timedelta(minutes=5),
+                                overlap='reject')
+
+
+def test_running_timer_overlap_in_response(api, sample_user, service):
+    service.create_and_start_timer(sample_user.id, 'Running')
+    response = api.post('/api/timelogs/', {**entry(timezone.now(), 5), 'overlap': 'reject'}, format='json')
+    assert response.status_code == 400
+    overlap, = response.json()['overlaps']
+    # Open interval: JSON null, not "None"
+    assert overlap['end_time'] is None
+    assert overlap['index'] is None
+
+
+def test_overlaps_are_per_user(sample_user, service, meeting, base, django_user_model):
+    other = django_user_model.objects.create_user(username='other', email='other@example.com', password='x')
+    service.add_manual_time(other.id, 'Meeting', base, timedelta(hours=1), overlap='reject')
+
+
+def test_create_endpoint(api, meeting, base):
+    response = api.post('/api/timelogs/', {**entry(base, 30), 'overlap': 'reject'}, format='json')
+    assert response.status_code == 400
+    assert response.json()['overlaps'][0]['time_log_id'] == str(meeting.id)
+
+    response = api.post('/api/timelogs/', {**entry(base, 30), 'overlap': 'warn'}, format='json')
+    assert response.status_code == 201
+    assert response.json()['overlaps'][0]['time_log_id'] == str(meeting.id)
+
+    response = api.post('/api/timelogs/', {**entry(base - timedelta(hours=1), 30), 'overlap': 'warn'}, format='json')
+    assert response.status_code == 201
+    assert 'overlaps' not in response.json()
+
+
+def test_bulk_atomic_reject(api, meeting, base):
+    response = api.post('/api/timelogs/bulk/', {
+        'overlap': 'reject',
+        'entries': [
+            entry(base - timedelta(hours=2), 30),
+            entry(base + timedelta(minutes=15), 30),
+            entry(base - timedelta(hours=2, minutes=-15), 30),
+        ],
+    }, format='json')
+    assert response.status_code == 400
+    errors = response.json()['entries']
+    assert sorted(errors) == ['1', '2']
+    assert errors['1']['overlaps'][0]['time_log_id'] == str(meeting.id)
+    # Entries overlapping each other are reported against the earlier one
+    assert errors['2']['overlaps'][0]['index'] == 0
+    assert TimeLog.objects.count() == 1
+
+
+def test_bulk_partial_reject(api, meeting, base):
+    response = api.post('/api/timelogs/bulk/', {
+        'mode': 'partial',
+        'overlap': 'reject',
+        'entries': [
+            entry(base - timedelta(hours=2), 30),
+            entry(base + timedelta(minutes=15), 30),
+            entry(base - timedelta(hours=2, minutes=-15), 30),
+        ],
+    }, format='json')
+    assert response.status_code == 201
+    assert [created['index'] for created in response.json()['created']] == [0]
+    assert sorted(response.json()['errors']) == ['1', '2']
+    assert TimeLog.objects.count() == 2
+
+
+def test_bulk_warn(api, meeting, base):
+    response = api.post('/api/timelogs/bulk/', {
+        'overlap': 'warn',
+        'entries': [entry(base - timedelta(hours=2), 30), entry(base + timedelta(minutes=15), 30)],
+    }, format='json')
+    assert response.status_code == 201
+    assert list(response.json()['overlaps']) == ['1']
+    assert TimeLog.objects.count() == 3
+
+
+def test_overlap_probe_uses_index(sample_user, service, meeting, base):
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute(
+            f'EXPLAIN SELECT 1 FROM {TimeLogInterval._meta.db_table} '
+            'WHERE user_id = %s AND period && tstzrange(%s, %s)',
+            [sample_user.id, base, base + timedelta(hours=1)]
+        )
+        plan = '\n'.join(row[0] for row in cursor.fetchall())
+    assert 'interval_user_period_idx' in plan
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(not BENCHMARK_SIZE, reason='set TIMELOGS_OVERLAP_BENCHMARK (e.g. 100k) to run')
+def test_overlap_benchmark(service, django_user_model):
+    """
+    Latency of single manual entries for a user who already has
+    BENCHMARK_SIZE of them, with each overlap policy.
+    """
+    size = int(BENCHMARK_SIZE.replace('k', '000').replace('M', '000000'))
+    user = django_user_model.objects.create_user(username='benchmark', email='benchmark@example.com', password='x')
+    start = timezone.now() - timedelta(hours=size)
+    batch = 10000
+    for offset in range(0, size, batch):
+        service.add_manual_time_entries(user.id, [
+            {'description': 'History', 'start_time': start + timedelta(hours=index), 'duration': timedelta(minutes=45)}
+            for index in range(offset, min(offset + batch, size))
+        ])
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {TimeLog._meta.db_table}, {TimeLogInterval._meta.db_table}')
+
+    report = {'size': BENCHMARK_SIZE}
+    for policy in TimeTrackingService.OVERLAP_POLICIES:
+        timings = []
+        for index in range(220):
+            # Free slots at minute 50 of the history's hours
+            entry_start = start + timedelta(hours=(index * 7919) % size, minutes=50)
+            started = time.perf_counter()
+            service.add_manual_time(user.id, 'New', entry_start, timedelta(minutes=5), overlap=policy)
+            elapsed = time.perf_counter() - started
+            TimeLog.objects.filter(description='New').delete()
+            TimeLogInterval.objects.filter(period__startswith=entry_start).delete()
+            if index >= 20:
+                timings.append(elapsed * 1000)
+        quantiles = statistics.quantiles(timings, n=100, method='inclusive')
+        report[policy] = {'p50_ms': round(quantiles[49], 3), 'p95_ms': round(quantiles[94], 3)}
+
+    Path(BENCHMARK_OUTPUT).write_text(json.dumps(report, indent=2))
+    assert report['reject']['p95_ms'] < report['allow']['p95_ms'] + 50
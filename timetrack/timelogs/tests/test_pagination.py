@@ -0,0 +1,138 @@
+import io
+import json
+import os
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..domain.models import TimeLog
+from ..interfaces.pagination import TimeLogKeysetPagination
+
+User = get_user_model()
+
+BENCHMARK_SIZE = os.getenv('TIMELOGS_PAGINATION_BENCHMARK')
+BENCHMARK_OUTPUT = os.getenv('TIMELOGS_PAGINATION_BENCHMARK_OUTPUT', 'pagination-benchmark-results.json')
+
+pytestmark = pytest.mark.django_db
+
+
+def walk(api, url, params=None, direction='next'):
+    """Follow the `direction` links from `url`; returns the pages of IDs."""
+    pages = []
+    while url:
+        body = api.get(url, params).json()
+        pages.append([time_log['id'] for time_log in body['results']])
+        url, params = body[direction], None
+    return pages
+
+
+def test_cursor_round_trip(api, sample_user, create_logs):
+    time_logs = create_logs(sample_user, 7)
+    expected = [str(time_log.id) for time_log in reversed(time_logs)]
+
+    pages = walk(api, '/api/timelogs/', {'pagination': 'cursor', 'page_size': 3})
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sum(pages, []) == expected
+
+    # Back from the last page through the previous links
+    last = api.get('/api/timelogs/', {'pagination': 'cursor', 'page_size': 3})
+    while last.json()['next']:
+        last = api.get(last.json()['next'])
+    back = walk(api, last.json()['previous'], direction='previous')
+    assert back == pages[-2::-1]
+
+
+def test_equal_created_at_breaks_ties_by_id(api, sample_user, create_logs):
+    time_logs = create_logs(sample_user, 5, created_at=timezone.now() - timedelta(hours=1))
+    expected = sorted((time_log.id for time_log in time_logs), reverse=True)
+
+    pages = walk(api, '/api/timelogs/', {'pagination': 'cursor', 'page_size': 2})
+    assert sum(pages, []) == [str(time_log_id) for time_log_id in expected]
+
+
+def test_null_sort_keys_are_paged(api, sample_user, create_logs):
+    completed = create_logs(sample_user, 3, end_time=timezone.now())
+    running = [
+        TimeLog.objects.create(user=sample_user, description='Running', status=TimeLog.Status.PAUSED)
+        for _ in range(3)
+    ]
+
+    pages = walk(api, '/api/timelogs/', {'pagination': 'cursor', 'page_size': 2, 'ordering': 'end_time'})
+    ids = sum(pages, [])
+    assert sorted(ids) == sorted(str(time_log.id) for time_log in completed + running)
+    # NULLs last when ascending
+    assert set(ids[3:]) == {str(time_log.id) for time_log in running}
+
+
+def test_cursor_belongs_to_its_ordering(api, sample_user, create_logs):
+    create_logs(sample_user, 3)
+    next_url = api.get('/api/timelogs/', {'pagination': 'cursor', 'page_size': 1}).json()['next']
+
+    assert api.get(f'{next_url}&ordering=duration').status_code == 404
+    assert api.get('/api/timelogs/', {'cursor': 'not-a-cursor'}).status_code == 404
+
+
+def cursor_at(time_log, page_size):
+    """The next-page link a client reaches after paging down to `time_log`."""
+    pagination = TimeLogKeysetPagination()
+    pagination.base_url = f'http://testserver/api/timelogs/?pagination=cursor&page_size={page_size}'
+    pagination.field_name, pagination.descending = 'created_at', True
+    pagination.field = TimeLog._meta.get_field('created_at')
+    return pagination.encode_cursor(pagination._get_position(time_log, reverse=False))
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(not BENCHMARK_SIZE, reason='set TIMELOGS_PAGINATION_BENCHMARK (e.g. 100k) to run')
+def test_deep_page_benchmark():
+    """
+    Latency of the first and of the last page of a user with
+    BENCHMARK_SIZE logs, 10 per page (page 10,000 at 100k), with offset
+    and with cursor pagination.
+    """
+    size = int(BENCHMARK_SIZE.replace('k', '000').replace('M', '000000'))
+    page_size = 10
+    call_command('dump_timelogs', users=1, logs_per_user=size, seed=42, workers=4, skip_totals=True,
+                 stdout=io.StringIO())
+    user = User.objects.annotate(log_count=Count('timelog')).order_by('-log_count').first()
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {TimeLog._meta.db_table}')
+
+    client = Client(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    last_page = -(-user.log_count // page_size)
+    # The last row of the page before the last one
+    before_last = TimeLog.objects.filter(user=user).order_by('-created_at', '-id')[(last_page - 1) * page_size - 1]
+    cases = {
+        'offset_page_1': ('/api/timelogs/', {'page_size': page_size}),
+        f'offset_page_{last_page}': ('/api/timelogs/', {'page_size': page_size, 'page': last_page}),
+        'cursor_page_1': ('/api/timelogs/', {'pagination': 'cursor', 'page_size': page_size}),
+        f'cursor_page_{last_page}': (cursor_at(before_last, page_size), None),
+    }
+
+    report = {'size': BENCHMARK_SIZE, 'page_size': page_size}
+    for name, (url, params) in cases.items():
+        timings = []
+        for round_index in range(25):
+            started = time.perf_counter()
+            response = client.get(url, params)
+            elapsed = time.perf_counter() - started
+            assert response.status_code == 200
+            if round_index >= 5:
+                timings.append(elapsed * 1000)
+        report[name] = {'p50_ms': round(statistics.median(timings), 3), 'rows': len(response.json()['results'])}
+
+    Path(BENCHMARK_OUTPUT).write_text(json.dumps(report, indent=2))
+    assert report[f'cursor_page_{last_page}']['rows'] == report[f'offset_page_{last_page}']['rows']
+    # Deep cursor pages cost about what the first one does; deep offsets do not
+    assert report[f'cursor_page_{last_page}']['p50_ms'] < report[f'offset_page_{last_page}']['p50_ms']
+    assert report[f'cursor_page_{last_page}']['p50_ms'] < 3 * report['cursor_page_1']['p50_ms'] + 5
@@ -0,0 +1,177 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.utils import timezone
+
+from ..domain.models import TimeLog
+from ..infrastructure.filters import TimeLogFilter
+from ..infrastructure.partitions import LEGACY_PARTITION, get_partitions, is_partitioned, month_start
+
+# DDL is transactional in PostgreSQL: every conversion is rolled back with the test
+pytestmark = pytest.mark.django_db
+
+
+def partition_timelogs(*args, now=None):
+    stdout = StringIO()
+    with mock.patch('django.utils.timezone.now', return_value=now or timezone.now()):
+        call_command('partition_timelogs', *args, stdout=stdout)
+    return stdout.getvalue()
+
+
+def get_partition_of(time_log):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT tableoid::regclass::text FROM {TimeLog._meta.db_table} WHERE id = %s', [time_log.id])
+        return cursor.fetchone()[0]
+
+
+def move_to(time_log, created_at):
+    TimeLog.objects.filter(id=time_log.id).update(created_at=created_at)
+
+
+@pytest.fixture
+def old_log(sample_user):
+    time_log = TimeLog.objects.create(user=sample_user, description='Old', status=TimeLog.Status.COMPLETED)
+    move_to(time_log, timezone.now() - timedelta(days=400))
+    return time_log
+
+
+@pytest.fixture
+def running_log(sample_user):
+    return TimeLog.objects.create(
+        user=sample_user, description='Running', status=TimeLog.Status.RUNNING, start_time=timezone.now()
+    )
+
+
+@pytest.fixture
+def partitioned(old_log, running_log):
+    # Fire the deferred foreign key checks, ALTER TABLE refuses to run with them pending
+    with connection.cursor() as cursor:
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+    partition_timelogs('convert', '--months-ahead', '2')
+
+
+def test_convert_keeps_rows_in_legacy_partition(old_log, running_log, partitioned):
+    assert is_partitioned()
+    assert get_partition_of(old_log) == LEGACY_PARTITION
+    assert get_partition_of(running_log) == LEGACY_PARTITION
+    assert TimeLog.objects.count() == 2
+
+    partitions = get_partitions()
+    assert partitions[0].name == LEGACY_PARTITION and partitions[0].start is None
+    # Contiguous months up to two months from now
+    for previous, partition in zip(partitions, partitions[1:]):
+        assert partition.start == previous.end
+        assert partition.end == month_start(partition.start, 1)
+    assert partitions[-1].end == month_start(timezone.now(), 3)
+
+
+def test_rows_are_routed_by_created_at(running_log, partitioned):
+    start = month_start(timezone.now(), 2)
+    move_to(running_log, start + timedelta(days=3))
+    assert get_partition_of(running_log) == f'timelogs_timelog_p{start:%Y_%m}'
+
+    running_log.refresh_from_db()
+    running_log.description = 'Renamed'
+    running_log.save()
+    assert TimeLog.objects.get(id=running_log.id).description == 'Renamed'
+
+
+def test_one_running_timer_per_user(sample_user, running_log, partitioned, service):
+    # Timers running before the conversion count too
+    with pytest.raises(ValueError, match='another timer is running'):
+        service.create_and_start_timer(sample_user.id, 'Second')
+
+    service.pause_timer(str(running_log.id))
+    second = service.create_and_start_timer(sample_user.id, 'Second')
+    with pytest.raises(ValueError, match='another timer is running'):
+        service.resume_timer(str(running_log.id))
+
+    service.stop_timer(str(second.id))
+    service.delete_time_log(str(second.id))
+    assert service.resume_timer(str(running_log.id)).status == TimeLog.Status.RUNNING
+
+
+def test_created_date_filters_prune_partitions(api, sample_user, old_log, partitioned):
+    start = month_start(timezone.now(), 1)
+    filters = {'created_from': start.date().isoformat(), 'created_to': (start + timedelta(days=9)).date().isoformat()}
+    queryset = TimeLogFilter(filters, queryset=TimeLog.objects.filter(user=sample_user)).qs
+    plan = queryset.explain()
+    assert f'timelogs_timelog_p{start:%Y_%m}' in plan
+    assert LEGACY_PARTITION not in plan
+    assert plan.count('timelogs_timelog_p') == 1
+
+    old_day = TimeLog.objects.get(id=old_log.id).created_at.date()
+    response = api.get('/api/timelogs/', {'created_from': old_day, 'created_to': old_day})
+    assert [time_log['id'] for time_log in response.json()['results']] == [str(old_log.id)]
+
+
+def test_create_adds_missing_months(partitioned):
+    now = timezone.now() + timedelta(days=200)
+    output = partition_timelogs('create', '--months-ahead', '1', now=now)
+    assert get_partitions()[-1].end == month_start(now, 2)
+    assert 'Created' in output
+    assert partition_timelogs('create', '--months-ahead', '1', now=now) == 'Created 0 partition(s)\n'
+
+
+def test_detach_past_retention(old_log, running_log, partitioned, service):
+    now = timezone.now() + timedelta(days=400)
+    partition_timelogs('create', '--months-ahead', '0', now=now)
+    first_month = get_partitions()[1]
+    moved = TimeLog.objects.create(user=old_log.user, description='Moved', status=TimeLog.Status.COMPLETED)
+    move_to(moved, first_month.start)
+
+    # The legacy partition still holds a running timer
+    output = partition_timelogs('detach', '--retention-months', '6', now=now)
+    assert f'Kept {LEGACY_PARTITION}' in output
+    assert first_month.name not in {partition.name for partition in get_partitions()}
+    assert not TimeLog.objects.filter(id=moved.id).exists()
+    with connection.cursor() as cursor:
+        # Left behind as a standalone table
+        cursor.execute(f'SELECT count(*) FROM {first_month.name}')
+        assert cursor.fetchone()[0] == 1
+
+    service.stop_timer(str(running_log.id))
+    partition_timelogs('detach', '--retention-months', '6', '--drop', now=now)
+    assert get_partitions()[0].name != LEGACY_PARTITION
+    assert not TimeLog.objects.filter(id=old_log.id).exists()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s)', [LEGACY_PARTITION])
+        assert cursor.fetchone()[0] is None
+
+
+def test_dry_run_changes_nothing(old_log):
+    output = partition_timelogs('convert', '--dry-run')
+    assert 'ATTACH PARTITION' in output
+    assert not is_partitioned()
+
+
+def test_migrate_after_convert(partitioned):
+    stdout = StringIO()
+    call_command('migrate', stdout=stdout)
+    assert 'No migrations to apply' in stdout.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_convert_requires_applied_migrations(sample_user):
+    call_command('migrate', 'timelogs', '0009', stdout=StringIO())
+    try:
+        with pytest.raises(CommandError, match='timelogs.0010_timelog_change_xid_tombstones'):
+            partition_timelogs('convert')
+        assert not is_partitioned()
+    finally:
+        call_command('migrate', 'timelogs', stdout=StringIO())
+
+
+def test_requires_conversion_first():
+    with pytest.raises(CommandError, match='not partitioned'):
+        partition_timelogs('create')
+
+    partition_timelogs('convert')
+    with pytest.raises(CommandError, match='already partitioned'):
+        partition_timelogs('convert')
+    with pytest.raises(CommandError, match='retention'):
+        partition_timelogs('detach', '--retention-months', '0')
@@ -0,0 +1,110 @@
+"""
+EXPLAIN the SQL of every list/filter/order combination of TimeLogViewSet
+and fail when any of it needs a sequential scan or a full sort.
+
+Sequential scans and sorts are switched off for the test, which makes any
+plan that can only use them prohibitively expensive, so the handful of
+test rows plan like a big table would.
+"""
+import json
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..domain.models import TimeLog
+from ..infrastructure.partitions import get_partitions
+from ..interfaces.views import TimeLogViewSet
+
+pytestmark = pytest.mark.django_db
+
+
+def get_cases():
+    """Query strings for every list/filter/order combination of the viewset."""
+    orderings = []
+    for field in TimeLogViewSet.ordering_fields:
+        orderings += [field, f'-{field}']
+
+    cases = [{}]
+    cases += [{'ordering': ordering} for ordering in orderings]
+    cases += [{'status': value} for value in TimeLog.Status.values]
+    cases += [
+        {'start_date': '2025-01-01'},
+        {'end_date': '2025-12-31'},
+        {'start_date': '2025-01-01', 'end_date': '2025-12-31'},
+        {'created_from': '2025-01-01', 'created_to': '2025-12-31'},
+        {'search': 'review'},
+    ]
+    # One row per page, so there is a next page to follow
+    cases += [{'pagination': 'cursor', 'ordering': ordering, 'page_size': 1} for ordering in orderings]
+    return cases
+
+
+CASES = get_cases()
+
+
+def find_problems(node, tables, allow_sort=False):
+    """Walk a JSON plan and collect sequential scans and full sorts."""
+    problems = []
+    if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in tables:
+        problems.append('sequential scan')
+    if node['Node Type'] == 'Sort' and not allow_sort:
+        problems.append(f"sort on {', '.join(node.get('Sort Key', []))}")
+    for child in node.get('Plans', []):
+        problems += find_problems(child, tables, allow_sort)
+    return problems
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+@pytest.fixture
+def logs(sample_user):
+    started = timezone.now() - timedelta(days=2)
+    # One running timer at most
+    statuses = TimeLog.Status.values + [status for status in TimeLog.Status.values if status != 'RUNNING']
+    for index, status in enumerate(statuses):
+        TimeLog.objects.create(user=sample_user, description=f'Code review {index}', status=status,
+                               start_time=started + timedelta(hours=index))
+
+
+def list_statements(api, params):
+    """The time log SQL a list request runs, and its next link."""
+    with CaptureQueriesContext(connection) as context:
+        response = api.get('/api/timelogs/', params)
+    assert response.status_code == 200, response.content
+    statements = [query['sql'] for query in context.captured_queries if TimeLog._meta.db_table in query['sql']]
+    return statements, response.json().get('next')
+
+
+@pytest.mark.parametrize('params', CASES, ids=['&'.join(f'{key}={value}' for key, value in params.items()) or 'default'
+                                               for params in CASES])
+def test_list_queries_are_index_backed(api, logs, params):
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute('SET LOCAL enable_sort = off')
+
+    statements, next_link = list_statements(api, params)
+    if params.get('pagination') == 'cursor':
+        # Also the keyset condition of the following pages
+        assert next_link
+        cursor = parse_qs(urlparse(next_link).query)['cursor'][0]
+        statements += list_statements(api, {**params, 'cursor': cursor})[0]
+
+    # Scans of a partitioned table name the partitions
+    tables = {TimeLog._meta.db_table, *(partition.name for partition in get_partitions())}
+    # Relevance cannot come from an index: only the matches get sorted
+    allow_sort = 'search' in params
+    assert statements
+    for sql in statements:
+        plan = explain(sql)
+        assert not find_problems(plan, tables, allow_sort), json.dumps(plan, indent=2)
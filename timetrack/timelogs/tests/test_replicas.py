@@ -0,0 +1,148 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.db_routers import get_read_database, pin_to_primary
+from ..domain.models import TimeLog
+from ..infrastructure.repositories import DjangoTimeLogRepository
+
+User = get_user_model()
+
+# The replica reads over its own connection, so test data is committed
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+class LaggingReplica:
+    """
+    A second connection to the test database standing in for a replica.
+
+    It reads inside a REPEATABLE READ transaction, so it keeps seeing the
+    data as of its last catch_up(), like a replica lagging behind.
+    """
+    alias = 'replica'
+
+    def __init__(self):
+        connections[self.alias] = connections.create_connection(DEFAULT_DB_ALIAS)
+        self.catch_up()
+
+    def catch_up(self):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('COMMIT')
+            cursor.execute('BEGIN ISOLATION LEVEL REPEATABLE READ')
+            # The snapshot is taken by the first query
+            cursor.execute('SELECT 1')
+
+    def close(self):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('COMMIT')
+        connections[self.alias].close()
+        del connections[self.alias]
+
+
+@pytest.fixture
+def replica(settings):
+    replica = LaggingReplica()
+    settings.DATABASE_REPLICAS = [replica.alias]
+    settings.DATABASE_REPLICA_STICKY_SECONDS = 5
+    yield replica
+    # Ends the snapshot, which would otherwise block the flush after the test
+    replica.close()
+
+
+def end_sticky_window(user):
+    cache.delete(f'db:primary:{user.id}')
+
+
+def list_ids(api):
+    return [time_log['id'] for time_log in api.get('/api/timelogs/').json()['results']]
+
+
+def test_reads_use_primary_without_replicas(sample_user, settings):
+    settings.DATABASE_REPLICAS = []
+    pin_to_primary(sample_user.id)
+    assert get_read_database(sample_user.id) == 'default'
+    assert cache.get(f'db:primary:{sample_user.id}') is None
+
+
+def test_writer_reads_own_writes_until_window_ends(api, sample_user, replica):
+    time_log = api.post('/api/timelogs/start_new/', {'description': 'Work'}).json()
+
+    # Just wrote: pinned to the primary
+    assert list_ids(api) == [time_log['id']]
+    assert api.get(f"/api/timelogs/{time_log['id']}/").status_code == 200
+
+    # Window over: the lagging replica does not have the log yet
+    end_sticky_window(sample_user)
+    assert list_ids(api) == []
+    assert api.get(f"/api/timelogs/{time_log['id']}/").status_code == 404
+    assert api.get('/api/timelogs/export/?format=csv').getvalue().decode().count('\n') == 1
+
+    replica.catch_up()
+    assert list_ids(api) == [time_log['id']]
+    assert api.get('/api/timelogs/export/?format=csv').getvalue().decode().count('\n') == 2
+
+
+def test_failed_writes_pin_too(api, sample_user, replica):
+    api.post('/api/timelogs/00000000-0000-0000-0000-000000000000/stop/')
+    assert get_read_database(sample_user.id) == 'default'
+    end_sticky_window(sample_user)
+    assert get_read_database(sample_user.id) == replica.alias
+
+
+def test_writes_go_to_primary(api, sample_user, replica):
+    time_log = TimeLog.objects.create(user=sample_user, description='Before')
+    replica.catch_up()
+    end_sticky_window(sample_user)
+
+    # An instance read from the replica is still saved to the primary
+    from_replica = TimeLog.objects.using(replica.alias).get(id=time_log.id)
+    from_replica.description = 'After'
+    DjangoTimeLogRepository().update(from_replica)
+    assert TimeLog.objects.get(id=time_log.id).description == 'After'
+    assert TimeLog.objects.using(replica.alias).get(id=time_log.id).description == 'Before'
+
+    # Transitions and updates find logs the replica does not have yet
+    created = api.post('/api/timelogs/', {
+        'description': 'New', 'start_time': '2026-01-01T09:00:00Z', 'duration': '01:00:00',
+    }).json()
+    end_sticky_window(sample_user)
+    response = api.patch(f"/api/timelogs/{created['id']}/", {'description': 'Renamed'})
+    assert response.status_code == 200
+    assert api.post(f'/api/timelogs/{time_log.id}/start/').json()['status'] == 'RUNNING'
+
+
+def test_staff_writes_pin_the_owners(sample_user, replica):
+    staff_user = User.objects.create_user(username='staff', email='staff@example.com', password='testpass123',
+                                          is_staff=True)
+    staff = APIClient()
+    staff.force_authenticate(staff_user)
+    running, paused = DjangoTimeLogRepository().create_many([
+        TimeLog(user=sample_user, description='Work', status=status, start_time=timezone.now() - timedelta(hours=1))
+        for status in (TimeLog.Status.RUNNING, TimeLog.Status.PAUSED)
+    ])
+    end_sticky_window(sample_user)
+
+    # The owner reads the log the staff member just stopped from the primary
+    assert staff.post(f'/api/timelogs/{running.id}/stop/').status_code == 200
+    assert get_read_database(sample_user.id) == 'default'
+    assert get_read_database(staff_user.id) == 'default'
+
+    end_sticky_window(sample_user)
+    response = staff.post('/api/timelogs/batch_transition/', {
+        'action': 'stop', 'status': ['PAUSED'], 'users': [str(sample_user.id)],
+    }, format='json')
+    assert [outcome['id'] for outcome in response.json()] == [str(paused.id)]
+    assert get_read_database(sample_user.id) == 'default'
+
+    # Users selected by a batch stay pinned even if none of their timers moved
+    idle_user = User.objects.create_user(username='idle', email='idle@example.com', password='testpass123')
+    response = staff.post('/api/timelogs/batch_transition/', {
+        'action': 'stop', 'status': ['RUNNING'], 'users': [str(idle_user.id)],
+    }, format='json')
+    assert response.json() == []
+    assert get_read_database(idle_user.id) == 'default'
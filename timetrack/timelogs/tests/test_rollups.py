@@ -0,0 +1,122 @@
+import io
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from django.utils.dateparse import parse_duration
+
+from ..domain.models import DailyTimeTotal, TimeLog
+
+pytestmark = pytest.mark.django_db
+
+UTC = ZoneInfo('UTC')
+
+
+def at(day, hour, minute=0):
+    return datetime(2026, 3, day, hour, minute, tzinfo=UTC)
+
+
+def rollup(user):
+    return {
+        total.day: (total.active_duration, total.paused_duration, total.entry_count)
+        for total in DailyTimeTotal.objects.filter(user=user)
+    }
+
+
+def raw_totals(user):
+    """Active time and entry count per UTC day, straight from the completed logs."""
+    totals = defaultdict(lambda: [timedelta(), 0])
+    for time_log in TimeLog.objects.filter(user=user, status=TimeLog.Status.COMPLETED):
+        start, end = time_log.start_time, time_log.start_time + time_log.duration
+        totals[start.date()][1] += 1
+        day = start.date()
+        while day <= end.date():
+            day_start = datetime.combine(day, time.min, tzinfo=UTC)
+            overlap = min(end, day_start + timedelta(days=1)) - max(start, day_start)
+            if overlap > timedelta():
+                totals[day][0] += overlap
+            day += timedelta(days=1)
+    return {day: (active, count) for day, (active, count) in totals.items()}
+
+
+def test_split_across_midnight():
+    time_log = TimeLog(start_time=at(1, 22), end_time=at(2, 2), duration=timedelta(hours=4),
+                       paused_duration=timedelta())
+    assert time_log.get_daily_totals(UTC) == [
+        (date(2026, 3, 1), timedelta(hours=2), timedelta(), 1),
+        (date(2026, 3, 2), timedelta(hours=2), timedelta(), 0),
+    ]
+
+    # Paused time is spread over the span like active time: a third of it
+    # falls before midnight
+    time_log = TimeLog(start_time=at(1, 23, 30), end_time=at(2, 1), duration=timedelta(minutes=30),
+                       paused_duration=timedelta(hours=1))
+    assert time_log.get_daily_totals(UTC) == [
+        (date(2026, 3, 1), timedelta(minutes=10), timedelta(minutes=20), 1),
+        (date(2026, 3, 2), timedelta(minutes=20), timedelta(minutes=40), 0),
+    ]
+
+
+def test_split_follows_the_time_zone():
+    # 23:30 UTC is already the next day in Berlin
+    time_log = TimeLog(start_time=at(1, 23, 30), end_time=at(2, 0, 30), duration=timedelta(hours=1),
+                       paused_duration=timedelta())
+    assert time_log.get_daily_totals(ZoneInfo('Europe/Berlin')) == [
+        (date(2026, 3, 2), timedelta(hours=1), timedelta(), 1),
+    ]
+
+
+def test_rollup_follows_writes(sample_user, service):
+    overnight = service.add_manual_time(sample_user.id, 'Release', at(1, 23), timedelta(hours=2))
+    assert rollup(sample_user) == {
+        date(2026, 3, 1): (timedelta(hours=1), timedelta(), 1),
+        date(2026, 3, 2): (timedelta(hours=1), timedelta(), 0),
+    }
+
+    service.add_manual_time_entries(sample_user.id, [
+        {'description': 'Review', 'start_time': at(2, 9), 'duration': timedelta(minutes=45)},
+        {'description': 'Meeting', 'start_time': at(3, 9), 'duration': timedelta(minutes=15)},
+    ])
+    time_log = service.create_and_start_timer(sample_user.id, 'Running')
+    # Only completed logs count
+    assert len(rollup(sample_user)) == 3
+    time_log = service.stop_timer(time_log.id)
+    assert rollup(sample_user)[timezone.localdate(time_log.start_time)][2] == 1
+
+    service.delete_time_log(overnight.id)
+    totals = rollup(sample_user)
+    # Emptied days are dropped
+    assert date(2026, 3, 1) not in totals
+    assert totals[date(2026, 3, 2)] == (timedelta(minutes=45), timedelta(), 1)
+
+
+def test_summary_matches_raw_aggregation(api, sample_user, service):
+    entries = [
+        (at(1, 9), timedelta(hours=3)),
+        (at(1, 22, 15), timedelta(hours=4, minutes=10)),
+        (at(4, 23, 59), timedelta(minutes=2)),
+        (at(9, 12), timedelta(minutes=50)),
+        (at(30, 20), timedelta(days=1, hours=6)),
+    ]
+    service.add_manual_time_entries(sample_user.id, [
+        {'description': f'Work {index}', 'start_time': start, 'duration': duration}
+        for index, (start, duration) in enumerate(entries)
+    ])
+    service.delete_time_log(TimeLog.objects.get(description='Work 3').id)
+
+    summary = api.get('/api/timelogs/summary/', {'period': 'day'}).json()
+    assert {
+        date.fromisoformat(row['period_start']): (parse_duration(row['active_duration']), row['entry_count'])
+        for row in summary
+    } == raw_totals(sample_user)
+
+    months = api.get('/api/timelogs/summary/', {'period': 'month'}).json()
+    assert [(row['period_start'], row['entry_count']) for row in months] == [('2026-03-01', 4), ('2026-04-01', 0)]
+
+    # A rebuild from the logs lands on the same rows
+    before = rollup(sample_user)
+    call_command('rebuild_time_totals', stdout=io.StringIO())
+    assert rollup(sample_user) == before
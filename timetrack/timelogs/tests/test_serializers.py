@@ -0,0 +1,125 @@
+import json
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from ..domain.models import TimeLog
+from ..interfaces.serializers import TimeLogRowSerializer, TimeLogSerializer
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def varied_timelogs(sample_user):
+    """Time logs covering every status, empty timestamps and odd durations."""
+    now = timezone.now().replace(microsecond=123456)
+    return [
+        TimeLog.objects.create(user=sample_user, description='Never started'),
+        TimeLog.objects.create(
+            user=sample_user,
+            description='Running',
+            status=TimeLog.Status.RUNNING,
+            start_time=now - timedelta(minutes=5),
+        ),
+        TimeLog.objects.create(
+            user=sample_user,
+            description='Paused',
+            status=TimeLog.Status.PAUSED,
+            start_time=now - timedelta(hours=1),
+            pause_start_time=now - timedelta(minutes=10),
+            duration=timedelta(minutes=50, seconds=1, microseconds=5),
+        ),
+        TimeLog.objects.create(
+            user=sample_user,
+            description='Overnight, with "quotes" and ünïcode',
+            status=TimeLog.Status.COMPLETED,
+            start_time=now - timedelta(days=2),
+            end_time=now - timedelta(hours=20),
+            duration=timedelta(days=1, hours=3, seconds=59, microseconds=999999),
+            paused_duration=timedelta(minutes=42, seconds=30),
+        ),
+    ]
+
+
+@pytest.mark.parametrize('tz', ['UTC', 'Europe/Paris'])
+def test_row_serializer_matches_model_serializer(sample_user, varied_timelogs, tz):
+    queryset = TimeLog.objects.filter(user=sample_user).order_by('created_at')
+    with timezone.override(ZoneInfo(tz)):
+        expected = JSONRenderer().render(TimeLogSerializer(queryset, many=True).data)
+        actual = JSONRenderer().render(TimeLogRowSerializer(queryset.values(*TimeLogRowSerializer.fields)).data)
+
+    assert actual == expected
+
+
+@pytest.mark.parametrize('params', [{}, {'pagination': 'cursor', 'page_size': 3}])
+def test_list_matches_model_serializer(api, sample_user, varied_timelogs, params):
+    results = []
+    url = '/api/timelogs/'
+    while url:
+        page = api.get(url, params).json()
+        results += page['results']
+        url, params = page['next'], None
+
+    expected = TimeLogSerializer(TimeLog.objects.filter(user=sample_user).order_by('-created_at'), many=True).data
+    assert results == json.loads(JSONRenderer().render(expected))
+
+
+def test_sparse_fieldsets_match_model_serializer(sample_user, varied_timelogs):
+    queryset = TimeLog.objects.filter(user=sample_user).order_by('created_at')
+    for name in TimeLogRowSerializer.output_fields:
+        columns = TimeLogRowSerializer.get_columns([name])
+        expected = TimeLogSerializer(queryset, many=True, fields=[name]).data
+        assert TimeLogRowSerializer(queryset.values(*columns), [name]).data == expected, name
+
+
+def test_list_sparse_fieldsets(api, sample_user, varied_timelogs):
+    with CaptureQueriesContext(connection) as context:
+        results = api.get('/api/timelogs/', {'fields': 'status,total_duration'}).json()['results']
+    assert [list(item) for item in results] == [['status', 'total_duration']] * len(varied_timelogs)
+    select = context.captured_queries[-1]['sql'].split(' FROM ')[0]
+    assert '"status"' in select and '"paused_duration"' in select
+    assert '"description"' not in select and '"created_at"' not in select
+
+    results = api.get('/api/timelogs/', {'exclude': 'description, formatted_duration'}).json()['results']
+    assert list(results[0]) == [
+        name for name in TimeLogRowSerializer.output_fields if name not in {'description', 'formatted_duration'}
+    ]
+
+    # Cursors still find their sort key
+    page = api.get('/api/timelogs/', {'pagination': 'cursor', 'page_size': 2, 'ordering': 'duration', 'fields': 'id'})
+    ids = [item['id'] for item in page.json()['results']]
+    ids += [item['id'] for item in api.get(page.json()['next']).json()['results']]
+    assert sorted(ids) == sorted(str(time_log.id) for time_log in varied_timelogs)
+
+    response = api.get('/api/timelogs/', {'fields': 'id,new_status', 'exclude': 'nope'})
+    assert response.status_code == 400
+    assert set(response.json()) == {'fields', 'exclude'}
+
+
+def test_retrieve_and_active_sparse_fieldsets(api, sample_user, varied_timelogs):
+    running = varied_timelogs[1]
+
+    response = api.get(f'/api/timelogs/{running.id}/', {'fields': 'id,status_display'})
+    assert response.json() == {'id': str(running.id), 'status_display': 'Running'}
+    assert api.get('/api/timelogs/active/', {'exclude': 'id'}).json()['description'] == 'Running'
+    assert 'id' not in api.get('/api/timelogs/active/', {'exclude': 'id'}).json()
+
+    # Writes still take every field and answer with all of them
+    response = api.patch(f'/api/timelogs/{running.id}/?fields=id', {'description': 'Renamed'})
+    assert response.json()['description'] == 'Renamed'
+
+
+def test_messagepack_renderer(api, sample_user, varied_timelogs):
+    msgpack = pytest.importorskip('msgpack')
+    expected = api.get('/api/timelogs/').json()
+    response = api.get('/api/timelogs/', HTTP_ACCEPT='application/msgpack')
+    assert response['Content-Type'] == 'application/msgpack'
+    assert msgpack.unpackb(response.content) == expected
+
+    response = api.get(f'/api/timelogs/{varied_timelogs[0].id}/', {'format': 'msgpack'})
+    assert msgpack.unpackb(response.content)['id'] == str(varied_timelogs[0].id)
@@ -0,0 +1,392 @@
+"""
+Live timer stream tests.
+
+The stream is driven through core.asgi as an ASGI server would, with
+workers committing real transactions, so these tests use transaction=True.
+
+test_stream_load holds many concurrent streams and records delivery
+latency and memory per connection. It is skipped unless
+TIMELOGS_STREAM_LOAD is set to the stream counts to try, e.g.:
+
+    TIMELOGS_STREAM_LOAD=1000,5000 pytest timelogs/tests/test_stream.py -k load
+
+Other settings:
+    TIMELOGS_STREAM_LOAD_TABS    streams per user (default 2)
+    TIMELOGS_STREAM_LOAD_HOLD    seconds the streams sit idle (default 5)
+    TIMELOGS_STREAM_LOAD_OUTPUT  results file (default stream-load-results.json)
+"""
+import asyncio
+import gc
+import json
+import os
+import statistics
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+
+import psutil
+import pytest
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connections
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.asgi import application
+from ..application.services import TimeTrackingService
+from ..domain.models import TimeLog
+from ..infrastructure.events import get_timer_event_broker
+from ..infrastructure.repositories import DjangoTimeLogRepository
+
+User = get_user_model()
+
+LOAD_SIZES = [int(size) for size in os.getenv('TIMELOGS_STREAM_LOAD', '').split(',') if size]
+LOAD_TABS = int(os.getenv('TIMELOGS_STREAM_LOAD_TABS', 2))
+LOAD_HOLD = float(os.getenv('TIMELOGS_STREAM_LOAD_HOLD', 5))
+LOAD_OUTPUT = os.getenv('TIMELOGS_STREAM_LOAD_OUTPUT', 'stream-load-results.json')
+TRANSITION_SAMPLE = 100
+
+
+class EventStream:
+    """One request to the stream endpoint, driven through the ASGI application."""
+
+    def __init__(self, token=None, path='/api/timelogs/stream/', header=True):
+        headers = [(b'host', b'testserver')]
+        query_string = b''
+        if token and header:
+            headers.append((b'authorization', f'Bearer {token}'.encode()))
+        elif token:
+            query_string = f'token={token}'.encode()
+        self.scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query_string,
+            'headers': headers,
+            'client': ('127.0.0.1', 50000),
+            'server': ('testserver', 80),
+        }
+        self.status = None
+        self.body = b''
+        self.messages = asyncio.Queue()
+        self.started = asyncio.Event()
+        self.disconnected = asyncio.Event()
+        self.requested = False
+
+    async def open(self):
+        self.task = asyncio.create_task(application(self.scope, self.receive, self.send))
+        await self.started.wait()
+        return self
+
+    async def receive(self):
+        if not self.requested:
+            self.requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+            self.headers = dict(message['headers'])
+            self.started.set()
+        elif message.get('body'):
+            received_at = time.perf_counter()
+            self.body += message['body']
+            *blocks, self.body = self.body.split(b'\n\n')
+            for block in blocks:
+                self.messages.put_nowait((parse_message(block.decode()), received_at))
+
+    async def next_message(self, timeout=5):
+        return await asyncio.wait_for(self.messages.get(), timeout)
+
+    async def next_event(self, timeout=5):
+        """Next (event name, data, time received), skipping comments."""
+        while True:
+            message, received_at = await self.next_message(timeout)
+            if 'event' in message:
+                return message['event'], json.loads(message['data']), received_at
+
+    async def close(self):
+        self.disconnected.set()
+        await self.task
+
+
+def parse_message(block):
+    """SSE message block -> dict of fields; comments are collected under ''."""
+    message = {}
+    for line in block.split('\n'):
+        name, _, value = line.partition(':')
+        message[name] = value[1:] if value.startswith(' ') else value
+    return message
+
+
+def in_worker(func, *args, **kwargs):
+    """Run blocking test code off the event loop, without leaking its connection."""
+    def call():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+    return sync_to_async(call, thread_sensitive=False)()
+
+
+@pytest.fixture
+def token(sample_user):
+    return str(AccessToken.for_user(sample_user))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stream_requires_valid_token(sample_user):
+    async def scenario():
+        for token in [None, 'not-a-token']:
+            stream = await EventStream(token).open()
+            await stream.task
+            assert stream.status == 401
+
+        sample_user.is_active = False
+        await in_worker(sample_user.save)
+        stream = await EventStream(str(AccessToken.for_user(sample_user))).open()
+        await stream.task
+        assert stream.status == 401
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stream_pushes_timer_changes(api, sample_user, token):
+    broker = get_timer_event_broker()
+
+    async def scenario():
+        stream = await EventStream(token).open()
+        assert stream.status == 200
+        assert stream.headers[b'Content-Type'] == b'text/event-stream'
+        name, data, _ = await stream.next_event()
+        assert (name, data) == ('snapshot', None)
+
+        response = await in_worker(api.post, '/api/timelogs/start_new/', {'description': 'Work'})
+        time_log = response.json()
+        name, data, _ = await stream.next_event()
+        assert (name, data) == ('start', time_log)
+
+        for action, status in [('pause', 'PAUSED'), ('resume', 'RUNNING'), ('stop', 'COMPLETED')]:
+            response = await in_worker(api.post, f"/api/timelogs/{time_log['id']}/{action}/")
+            name, data, _ = await stream.next_event()
+            assert (name, data['status']) == (action, status)
+            assert data == response.json()
+
+        # A transition that fails publishes nothing
+        response = await in_worker(api.post, f"/api/timelogs/{time_log['id']}/pause/")
+        assert response.status_code == 400
+        await in_worker(api.delete, f"/api/timelogs/{time_log['id']}/")
+        name, data, _ = await stream.next_event()
+        assert (name, data['id']) == ('delete', time_log['id'])
+
+        await stream.close()
+        assert broker.subscriber_count(sample_user.id) == 0
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stream_snapshot_and_isolation(api, sample_user, token):
+    other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+    service = TimeTrackingService(DjangoTimeLogRepository(), get_timer_event_broker())
+    running = service.create_and_start_timer(sample_user.id, 'Running')
+
+    async def scenario():
+        stream = await EventStream(token, header=False).open()
+        name, data, _ = await stream.next_event()
+        assert (name, data['id'], data['status']) == ('snapshot', str(running.id), 'RUNNING')
+
+        await in_worker(service.create_and_start_timer, other.id, 'Not yours')
+        await in_worker(service.pause_timer, running.id)
+        name, data, _ = await stream.next_event()
+        assert (name, data['id']) == ('pause', str(running.id))
+        await stream.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stream_keepalive_and_token_expiry(sample_user, settings):
+    settings.TIMELOGS_STREAM_KEEPALIVE = 0.1
+    token = AccessToken.for_user(sample_user)
+    token.set_exp(lifetime=timedelta(seconds=1))
+
+    async def scenario():
+        stream = await EventStream(str(token)).open()
+        assert (await stream.next_event())[0] == 'snapshot'
+        message, _ = await stream.next_message()
+        assert message == {'': 'keepalive'}
+        # The stream ends on its own once the token expires
+        await asyncio.wait_for(stream.task, 5)
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_streams_share_one_thread(sample_user, token):
+    """
+    Streams run their sync middleware and signal receivers on the one
+    process-wide thread: while it is busy new streams wait to open, but
+    open ones keep delivering events.
+    """
+    service = TimeTrackingService(DjangoTimeLogRepository(), get_timer_event_broker())
+    running = service.create_and_start_timer(sample_user.id, 'Running')
+
+    async def scenario():
+        streams = await asyncio.gather(*(EventStream(token).open() for _ in range(8)))
+        snapshots = await asyncio.gather(*(stream.next_event() for stream in streams))
+        assert {(name, data['id']) for name, data, _ in snapshots} == {('snapshot', str(running.id))}
+
+        # A slow sync call outside any request
+        busy = asyncio.create_task(sync_to_async(time.sleep)(2))
+        await asyncio.sleep(0.1)
+        waiting = asyncio.create_task(EventStream(token).open())
+
+        await in_worker(service.pause_timer, running.id)
+        events = await asyncio.gather(*(stream.next_event(timeout=1) for stream in streams))
+        assert {name for name, _, _ in events} == {'pause'}
+        assert not busy.done()
+        assert not waiting.done()
+
+        await busy
+        late = await asyncio.wait_for(waiting, 5)
+        assert (await late.next_event())[0] == 'snapshot'
+        await asyncio.gather(*(stream.close() for stream in [*streams, late]))
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_keeps_latest_events():
+    broker = type(get_timer_event_broker())(queue_size=3)
+
+    async def scenario():
+        async with broker.subscribe('user') as subscription:
+            await in_worker(lambda: [broker.publish('user', {'n': n}) for n in range(10)])
+            await asyncio.sleep(0)
+            assert [subscription.queue.get_nowait()['n'] for _ in range(3)] == [7, 8, 9]
+        assert broker.subscriber_count() == 0
+
+    asyncio.run(scenario())
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(latencies):
+    milliseconds = [latency * 1000 for latency in latencies]
+    return {
+        'p50_ms': round(statistics.median(milliseconds), 3),
+        'p95_ms': round(percentile(milliseconds, 0.95), 3),
+        'max_ms': round(max(milliseconds), 3),
+    }
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(not LOAD_SIZES, reason='set TIMELOGS_STREAM_LOAD to run the stream load test')
+@pytest.mark.parametrize('size', LOAD_SIZES)
+@pytest.mark.django_db(transaction=True)
+def test_stream_load(size, settings):
+    """
+    Hold `size` streams open, `LOAD_TABS` per user, and measure:
+    memory per connection once they are idle, the latency of one event
+    fanned out to every stream, and the latency from a service transition
+    to its event on each of the user's streams.
+    """
+    # Keepalives every second, so the hold exercises them
+    settings.TIMELOGS_STREAM_KEEPALIVE = 1
+    user_count = max(1, size // LOAD_TABS)
+    User.objects.bulk_create([
+        User(username=f'stream_{index}', email=f'stream_{index}@example.com', password='!')
+        for index in range(user_count)
+    ])
+    users = list(User.objects.filter(username__startswith='stream_').order_by('username'))
+    tokens = [str(AccessToken.for_user(user)) for user in users]
+    time_logs = TimeLog.objects.bulk_create([
+        TimeLog(user=user, description='Load') for user in users[:TRANSITION_SAMPLE]
+    ])
+    broker = get_timer_event_broker()
+    service = TimeTrackingService(DjangoTimeLogRepository(), broker)
+    process = psutil.Process()
+
+    async def scenario():
+        gc.collect()
+        rss_before = process.memory_info().rss
+        threads_before = threading.active_count()
+        tracemalloc.start()
+        traced_before = tracemalloc.get_traced_memory()[0]
+
+        started = time.perf_counter()
+        streams = [EventStream(tokens[index % user_count]) for index in range(size)]
+        await asyncio.gather(*(stream.open() for stream in streams))
+        snapshots = await asyncio.gather(*(stream.next_event(timeout=60) for stream in streams))
+        open_seconds = time.perf_counter() - started
+        assert {name for name, _, _ in snapshots} == {'snapshot'}
+        assert broker.subscriber_count() == size
+
+        await asyncio.sleep(LOAD_HOLD)
+        gc.collect()
+        traced = tracemalloc.get_traced_memory()[0] - traced_before
+        tracemalloc.stop()
+        rss = process.memory_info().rss - rss_before
+        threads = threading.active_count() - threads_before
+
+        # Drop the keepalives received while idle
+        keepalives = 0
+        for stream in streams:
+            while not stream.messages.empty():
+                stream.messages.get_nowait()
+                keepalives += 1
+
+        # One event to every user at once
+        event = {
+            'action': 'update',
+            'time_log': {field.attname: getattr(time_logs[0], field.attname) for field in TimeLog._meta.concrete_fields},
+        }
+        published_at = time.perf_counter()
+        for user in users:
+            broker.publish(user.id, event)
+        fanout = await asyncio.gather(*(stream.next_event(timeout=60) for stream in streams))
+        fanout_latencies = [received_at - published_at for _, _, received_at in fanout]
+
+        # Transitions through the service, from the call to each stream
+        transition_latencies = []
+        for index, time_log in enumerate(time_logs):
+            user_streams = streams[index::user_count]
+            called_at = time.perf_counter()
+            await in_worker(service.start_timer, time_log.id)
+            events = await asyncio.gather(*(stream.next_event(timeout=60) for stream in user_streams))
+            assert {name for name, _, _ in events} == {'start'}
+            transition_latencies += [received_at - called_at for _, _, received_at in events]
+
+        await asyncio.gather(*(stream.close() for stream in streams))
+        assert broker.subscriber_count() == 0
+        return {
+            'streams': size,
+            'users': user_count,
+            'open_seconds': round(open_seconds, 3),
+            'idle_seconds': LOAD_HOLD,
+            'keepalives': keepalives,
+            'rss_bytes_per_stream': rss // size,
+            'traced_bytes_per_stream': traced // size,
+            'threads_added': threads,
+            'fanout': summarize(fanout_latencies),
+            'transition': summarize(transition_latencies),
+        }
+
+    result = asyncio.run(scenario())
+    results = {}
+    if os.path.exists(LOAD_OUTPUT):
+        with open(LOAD_OUTPUT) as output:
+            results = json.load(output)
+    results[str(size)] = result
+    with open(LOAD_OUTPUT, 'w') as output:
+        json.dump(results, output, indent=2)
@@ -0,0 +1,182 @@
+import base64
+import io
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from ..domain.models import TimeLog, TimeLogTombstone
+from ..infrastructure.repositories import DjangoTimeLogRepository
+from ..interfaces.serializers import encode_sync_cursor
+
+BENCHMARK_SIZE = os.getenv('TIMELOGS_SYNC_BENCHMARK')
+BENCHMARK_OUTPUT = os.getenv('TIMELOGS_SYNC_BENCHMARK_OUTPUT', 'sync-benchmark-results.json')
+
+# Change IDs come from committed transactions, so test data is committed
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def sync(api, cursor=None, **params):
+    """Follow the changes until caught up; returns the changed IDs, deleted IDs and last cursor."""
+    changed, deleted = [], []
+    while True:
+        response = api.get('/api/timelogs/changes/', {**params, **({'since': cursor} if cursor else {})})
+        assert response.status_code == 200
+        body = response.json()
+        changed += [time_log['id'] for time_log in body['time_logs']]
+        deleted += body['deleted']
+        cursor = body['cursor']
+        if not body['has_more']:
+            return changed, deleted, cursor
+
+
+def test_initial_sync_in_batches(api, sample_user, create_logs):
+    time_logs = create_logs(sample_user, 5)
+
+    response = api.get('/api/timelogs/changes/', {'limit': 2})
+    assert len(response.json()['time_logs']) == 2
+    assert response.json()['has_more'] is True
+
+    changed, deleted, _ = sync(api, limit=2)
+    assert sorted(changed) == sorted(str(time_log.id) for time_log in time_logs)
+    assert deleted == []
+
+
+def test_changes_since_cursor(api, sample_user, create_logs):
+    kept, edited, removed = create_logs(sample_user, 3)
+    _, _, cursor = sync(api)
+
+    assert sync(api, cursor)[:2] == ([], [])
+
+    api.patch(f'/api/timelogs/{edited.id}/', {'description': 'Edited'}, format='json')
+    assert api.delete(f'/api/timelogs/{removed.id}/').status_code == 204
+    added, = create_logs(sample_user)
+
+    changed, deleted, cursor = sync(api, cursor)
+    assert changed == [str(edited.id), str(added.id)]
+    assert deleted == [str(removed.id)]
+    assert TimeLogTombstone.objects.filter(time_log_id=removed.id).exists()
+
+
+def test_delete_leaves_a_tombstone(api, sample_user, create_logs):
+    time_log, = create_logs(sample_user)
+    _, _, cursor = sync(api)
+
+    assert api.delete(f'/api/timelogs/{time_log.id}/').status_code == 204
+    # Created and deleted between two syncs
+    short_lived, = create_logs(sample_user)
+    assert DjangoTimeLogRepository().delete(str(short_lived.id)) is True
+
+    response = api.get('/api/timelogs/changes/', {'since': cursor})
+    assert response.status_code == 200
+    assert response.json()['time_logs'] == []
+    assert response.json()['deleted'] == [str(time_log.id), str(short_lived.id)]
+
+
+def test_other_users_changes_are_left_out(api, sample_user, django_user_model, create_logs):
+    other = django_user_model.objects.create_user(username='other', email='other@example.com', password='x')
+    create_logs(other)
+    assert sync(api)[:2] == ([], [])
+
+
+def test_out_of_order_commits_are_not_skipped(api, sample_user, create_logs):
+    slow, = create_logs(sample_user)
+    _, _, cursor = sync(api)
+
+    # A write that starts first but commits last
+    other = connections.create_connection(DEFAULT_DB_ALIAS)
+    try:
+        with other.cursor() as cursor_:
+            cursor_.execute('BEGIN')
+            cursor_.execute(f'UPDATE {TimeLog._meta.db_table} SET description = %s WHERE id = %s',
+                            ['Slow edit', slow.id])
+        fast, = create_logs(sample_user)
+
+        # Both are held back while the older transaction is open
+        changed, _, cursor = sync(api, cursor)
+        assert changed == []
+
+        with other.cursor() as cursor_:
+            cursor_.execute('COMMIT')
+    finally:
+        other.close()
+
+    changed, _, _ = sync(api, cursor)
+    assert changed == [str(slow.id), str(fast.id)]
+
+
+def test_invalid_and_expired_cursors(api, settings):
+    assert api.get('/api/timelogs/changes/', {'since': 'not-a-cursor'}).status_code == 400
+
+    issued_at = timezone.now() - timedelta(days=settings.TIMELOGS_TOMBSTONE_RETENTION_DAYS + 1)
+    expired = encode_sync_cursor((1, DjangoTimeLogRepository.MIN_UUID), issued_at)
+    assert api.get('/api/timelogs/changes/', {'since': expired}).status_code == 410
+
+
+def test_cursors_are_signed(api):
+    cursor = encode_sync_cursor((1, DjangoTimeLogRepository.MIN_UUID), timezone.now())
+    assert api.get('/api/timelogs/changes/', {'since': cursor}).status_code == 200
+
+    # Skipping ahead, with a fresh issue time
+    payload = [10 ** 9, str(DjangoTimeLogRepository.MAX_UUID), int(timezone.now().timestamp())]
+    unsigned = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+    other = encode_sync_cursor((payload[0], payload[1]), timezone.now())
+    swapped = other.split(':')[0] + cursor[cursor.index(':'):]
+    for since in [unsigned, swapped, cursor[:-1]]:
+        assert api.get('/api/timelogs/changes/', {'since': since}).status_code == 400
+
+
+def test_compact_tombstones(sample_user, settings, create_logs):
+    old = TimeLogTombstone.objects.create(time_log_id=create_logs(sample_user)[0].id, user=sample_user)
+    recent = TimeLogTombstone.objects.create(time_log_id=create_logs(sample_user)[0].id, user=sample_user)
+    TimeLogTombstone.objects.filter(id=old.id).update(
+        deleted_at=timezone.now() - timedelta(days=settings.TIMELOGS_TOMBSTONE_RETENTION_DAYS + 2)
+    )
+
+    call_command('compact_timelog_tombstones', stdout=io.StringIO())
+    assert list(TimeLogTombstone.objects.values_list('id', flat=True)) == [recent.id]
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(not BENCHMARK_SIZE, reason='set TIMELOGS_SYNC_BENCHMARK (e.g. 10k) to run')
+def test_sync_benchmark(api, sample_user):
+    """Bytes to catch up after 1% of a user's logs changed: delta sync against a full refresh."""
+    size = int(BENCHMARK_SIZE.replace('k', '000'))
+    started = timezone.now() - timedelta(days=365)
+    time_logs = DjangoTimeLogRepository().create_many([
+        TimeLog(user=sample_user, description=f'Work item {index}', status=TimeLog.Status.COMPLETED,
+                start_time=started + timedelta(hours=index), duration=timedelta(minutes=50))
+        for index in range(size)
+    ])
+    _, _, cursor = sync(api)
+
+    changed = time_logs[::100]
+    TimeLog.objects.filter(id__in=[time_log.id for time_log in changed]).update(description='Changed')
+
+    delta_bytes = 0
+    while True:
+        response = api.get('/api/timelogs/changes/', {'since': cursor})
+        delta_bytes += len(response.content)
+        cursor = response.json()['cursor']
+        if not response.json()['has_more']:
+            break
+
+    full_bytes, page = 0, 1
+    while page:
+        response = api.get('/api/timelogs/', {'page': page, 'page_size': 100})
+        full_bytes += len(response.content)
+        page = page + 1 if response.json()['next'] else None
+
+    report = {
+        'size': BENCHMARK_SIZE,
+        'changed': len(changed),
+        'delta_bytes': delta_bytes,
+        'full_refresh_bytes': full_bytes,
+    }
+    Path(BENCHMARK_OUTPUT).write_text(json.dumps(report, indent=2))
+    assert delta_bytes < full_bytes
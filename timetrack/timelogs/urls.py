@@ -1,10 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from .interfaces.streams import timer_event_stream
 from .interfaces.views import TimeLogViewSet
 
 router = DefaultRouter()
 router.register(r'timelogs', TimeLogViewSet, basename='timelog')
 
 urlpatterns = [
+    # Before the router, whose detail route would take 'stream' for an ID
+    path('timelogs/stream/', timer_event_stream, name='timelog-stream'),
     path('', include(router.urls)),
 ]